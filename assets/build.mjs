@@ -0,0 +1,87 @@
+// Builds the CSS/JS bundles into static/dist/:
+//   - CSS (lightningcss): assets/css entry points with their @imports resolved from node_modules,
+//     selectors naming a class no template uses dropped, minified
+//   - JS: Bootstrap's minified bundle (Popper included), which registers its data-bs-* handlers
+// collectstatic then gives every file a content hash and .gz/.br variants (see STORAGES in settings.py).
+// Usage: npm run build
+import { mkdir, readdir, readFile, rm, writeFile } from 'node:fs/promises';
+import { createRequire } from 'node:module';
+import path from 'node:path';
+
+import { bundleAsync } from 'lightningcss';
+
+const require = createRequire(import.meta.url);
+
+const OUT_DIR = 'static/dist';
+// Classes added by Bootstrap's JS at runtime or built from template variables (e.g. alert-{{ message.tags }})
+const SAFELIST = {
+  standard: ['show', 'fade', 'collapse', 'collapsing', 'active', 'disabled', 'is-invalid', 'is-valid'],
+  greedy: [/^alert-/, /^bg-/, /^btn-/, /^text-/, /^badge/, /^dropdown-menu/],
+};
+
+async function listFiles(dir) {
+  const entries = await readdir(dir, { recursive: true, withFileTypes: true }).catch(() => []);
+  return entries.filter((entry) => entry.isFile()).map((entry) => path.join(entry.parentPath, entry.name));
+}
+
+// Every word of the templates (Templates/, <app>/templates/) and of the apps' forms.py (widget classes)
+async function usedWords() {
+  const files = [];
+  for (const top of await readdir('.', { withFileTypes: true })) {
+    if (!top.isDirectory() || top.name.startsWith('.') || top.name === 'node_modules') continue;
+    const templates = top.name === 'Templates' ? top.name : path.join(top.name, 'templates');
+    files.push(...(await listFiles(templates)).filter((name) => name.endsWith('.html')));
+    files.push(path.join(top.name, 'forms.py'));
+  }
+  const words = new Set();
+  for (const file of files) {
+    const text = await readFile(file, 'utf8').catch(() => '');
+    for (const word of text.match(/[\w-]+/g) ?? []) words.add(word);
+  }
+  return words;
+}
+
+// Drops the selectors (and then rules) naming a class that is neither used nor safelisted
+function purge(words) {
+  const used = (name) => words.has(name) || SAFELIST.standard.includes(name) || SAFELIST.greedy.some((re) => re.test(name));
+  const kept = (selector) => selector.every((component) => component.type !== 'class' || used(component.name));
+  return {
+    Rule: {
+      style(rule) {
+        const selectors = rule.value.selectors.filter(kept);
+        if (!selectors.length) return [];
+        rule.value.selectors = selectors;
+        return rule;
+      },
+    },
+  };
+}
+
+async function buildCss() {
+  const visitor = purge(await usedWords());
+  const resolver = {
+    resolve(specifier, from) {
+      return specifier.startsWith('.') ? path.resolve(path.dirname(from), specifier) : require.resolve(specifier);
+    },
+  };
+  const pages = (await listFiles('assets/css/pages')).filter((name) => name.endsWith('.css'));
+  for (const entry of ['assets/css/main.css', ...pages]) {
+    const { code } = await bundleAsync({ filename: entry, minify: true, visitor, resolver });
+    const outFile = path.join(OUT_DIR, 'css', path.relative('assets/css', entry));
+    await mkdir(path.dirname(outFile), { recursive: true });
+    await writeFile(outFile, code);
+    console.log(`${outFile}: ${code.length} bytes`);
+  }
+}
+
+async function buildJs() {
+  const bundle = await readFile(require.resolve('bootstrap/dist/js/bootstrap.bundle.min.js'), 'utf8');
+  // The source map isn't shipped; collectstatic's manifest storage fails on references to missing files
+  const code = bundle.replace(/\n\/\/# sourceMappingURL=.*\s*$/, '\n');
+  await mkdir(`${OUT_DIR}/js`, { recursive: true });
+  await writeFile(`${OUT_DIR}/js/main.js`, code);
+  console.log(`${OUT_DIR}/js/main.js: ${code.length} bytes`);
+}
+
+await rm(OUT_DIR, { recursive: true, force: true });
+await Promise.all([buildCss(), buildJs()]);
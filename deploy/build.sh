@@ -0,0 +1,10 @@
+#!/usr/bin/env bash
+# Build step for a deploy (e.g. the Render build command): Python and npm dependencies,
+# the front-end bundles (assets/ -> static/dist/), then the hashed static files and their
+# manifest. Run from the repository root.
+set -euo pipefail
+
+pip install -r requirements.txt
+npm ci --no-audit --no-fund
+npm run build
+python manage.py collectstatic --no-input
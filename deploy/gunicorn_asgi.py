@@ -0,0 +1,31 @@
+"""
+gunicorn config for serving PhoneIndex over ASGI with uvicorn workers:
+
+    gunicorn phoneindex.asgi:application -c deploy/gunicorn_asgi.py
+
+gunicorn manages the processes (restarts, graceful reloads), each worker runs a
+uvicorn event loop, so async views and the SSE stream don't hold a thread per request.
+Preloading, warm-up and recycling are the same as in deploy/gunicorn_conf.py.
+
+Set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all workers (phoneindex/metrics.py).
+"""
+import os
+
+# The async-native views are only routed when this is on (see ASYNC_VIEWS in settings.py)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+# Requests run their queries on a new thread each, so borrow from a per-process pool (see settings.py)
+os.environ.setdefault('DB_CONNECTIONS', 'pool')
+
+from deploy.gunicorn_conf import (  # noqa: E402 (after the environment defaults above)
+    WORKER_MEMORY_MB, accesslog, available_cpus, available_memory_mb, bind, child_exit, errorlog,
+    graceful_timeout, max_requests, max_requests_jitter, post_worker_init, preload_app, timeout, when_ready,
+)
+
+worker_class = 'uvicorn_worker.UvicornWorker'
+# An event loop per CPU is enough concurrency; memory still caps the count
+workers = int(os.environ.get('WEB_CONCURRENCY', max(1, min(
+    available_cpus(), (available_memory_mb() - 256) // WORKER_MEMORY_MB,
+))))
+
+# Idle keep-alive connections (and open SSE streams) are cheap on an event loop
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
@@ -0,0 +1,162 @@
+"""
+Production gunicorn config for serving PhoneIndex over WSGI:
+
+    gunicorn phoneindex.wsgi:application -c deploy/gunicorn_conf.py
+
+(deploy/gunicorn_asgi.py builds on it for ASGI.)
+
+- The app is preloaded in the master, which then warms the URL resolver and the
+  template cache (ops.warmup.warm_before_fork) before forking, so every worker starts
+  with Django set up and shares those pages copy-on-write. Each worker then opens its
+  database connections and reads the stolen-IMEI index (ops.warmup.warm_worker) before
+  it accepts requests.
+- Worker class and count come from the CPUs and memory available to the container
+  (cgroup limits first): 2 x CPUs + 1 request slots, as processes while memory allows
+  GUNICORN_WORKER_MEMORY_MB each, the rest as gthread threads.
+- Workers are recycled gracefully (they finish their current requests first) after
+  GUNICORN_MAX_REQUESTS requests, with jitter so they don't all restart together, or
+  as soon as their RSS passes GUNICORN_MAX_WORKER_MEMORY_MB.
+
+Every value can be overridden with the environment variables below, or on the command
+line. `python manage.py bench_warm_start` measures the time to the first good response
+after a (re)start with this config.
+
+Set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all workers (phoneindex/metrics.py).
+"""
+import math
+import os
+import random
+import signal
+import threading
+import time
+
+import psutil
+
+
+def _flag(name, default):
+    return os.environ.get(name, default) == 'True'
+
+
+def available_cpus():
+    """CPUs this process may use: the cgroup quota if there is one, else the CPU affinity."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as limits: # cgroup v2, e.g. "200000 100000" or "max 100000"
+            quota, period = limits.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def available_memory_mb():
+    """Memory this process may use: the cgroup limit if there is one, else the machine's memory."""
+    memory = psutil.virtual_memory().total
+    try:
+        with open('/sys/fs/cgroup/memory.max') as limit: # cgroup v2, "max" when unlimited
+            value = limit.read().strip()
+        if value != 'max':
+            memory = min(memory, int(value))
+    except (OSError, ValueError):
+        pass
+    return memory // (1024 * 1024)
+
+
+def size_workers(cpus, memory_mb, worker_memory_mb, reserved_mb=256):
+    """(worker class, workers, threads) for 2 x CPUs + 1 request slots within the memory budget."""
+    slots = 2 * cpus + 1
+    workers = max(1, min(slots, (memory_mb - reserved_mb) // worker_memory_mb))
+    threads = math.ceil(slots / workers)
+    return ('gthread' if threads > 1 else 'sync'), workers, threads
+
+
+# --- Server socket and workers ---
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+WORKER_MEMORY_MB = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', '200')) # Expected RSS of one worker
+_worker_class, _workers, _threads = size_workers(available_cpus(), available_memory_mb(), WORKER_MEMORY_MB)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', _worker_class)
+workers = int(os.environ.get('WEB_CONCURRENCY', _workers))
+threads = int(os.environ.get('GUNICORN_THREADS', _threads if worker_class == 'gthread' else 1))
+
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+# --- Preloading and warm-up ---
+
+preload_app = _flag('GUNICORN_PRELOAD', 'True')
+WARMUP = _flag('GUNICORN_WARMUP', 'True')
+
+# --- Recycling ---
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+MAX_WORKER_MEMORY_MB = int(os.environ.get('GUNICORN_MAX_WORKER_MEMORY_MB', str(WORKER_MEMORY_MB * 2))) # 0 disables
+MEMORY_CHECK_SECONDS = 10
+
+# Samples left over from a previous run would be added to this run's counters. Done here rather than
+# in on_starting, which runs after the app (and prometheus_client, which needs the directory) has been
+# preloaded into the master. Only once per master: a reload (HUP) reads this file again while workers run.
+_multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if _multiproc_dir and not os.environ.get('PHONEINDEX_MULTIPROC_DIR_READY'):
+    os.makedirs(_multiproc_dir, exist_ok=True)
+    for _name in os.listdir(_multiproc_dir):
+        if _name.endswith('.db'):
+            os.remove(os.path.join(_multiproc_dir, _name))
+    os.environ['PHONEINDEX_MULTIPROC_DIR_READY'] = '1'
+
+
+# --- Hooks ---
+
+def when_ready(server):
+    server.log.info("Serving with %d %s worker(s) x %d thread(s)", server.cfg.workers,
+                    server.cfg.worker_class_str, server.cfg.threads)
+    if WARMUP and server.cfg.preload_app:
+        from ops.warmup import warm_before_fork
+        for step, seconds in warm_before_fork().items():
+            server.log.info("Warmed %s in %.1f ms", step, seconds * 1000)
+
+
+def post_worker_init(worker):
+    if WARMUP:
+        from ops.warmup import precompile_templates, warm_url_resolver, warm_worker
+        if not worker.cfg.preload_app: # Otherwise done once in the master
+            warm_url_resolver()
+            precompile_templates()
+        timings, errors = warm_worker()
+        for step, seconds in timings.items():
+            worker.log.info("Warmed %s in %.1f ms", step, seconds * 1000)
+        for step, error in errors.items():
+            worker.log.error("Could not warm %s: %s", step, error)
+    if MAX_WORKER_MEMORY_MB:
+        _start_memory_watchdog(worker)
+
+
+def _start_memory_watchdog(worker):
+    # Each worker gets a slightly different limit, so workers that grow alike don't all restart at once
+    limit = MAX_WORKER_MEMORY_MB * 1024 * 1024 * random.uniform(0.9, 1.0)
+    process = psutil.Process()
+
+    def watch():
+        while True:
+            time.sleep(MEMORY_CHECK_SECONDS)
+            rss = process.memory_info().rss
+            if rss > limit:
+                worker.log.warning("Worker %s uses %d MB, recycling it after its current requests",
+                                   worker.pid, rss // (1024 * 1024))
+                os.kill(os.getpid(), signal.SIGTERM) # Graceful exit; the master starts a replacement
+                return
+
+    threading.Thread(target=watch, name='memory-watchdog', daemon=True).start()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -3,6 +3,7 @@ from .models import RegisteredDevice,TheftReport
 
 from django.contrib import admin
 from .models import RegisteredDevice, TheftReport # Import TheftReport
+from . import search
 
 # Inline Admin for TheftReport to show on RegisteredDevice page
 class TheftReportInline(admin.StackedInline): # Or admin.TabularInline for a more compact view
@@ -27,7 +28,9 @@ class TheftReportAdmin(admin.ModelAdmin):
         'reported_at'
     )
     list_filter = ('status', 'region_of_theft','date_time_of_theft', 'reported_at')
-    search_fields = ('case_id', 'device__imei', 'device__make', 'device__model_name', 'last_known_location')
+    # Exact matches on the identifiers; the free-text fields (location, circumstances, details)
+    # go through the full-text index in get_search_results instead of LIKE '%...%' scans.
+    search_fields = ('=case_id', '=device__imei', 'device__make', 'device__model_name')
     readonly_fields = ('case_id', 'reported_at', 'last_updated') # Case ID is auto-generated
 
     # Fields to display in the form for adding/editing a TheftReport directly
@@ -52,6 +55,15 @@ class TheftReportAdmin(admin.ModelAdmin):
             return f"{obj.device.make} {obj.device.model_name} ({obj.device.imei})"
         return "N/A"
     device_info.short_description = 'Associated Device'
+
+    def get_search_results(self, request, queryset, search_term):
+        filtered_queryset = queryset # Already narrowed by the changelist filters
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            ids = [pk for pk, _rank in search.ranked_ids('theft', search_term, limit=search.MAX_LIMIT)]
+            if ids:
+                queryset |= filtered_queryset.filter(pk__in=ids)
+        return queryset, may_have_duplicates
     # autocomplete_fields = ['device'] # If you have many devices
 
 @admin.register(RegisteredDevice)
@@ -95,4 +107,45 @@ class RegisteredDeviceAdmin(admin.ModelAdmin):
 
     # If you want to add a device directly in admin, owner field will be a dropdown.
     # Ensure your CustomUserAdmin has search_fields = ['email', 'first_name', 'last_name']
-    # for autocomplete_fields to work well.
\ No newline at end of file
+    # for autocomplete_fields to work well.
+
+# --- PARTNER WEBHOOKS ---
+from .models import WebhookSubscription, WebhookDelivery
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'url', 'event_types', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'url')
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('event', 'subscription', 'status', 'attempts', 'response_status', 'latency_ms', 'next_attempt_at', 'delivered_at')
+    list_filter = ('status', 'subscription')
+    list_select_related = ('event', 'subscription')
+    readonly_fields = ('subscription', 'event', 'attempts', 'response_status', 'latency_ms', 'last_error', 'delivered_at')
+
+# --- ARCHIVE OF RESOLVED CASES (filled by `manage.py archive_reports`, see devices/archive.py) ---
+from .models import ArchivedTheftReport, ArchivedFoundReport
+
+class ArchiveAdmin(admin.ModelAdmin):
+    """Read-only: archived rows are history, they are only ever added by the archiver."""
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedTheftReport)
+class ArchivedTheftReportAdmin(ArchiveAdmin):
+    list_display = ('case_id', 'region_of_theft', 'device', 'status', 'reported_at', 'last_updated', 'archived_at')
+    list_filter = ('status', 'region_of_theft', 'archived_at')
+    list_select_related = ('device__owner',)
+    search_fields = ('=case_id', '=device__imei', 'device__make', 'device__model_name')
+
+@admin.register(ArchivedFoundReport)
+class ArchivedFoundReportAdmin(ArchiveAdmin):
+    list_display = ('id', 'theft_report', 'matched_device_direct', 'date_found', 'device_condition', 'reported_at', 'archived_at')
+    list_filter = ('device_condition', 'is_processed', 'archived_at')
+    list_select_related = ('theft_report', 'matched_device_direct__owner')
+    search_fields = ('=case_id_provided', '=imei_provided', '=theft_report__case_id')
@@ -0,0 +1,89 @@
+"""
+JSON API for machine clients and the site's own scripts.
+
+All views are async and use the async ORM (see devices/lookups.py), so under ASGI
+they run entirely on the event loop. They are read-only, don't use the session and
+authenticate with API tokens (devices/api_auth.py). Requests under /api/ skip most of
+the middleware stack, see phoneindex/routing.py.
+"""
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from .models import RegisteredDevice, validate_imei, validate_imei_luhn
+from .partial_imei import normalize_pattern, luhn_completions
+from .api_auth import api_token_required
+from phoneindex import metrics
+from . import lookups
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _verification_payload(imei, device):
+    result = lookups.verification_result(device)
+    payload = {
+        'imei': imei,
+        'status': result['verification_status'],
+        'message': result.get('message', ''),
+    }
+    if 'device_info' in result:
+        payload['device'] = result['device_info']
+    if 'theft_report_info' in result:
+        report_info = dict(result['theft_report_info'])
+        if report_info.get('date_reported'):
+            report_info['date_reported'] = report_info['date_reported'].isoformat()
+        payload['theft_report'] = report_info
+    return payload
+
+
+@require_GET
+@api_token_required
+async def verify_imei(request, imei):
+    """GET /api/verify/<imei>/ -> {"imei", "status": STOLEN|CLEAN|NOT_IN_OUR_REGISTRY, ...}"""
+    try:
+        validate_imei(imei)
+        validate_imei_luhn(imei)
+    except ValidationError as exc:
+        return _error(' '.join(exc.messages))
+    device = await lookups.alookup_device_for_verification(imei)
+    payload = _verification_payload(imei, device)
+    metrics.record_verification('api', payload['status'])
+    return JsonResponse(payload)
+
+
+@require_GET
+@api_token_required
+async def partial_imei_candidates(request):
+    """GET /api/partial-imei/?pattern=35209900176?481 -> stolen devices matching the pattern."""
+    try:
+        pattern = normalize_pattern(request.GET.get('pattern', ''))
+    except ValidationError as exc:
+        return _error(' '.join(exc.messages))
+    devices = RegisteredDevice.objects.filter(
+        imei__in=list(luhn_completions(pattern)),
+        status=RegisteredDevice.STATUS_STOLEN,
+    ).select_related('theft_report')
+    candidates = []
+    async for device in devices:
+        theft_report = getattr(device, 'theft_report', None)
+        candidates.append({
+            'imei': device.imei,
+            'make': device.make,
+            'model_name': device.model_name,
+            'color': device.color,
+            'case_id': theft_report.case_id if theft_report else None,
+        })
+    return JsonResponse({'pattern': pattern, 'candidates': candidates})
+
+
+@require_GET
+@api_token_required
+async def found_prefill(request):
+    """GET /api/found-prefill/?case_id=...&imei=... -> pre-fill values for the found report form."""
+    case_id = request.GET.get('case_id') or None
+    imei = request.GET.get('imei') or None
+    if not (case_id or imei):
+        return _error('Provide case_id and/or imei.')
+    return JsonResponse(await lookups.afound_prefill(case_id, imei))
@@ -0,0 +1,11 @@
+from django.urls import path
+from phoneindex.replicas import replica_reads
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('verify/<str:imei>/', replica_reads(api.verify_imei), name='verify_imei'),
+    path('partial-imei/', replica_reads(api.partial_imei_candidates), name='partial_imei_candidates'),
+    path('found-prefill/', replica_reads(api.found_prefill), name='found_prefill'),
+]
@@ -0,0 +1,139 @@
+"""
+Archiving of resolved theft reports and old found reports.
+
+The verify, matching and duplicate lookups only ever need open cases and recent
+found reports, but resolved ones used to stay in the same tables forever.
+`python manage.py archive_reports` moves them to ArchivedTheftReport and
+ArchivedFoundReport, in batches:
+
+- a theft report that is no longer ACTIVE and hasn't changed for
+  THEFT_REPORT_ARCHIVE_AFTER_DAYS (its last update is normally its resolution),
+  together with all its found reports, whatever their age;
+- a processed found report (matched to a registered device) without a case, older
+  than FOUND_REPORT_ARCHIVE_AFTER_DAYS.
+
+A cluster root can be archived while some of its duplicates stay (they are newer,
+or belong to another case); the earliest of those becomes the cluster's root.
+
+Archived rows keep their primary keys. The owner's case history and the archived
+detail pages read them from there (see views.py), and the old detail URLs redirect
+to those pages, so links in notifications keep working. Staff see them in the admin.
+
+Each batch is one transaction that copies the rows and deletes the originals. On
+PostgreSQL the batch's cases are locked with SKIP LOCKED, so a case being updated
+at that moment is left for the next run. On SQLite the batch takes the write lock
+first (devices/locking.py) and waits for other writers.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import locking
+from .models import ArchivedFoundReport, ArchivedTheftReport, FoundReport, TheftReport
+
+
+def archivable_theft_reports(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.THEFT_REPORT_ARCHIVE_AFTER_DAYS)
+    return TheftReport.objects.exclude(status=TheftReport.REPORT_STATUS_ACTIVE).filter(last_updated__lt=cutoff)
+
+
+def archivable_found_reports(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.FOUND_REPORT_ARCHIVE_AFTER_DAYS)
+    return FoundReport.objects.filter(theft_report__isnull=True, is_processed=True, reported_at__lt=cutoff)
+
+
+def _copy(instance, archive_model, **extra):
+    """An unsaved archive row with the values of every column the two models share."""
+    attnames = {field.attname for field in instance._meta.concrete_fields}
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in archive_model._meta.concrete_fields if field.attname in attnames
+    }
+    return archive_model(**values, **extra)
+
+
+def _repoint_duplicates(found_reports):
+    """
+    Keeps the clusters (see duplicates.py) of archived roots whole: deleting a root would
+    SET_NULL its remaining duplicates, each then a root of its own that was never notified,
+    so the owner would be notified again. The earliest remaining duplicate becomes the
+    root instead, the others point at it, and it takes over the cluster's notification time.
+    """
+    archived = {report.pk for report in found_reports}
+    notified_at = {}
+    for report in found_reports:
+        root_pk = report.duplicate_of_id or report.pk
+        if report.owner_notified_at and (root_pk not in notified_at or report.owner_notified_at > notified_at[root_pk]):
+            notified_at[root_pk] = report.owner_notified_at
+    remaining = (FoundReport.objects
+                 .filter(duplicate_of_id__in=[report.pk for report in found_reports if report.duplicate_of_id is None])
+                 .exclude(pk__in=archived).order_by('duplicate_of_id', 'reported_at', 'pk'))
+    new_roots = {}
+    for duplicate in remaining:
+        if duplicate.duplicate_of_id in new_roots:
+            continue
+        new_roots[duplicate.duplicate_of_id] = duplicate.pk
+        FoundReport.objects.filter(pk=duplicate.pk).update(
+            duplicate_of=None, owner_notified_at=duplicate.owner_notified_at or notified_at.get(duplicate.duplicate_of_id),
+        )
+    for old_root_pk, new_root_pk in new_roots.items():
+        FoundReport.objects.filter(duplicate_of_id=old_root_pk).exclude(pk__in=archived).update(duplicate_of_id=new_root_pk)
+
+
+def _archive_found_reports(found_reports):
+    ArchivedFoundReport.objects.bulk_create(
+        [_copy(report, ArchivedFoundReport, duplicate_of_pk=report.duplicate_of_id) for report in found_reports]
+    )
+    _repoint_duplicates(found_reports)
+    FoundReport.objects.filter(pk__in=[report.pk for report in found_reports]).delete()
+
+
+def _lock(queryset):
+    if connection.features.has_select_for_update_skip_locked:
+        return queryset.select_for_update(skip_locked=True)
+    # SQLite: the batch waits for other writers instead of failing when one commits mid-batch
+    return locking.for_update(queryset)
+
+
+def archive_theft_reports(batch_size=500, now=None, progress=None):
+    """Archives resolved cases and their found reports. Returns (cases archived, found reports archived)."""
+    now = now or timezone.now()
+    cases = found = 0
+    while True:
+        with transaction.atomic():
+            reports = list(_lock(archivable_theft_reports(now).order_by('pk'))[:batch_size])
+            if not reports:
+                break
+            pks = [report.pk for report in reports]
+            found_reports = list(FoundReport.objects.filter(theft_report_id__in=pks))
+            ArchivedTheftReport.objects.bulk_create([_copy(report, ArchivedTheftReport) for report in reports])
+            if found_reports:
+                _archive_found_reports(found_reports)
+            TheftReport.objects.filter(pk__in=pks).delete()
+        cases += len(reports)
+        found += len(found_reports)
+        if progress:
+            progress(cases, found)
+        if len(reports) < batch_size:
+            break
+    return cases, found
+
+
+def archive_found_reports(batch_size=500, now=None, progress=None):
+    """Archives old processed found reports that aren't linked to a case. Returns the number archived."""
+    now = now or timezone.now()
+    archived = 0
+    while True:
+        with transaction.atomic():
+            found_reports = list(_lock(archivable_found_reports(now).order_by('pk'))[:batch_size])
+            if not found_reports:
+                break
+            _archive_found_reports(found_reports)
+        archived += len(found_reports)
+        if progress:
+            progress(archived)
+        if len(found_reports) < batch_size:
+            break
+    return archived
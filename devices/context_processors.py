@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def live_notifications(request):
+    """Whether base.html opens the owner's notification stream (see LIVE_NOTIFICATIONS in settings.py)."""
+    return {'live_notifications': settings.LIVE_NOTIFICATIONS}
@@ -0,0 +1,198 @@
+"""
+Near-duplicate detection for found reports.
+
+Finders often submit the same find several times (a retry, a second visit, a
+friend reporting it too). Every new report is compared with the roots of the
+existing clusters (reports with duplicate_of=None) and joins the first one that
+describes the same find:
+
+- same identity: the same matched device or theft report, or the same IMEI or
+  case ID provided, reported within FOUND_DUPLICATE_WINDOW_DAYS;
+- similar find: found within FOUND_DUPLICATE_DATE_WINDOW_HOURS of each other, with
+  descriptions and locations sharing at least FOUND_DUPLICATE_MIN_SIMILARITY of
+  their words (Jaccard), and no conflicting IMEI or matched device.
+
+Candidates are fetched through indexed columns only (the device and theft report
+foreign keys, imei_provided/case_id_provided, date_found), so the check costs a
+couple of index lookups whatever the size of the table; the text similarity is
+computed in Python over those few candidates. A report matched to a device only
+joins a cluster matched to the same device, and the owner is notified once per
+cluster, by whichever matched report comes first.
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FoundReport
+
+MAX_SIMILAR_CANDIDATES = 50 # Reports found around the same time that are compared by text
+_WORD = re.compile(r'\w{2,}')
+STOPWORDS = frozenset('the and with near from was has have for its this that device phone found'.split())
+
+
+def _window_days():
+    return timedelta(days=getattr(settings, 'FOUND_DUPLICATE_WINDOW_DAYS', 7))
+
+
+def _date_window():
+    return timedelta(hours=getattr(settings, 'FOUND_DUPLICATE_DATE_WINDOW_HOURS', 48))
+
+
+def _min_similarity():
+    return getattr(settings, 'FOUND_DUPLICATE_MIN_SIMILARITY', 0.5)
+
+
+def words(text):
+    return {word for word in _WORD.findall((text or '').lower()) if word not in STOPWORDS}
+
+
+def similarity(a, b):
+    """Share of distinct words two texts have in common (Jaccard index, 0 to 1)."""
+    words_a, words_b = words(a), words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def _conflicting(report, other):
+    """True if the two reports are known to be about different devices."""
+    if report.imei_provided and other.imei_provided and report.imei_provided != other.imei_provided:
+        return True
+    if (report.matched_device_direct_id and other.matched_device_direct_id
+            and report.matched_device_direct_id != other.matched_device_direct_id):
+        return True
+    return False
+
+
+def _similar(report, other):
+    if _conflicting(report, other):
+        return False
+    threshold = _min_similarity()
+    if similarity(report.location_found, other.location_found) < threshold:
+        return False
+    if report.device_description_provided and other.device_description_provided:
+        return similarity(report.device_description_provided, other.device_description_provided) >= threshold
+    return True # Nothing to compare the description with; same place and time is enough
+
+
+def find_cluster_root(report, reference=None):
+    """
+    Returns the root of the cluster `report` belongs to, or None if it starts a new one.
+    Only reports submitted before `reference` (default: the report's own submission
+    time, or now for an unsaved report) are considered.
+    """
+    reference = reference or report.reported_at or timezone.now()
+    roots = FoundReport.objects.filter(
+        duplicate_of__isnull=True,
+        reported_at__lte=reference,
+        reported_at__gte=reference - _window_days(),
+    )
+    if report.pk:
+        # Strictly earlier in submission order, so two reports can never be each other's root
+        roots = roots.filter(Q(reported_at__lt=reference) | Q(reported_at=reference, pk__lt=report.pk))
+    if report.matched_device_direct_id:
+        # A matched report only joins a cluster matched to the same device: under a root without the
+        # match (e.g. a description-only report) the owner would never hear of it
+        roots = roots.filter(matched_device_direct_id=report.matched_device_direct_id)
+
+    identity = Q()
+    if report.matched_device_direct_id:
+        identity |= Q(matched_device_direct_id=report.matched_device_direct_id)
+    if report.theft_report_id:
+        identity |= Q(theft_report_id=report.theft_report_id)
+    if report.imei_provided:
+        identity |= Q(imei_provided=report.imei_provided)
+    if report.case_id_provided:
+        identity |= Q(case_id_provided=report.case_id_provided)
+    if identity:
+        root = roots.filter(identity).order_by('reported_at', 'pk').first()
+        if root is not None:
+            return root
+
+    if not report.date_found:
+        return None
+    window = _date_window()
+    candidates = roots.filter(
+        date_found__range=(report.date_found - window, report.date_found + window),
+    ).order_by('reported_at', 'pk')[:MAX_SIMILAR_CANDIDATES]
+    return next((candidate for candidate in candidates if _similar(report, candidate)), None)
+
+
+def owner_already_notified(root):
+    """True if the owner was notified for any report of the cluster rooted at `root`."""
+    return bool(root.owner_notified_at) or root.duplicates.filter(owner_notified_at__isnull=False).exists()
+
+
+# --- Batch clustering of existing reports (manage.py cluster_found_reports) ---
+
+def cluster_existing(batch_size=500, progress=None):
+    """
+    Assigns every found report without a cluster to the cluster of an earlier report,
+    in submission order, so the oldest report of each find becomes its root.
+    Returns (reports examined, reports attached as duplicates).
+    """
+    examined = 0
+    assigned = {} # pk -> root pk for every report attached in this run
+    queryset = FoundReport.objects.filter(duplicate_of__isnull=True).order_by('reported_at', 'pk')
+    last = None
+    while True:
+        # Keyset pagination rather than a long-lived cursor, since each batch writes to the same table
+        batch = queryset
+        if last is not None:
+            batch = batch.filter(Q(reported_at__gt=last.reported_at) | Q(reported_at=last.reported_at, pk__gt=last.pk))
+        batch = list(batch[:batch_size])
+        if not batch:
+            break
+        updates = []
+        for report in batch:
+            root = find_cluster_root(report)
+            if root is not None:
+                # The root found may itself have been attached earlier in this run
+                root_pk = assigned.get(root.pk, root.pk)
+                assigned[report.pk] = root_pk
+                updates.append(FoundReport(pk=report.pk, duplicate_of_id=root_pk))
+        FoundReport.objects.bulk_update(updates, ['duplicate_of'])
+        examined += len(batch)
+        last = batch[-1]
+        if progress:
+            progress(examined, len(assigned))
+    return examined, len(assigned)
+
+
+def unnotified_clusters():
+    """
+    Roots of clusters with a matched device, on the root or on one of its duplicates, whose
+    owner hasn't been told about any of their reports.
+    """
+    return (
+        FoundReport.objects.filter(duplicate_of__isnull=True, owner_notified_at__isnull=True)
+        .filter(
+            Q(matched_device_direct__owner__isnull=False) | Q(duplicates__matched_device_direct__owner__isnull=False)
+        )
+        .exclude(duplicates__owner_notified_at__isnull=False)
+        .distinct()
+        .order_by('reported_at', 'pk')
+    )
+
+
+def cluster_match(root):
+    """The report of a cluster the owner is told about: the root if it is matched, else its first matched duplicate."""
+    members = FoundReport.objects.filter(Q(pk=root.pk) | Q(duplicate_of=root), matched_device_direct__isnull=False)
+    return (members.select_related('theft_report', 'matched_device_direct__owner')
+            .order_by('reported_at', 'pk').first())
+
+
+def notify_clusters(action_url):
+    """Sends one notification per unnotified cluster. Returns (clusters notified, emails that failed)."""
+    from . import notifications
+
+    notified = failed = 0
+    for root in unnotified_clusters().iterator(chunk_size=200):
+        report = cluster_match(root)
+        if not notifications.notify_owner_of_find(report, report.theft_report, report.matched_device_direct, action_url):
+            failed += 1
+        notified += 1
+    return notified, failed
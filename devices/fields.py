@@ -0,0 +1,95 @@
+"""
+Model fields of the devices app.
+
+IMEIField stores an IMEI as a BIGINT (8 bytes instead of a 15-character string),
+which halves the size of its indexes and makes comparisons integer comparisons,
+while the rest of the code keeps seeing the usual 15-digit string:
+
+- Python values are zero-padded strings ('012345678901234'), as read from the
+  database, in forms, templates and validators (validate_imei still applies).
+- Exact, range and __in lookups accept strings or ints and compare integers. A
+  lookup value that can't be an IMEI (e.g. unvalidated user input) matches nothing
+  instead of raising; saving one raises ValueError.
+- Text lookups (iexact, contains, startswith, ...) compare against the zero-padded
+  text, so admin searches for an IMEI or part of one keep working, leading zeros
+  included.
+"""
+import functools
+
+from django import forms
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Cast, LPad
+
+IMEI_LENGTH = 15
+NO_IMEI = -1 # Prepared value of lookups that can't match any IMEI
+TEXT_LOOKUPS = frozenset([
+    'iexact', 'contains', 'icontains', 'startswith', 'istartswith', 'endswith', 'iendswith', 'regex', 'iregex',
+])
+
+
+def imei_to_int(value):
+    """'012345678901234' -> 12345678901234; None for values that aren't up to 15 digits."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if 0 <= value < 10 ** IMEI_LENGTH else None
+    value = str(value).strip()
+    if value.isascii() and value.isdigit() and len(value) <= IMEI_LENGTH:
+        return int(value)
+    return None
+
+
+def imei_to_str(value):
+    return f'{value:0{IMEI_LENGTH}d}'
+
+
+@functools.cache
+def _padded_text_lookup(lookup_class):
+    """`lookup_class` applied to the zero-padded text of the column instead of the integer."""
+    class PaddedTextLookup(lookup_class):
+        def __init__(self, lhs, rhs):
+            padded = LPad(Cast(lhs, models.CharField(max_length=IMEI_LENGTH)), IMEI_LENGTH, Value('0'))
+            super().__init__(padded, rhs)
+    PaddedTextLookup.__name__ = f'IMEI{lookup_class.__name__}'
+    return PaddedTextLookup
+
+
+class IMEIField(models.BigIntegerField):
+    description = "IMEI (stored as a 64-bit integer, used as a 15-digit string)"
+
+    @property
+    def validators(self):
+        # No integer range validators: values are validated as strings (validate_imei)
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else imei_to_str(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return imei_to_str(value) if imei_to_int(value) is not None else str(value)
+
+    def get_prep_value(self, value):
+        if value is None or value == '':
+            return None
+        prepared = imei_to_int(value)
+        return NO_IMEI if prepared is None else prepared
+
+    def get_db_prep_save(self, value, connection):
+        if value not in (None, '') and not hasattr(value, 'as_sql') and imei_to_int(value) is None:
+            raise ValueError(f"Field '{self.name}' expected an IMEI of up to {IMEI_LENGTH} digits but got {value!r}.")
+        return super().get_db_prep_save(value, connection)
+
+    def get_lookup(self, lookup_name):
+        lookup = super().get_lookup(lookup_name)
+        if lookup is not None and lookup_name in TEXT_LOOKUPS:
+            return _padded_text_lookup(lookup)
+        return lookup
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return '' if value is None else str(value)
+
+    def formfield(self, **kwargs):
+        # A text input like any other IMEI field, not a number input (which would drop leading zeros)
+        return models.Field.formfield(self, **{'form_class': forms.CharField, 'max_length': IMEI_LENGTH, **kwargs})
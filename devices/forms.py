@@ -1,6 +1,9 @@
+import uuid
+
 from django import forms
 from django.utils import timezone
 from .models import RegisteredDevice, validate_imei,TheftReport,FoundReport,validate_imei_luhn # Import validate_imei if you want to re-apply it here or rely on model validation
+from .partial_imei import normalize_pattern, MAX_UNKNOWN_DIGITS
 
 class DeviceRegistrationForm(forms.ModelForm):
     # If you want to use the exact same IMEI validation as the model,
@@ -69,6 +72,9 @@ class TheftReportForm(forms.ModelForm):
     )
     # is_time_approximate is a BooleanField, will render as a checkbox by default.
     # We can customize its label or widget if needed.
+    # --- NEW: Idempotency key, generated when the form is rendered and stored on the report ---
+    # Resubmitting the same rendered form (double click, retry, back button) returns the case created first
+    submission_key = forms.UUIDField(widget=forms.HiddenInput, required=False, initial=uuid.uuid4)
     
     class Meta:
         model = TheftReport
@@ -305,4 +311,68 @@ class FoundDeviceForm(forms.ModelForm):
             self.add_error(None, forms.ValidationError(
                 "Please provide at least one identifier for the device: Case ID, IMEI, or a Device Description."
             ))
-        return cleaned_data
\ No newline at end of file
+        # Put the pre-filled values back so the view (and form.save()) see them
+        cleaned_data['case_id_provided'] = case_id
+        cleaned_data['imei_provided'] = imei
+        cleaned_data['device_description_provided'] = description
+        return cleaned_data
+
+# --- STAFF REPORT SEARCH FORM ---
+class ReportSearchForm(forms.Form):
+    KIND_ALL = 'all'
+    KIND_THEFT = 'theft'
+    KIND_FOUND = 'found'
+    KIND_CHOICES = [
+        (KIND_ALL, 'Theft and found reports'),
+        (KIND_THEFT, 'Theft reports only'),
+        (KIND_FOUND, 'Found reports only'),
+    ]
+
+    q = forms.CharField(
+        label='Search',
+        max_length=200,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control form-control-lg',
+            'placeholder': 'e.g., taxi Mvog-Mbi, market Bonamoussadi'
+        }),
+        help_text='Searches theft locations, circumstances and details, and found report locations.'
+    )
+    kind = forms.ChoiceField(
+        label='Reports',
+        choices=KIND_CHOICES,
+        required=False,
+        initial=KIND_ALL,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def get_kinds(self):
+        kind = self.cleaned_data.get('kind') or self.KIND_ALL
+        if kind == self.KIND_ALL:
+            return (self.KIND_THEFT, self.KIND_FOUND)
+        return (kind,)
+
+
+# --- PARTIAL IMEI SEARCH FORM (FINDERS WHO CAN ONLY READ PART OF THE IMEI) ---
+class PartialIMEISearchForm(forms.Form):
+    imei_pattern = forms.CharField(
+        label='IMEI (use ? for unreadable digits)',
+        max_length=40, # Leaves room for spaces/dashes between digit groups
+        widget=forms.TextInput(attrs={
+            'class': 'form-control form-control-lg',
+            'placeholder': 'e.g., 35209900176?481'
+        }),
+        help_text=f'Type all 15 positions. Replace each digit you cannot read with ? (at most {MAX_UNKNOWN_DIGITS}).'
+    )
+    device_description = forms.CharField(
+        label='Device Description (Optional)',
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'e.g., black Samsung Galaxy'
+        }),
+        help_text='Helps us rank the possible matches.'
+    )
+
+    def clean_imei_pattern(self):
+        return normalize_pattern(self.cleaned_data.get('imei_pattern'))
@@ -0,0 +1,95 @@
+"""
+Fragment caching for the device cards (My Devices) and case cards (My Cases).
+
+Each card's HTML is cached under a key built from the rows it displays, e.g. the
+device's pk and last_updated plus its theft report's pk and last_updated. Saving
+either model bumps its auto_now timestamp and therefore the key, and a found report
+being added or removed touches its theft report (see signals.py), so a stale card is
+never served and there is nothing to delete. Because the key comes from the database,
+this also holds when every server process has its own local-memory cache.
+
+The list views fetch all cards of a page with one cache.get_many(), then prefetch
+found reports only for the cards that missed. Warm page loads therefore skip both the
+card rendering and the per-card found report queries.
+
+Hit/miss counts are kept in the cache (see `python manage.py card_cache_stats`) and
+exported to /metrics as phoneindex_cache_requests_total{cache="card_<kind>"}.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+from phoneindex import metrics
+
+KIND_DEVICE = 'device'
+KIND_CASE = 'case'
+KINDS = (KIND_DEVICE, KIND_CASE)
+
+STATS_PREFIX = 'card_stats'
+
+
+def _stamp(value):
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+
+def card_key(kind, obj):
+    if kind == KIND_DEVICE:
+        theft_report = getattr(obj, 'theft_report', None)
+        parts = [obj.pk, _stamp(obj.last_updated)]
+        parts += [theft_report.pk, _stamp(theft_report.last_updated)] if theft_report else ['-', 0]
+    elif kind == KIND_CASE:
+        parts = [obj.pk, _stamp(obj.last_updated), _stamp(obj.device.last_updated)]
+    else:
+        raise ValueError(f"Unknown card kind: {kind!r}")
+    return ':'.join(str(part) for part in ['card', kind, get_language() or '-', *parts])
+
+
+def load_cards(kind, objects):
+    """
+    Fetches the cached cards for `objects` in one round-trip.
+    Returns ({key: html} for the hits, [objects that missed]).
+    """
+    keys = {obj: card_key(kind, obj) for obj in objects}
+    cached = cache.get_many(keys.values()) if keys else {}
+    missed = [obj for obj, key in keys.items() if key not in cached]
+    record(kind, hits=len(cached), misses=0)
+    return cached, missed
+
+
+def store_card(key, html):
+    cache.set(key, html, getattr(settings, 'CARD_FRAGMENT_CACHE_SECONDS', 86400))
+
+
+# --- Hit/miss counters ---
+
+def _incr(key, amount):
+    try:
+        cache.incr(key, amount)
+    except ValueError: # Counter doesn't exist yet (or was evicted)
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+def record(kind, hits=0, misses=0):
+    metrics.record_cache(f'card_{kind}', hits=hits, misses=misses)
+    if hits:
+        _incr(f'{STATS_PREFIX}:{kind}:hits', hits)
+    if misses:
+        _incr(f'{STATS_PREFIX}:{kind}:misses', misses)
+
+
+def stats():
+    """{kind: {'hits', 'misses', 'hit_ratio'}} since the counters were last reset."""
+    keys = [f'{STATS_PREFIX}:{kind}:{outcome}' for kind in KINDS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    result = {}
+    for kind in KINDS:
+        hits = values.get(f'{STATS_PREFIX}:{kind}:hits', 0)
+        misses = values.get(f'{STATS_PREFIX}:{kind}:misses', 0)
+        total = hits + misses
+        result[kind] = {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 3) if total else None}
+    return result
+
+
+def reset_stats():
+    cache.delete_many([f'{STATS_PREFIX}:{kind}:{outcome}' for kind in KINDS for outcome in ('hits', 'misses')])
@@ -0,0 +1,36 @@
+"""
+Row locks for read-then-write transactions, SQLite included.
+
+select_for_update() locks the rows a transaction is about to change, so a concurrent
+transaction waits for it instead of acting on stale rows. SQLite has no FOR UPDATE,
+and a transaction there that read first and then writes fails at once with "database
+is locked" if another one wrote in between (waiting could deadlock). On SQLite,
+for_update() therefore takes the database write lock before anything is read, with a
+no-op UPDATE that waits up to the connection's timeout for other writers.
+
+Call these first thing in the atomic block.
+"""
+from django.db import connections, router
+from django.db.models import F
+
+
+def _alias(queryset):
+    return queryset.db if queryset._db else router.db_for_write(queryset.model)
+
+
+def write_lock(model, using=None):
+    """On SQLite, takes the database write lock for the rest of the transaction; elsewhere does nothing."""
+    using = using or router.db_for_write(model)
+    if connections[using].vendor == 'sqlite':
+        # Matches no row; SQLite takes the write lock for any UPDATE
+        pk = model._meta.pk.name
+        model._base_manager.using(using).filter(pk=None).update(**{pk: F(pk)})
+
+
+def for_update(queryset, **kwargs):
+    """`queryset` locked until the end of the transaction; `kwargs` go to select_for_update()."""
+    alias = _alias(queryset)
+    if connections[alias].features.has_select_for_update:
+        return queryset.select_for_update(**kwargs).using(alias)
+    write_lock(queryset.model, using=alias)
+    return queryset.using(alias)
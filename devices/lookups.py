@@ -0,0 +1,158 @@
+"""
+Read-only lookups shared by the sync views, the async views and the JSON API.
+
+Every lookup comes in two flavours with the same result: a sync one using the
+regular ORM and an async one (prefixed with "a") using Django's async ORM methods
+(afirst, async iteration), so async views never hop to a thread for them. The
+result builders are pure functions of the fetched objects.
+"""
+from .models import RegisteredDevice, TheftReport
+
+VERIFICATION_STOLEN = 'STOLEN'
+VERIFICATION_CLEAN = 'CLEAN'
+VERIFICATION_NOT_REGISTERED = 'NOT_IN_OUR_REGISTRY'
+
+
+# --- IMEI verification ---
+
+def _device_queryset(imei):
+    # theft_report is fetched in the same query since the stolen branch always needs it
+    return RegisteredDevice.objects.select_related('theft_report').filter(imei=imei)
+
+
+def lookup_device_for_verification(imei):
+    return _device_queryset(imei).first()
+
+
+async def alookup_device_for_verification(imei):
+    return await _device_queryset(imei).afirst()
+
+
+def verification_result(device):
+    """
+    Builds the verification outcome shown to the public for a device (or None).
+    Only non-identifying device details are included, never owner data.
+    """
+    if device is None:
+        return {
+            'verification_status': VERIFICATION_NOT_REGISTERED,
+            'message': "This IMEI was not found in our device registry. This means it is not reported as stolen through our system.",
+        }
+
+    if device.status == RegisteredDevice.STATUS_STOLEN:
+        result = {
+            'verification_status': VERIFICATION_STOLEN,
+            'device_info': {
+                'make': device.make,
+                'model_name': device.model_name,
+                'color': device.color,
+                'storage_capacity': device.storage_capacity,
+            },
+        }
+        theft_report = getattr(device, 'theft_report', None)
+        if theft_report:
+            result['theft_report_info'] = {
+                'case_id': theft_report.case_id,
+                'date_reported': theft_report.reported_at,
+                'status': theft_report.get_status_display(), # Human-readable status
+            }
+        else:
+            # Shouldn't happen for a STOLEN device, but its report may have been deleted
+            result['theft_report_info'] = {'status': 'Details Unavailable'}
+        return result
+
+    if device.status in [RegisteredDevice.STATUS_NORMAL,
+                         RegisteredDevice.STATUS_RECOVERED,
+                         RegisteredDevice.STATUS_FALSE_ALARM]:
+        return {
+            'verification_status': VERIFICATION_CLEAN,
+            'message': "This device is registered in our system and is NOT currently reported as stolen.",
+        }
+    # Other statuses, treat as clean for verification purposes for now
+    return {
+        'verification_status': VERIFICATION_CLEAN,
+        'message': f"This device is registered with status: {device.get_status_display()}.",
+    }
+
+
+# --- Found report pre-fill (case ID / IMEI from the URL) ---
+
+def _theft_report_queryset(case_id):
+    return TheftReport.objects.select_related('device').filter(case_id=case_id)
+
+
+def found_prefill_result(case_id, imei, theft_report, device_by_imei):
+    """
+    Works out the pre-filled identifiers and description for the found report form.
+    `theft_report` is the report matching `case_id` (or None), `device_by_imei` the
+    device matching `imei` (or None, only needed when no case ID was given).
+    Returns a dict with any of 'case_id_provided', 'imei_provided', 'device_description_provided'.
+    """
+    prefill = {}
+    description = None
+
+    if case_id:
+        if theft_report is not None:
+            device = theft_report.device
+            description = f"Device linked to Case ID {case_id}: {device.make} {device.model_name}, {device.color}."
+            # If IMEI wasn't passed in URL but we found it via Case ID, pre-fill it too
+            if not imei and device.imei:
+                prefill['imei_provided'] = device.imei
+        else:
+            description = f"No active theft report found for Case ID {case_id}. Please describe the device you found."
+
+    # Only generate a description from the IMEI if the Case ID didn't already do it
+    if imei and not description:
+        if device_by_imei is not None:
+            device = device_by_imei
+            description = f"Device with IMEI {imei}: {device.make} {device.model_name}, {device.color}."
+            theft_report = getattr(device, 'theft_report', None)
+            # If device is stolen and has a report, and case_id wasn't provided, pre-fill it
+            if device.status == RegisteredDevice.STATUS_STOLEN and theft_report and not case_id:
+                prefill['case_id_provided'] = theft_report.case_id
+                description = f"Device linked to Case ID {theft_report.case_id} (IMEI {imei}): {device.make} {device.model_name}, {device.color}."
+        else:
+            description = f"Device with IMEI {imei} not found in our registry. Please describe the device you found."
+
+    if description:
+        prefill['device_description_provided'] = description
+    return prefill
+
+
+def found_prefill(case_id, imei):
+    theft_report = _theft_report_queryset(case_id).first() if case_id else None
+    # A case ID always produces the description, so the IMEI is only looked up without one
+    device_by_imei = _device_queryset(imei).first() if imei and not case_id else None
+    return found_prefill_result(case_id, imei, theft_report, device_by_imei)
+
+
+async def afound_prefill(case_id, imei):
+    theft_report = await _theft_report_queryset(case_id).afirst() if case_id else None
+    device_by_imei = await _device_queryset(imei).afirst() if imei and not case_id else None
+    return found_prefill_result(case_id, imei, theft_report, device_by_imei)
+
+
+# --- Found report matching (case ID, then IMEI; sync only, used when a found report is submitted) ---
+
+def match_found_report(case_id, imei):
+    """
+    Finds the theft report and device a found report refers to.
+    Returns (theft_report or None, device or None); the device's owner is loaded too.
+    """
+    if case_id:
+        # select_related fetches the device and owner needed for the notification in the same query
+        theft_report = TheftReport.objects.select_related('device__owner').filter(case_id=case_id).first()
+        if theft_report is not None:
+            return theft_report, theft_report.device
+    # No match by Case ID, or no Case ID given: try the IMEI
+    if imei:
+        return match_found_device(imei=imei)
+    return None, None
+
+
+def match_found_device(**lookup):
+    """(theft report or None, device or None) for the device matching `lookup`, e.g. imei=... or pk=..."""
+    device = RegisteredDevice.objects.select_related('owner', 'theft_report').filter(**lookup).first()
+    if device is None:
+        return None, None
+    return getattr(device, 'theft_report', None), device
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from devices import archive
+from devices.models import FoundReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves resolved theft reports (with their found reports) older than THEFT_REPORT_ARCHIVE_AFTER_DAYS "
+        "and processed found reports without a case older than FOUND_REPORT_ARCHIVE_AFTER_DAYS to the "
+        "archive tables, one batch per transaction (see devices/archive.py). Run it daily, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            cases = archive.archivable_theft_reports()
+            self.stdout.write(
+                f"Would archive {cases.count()} resolved cases with "
+                f"{FoundReport.objects.filter(theft_report__in=cases).count()} found reports, "
+                f"and {archive.archivable_found_reports().count()} found reports without a case."
+            )
+            return
+
+        def case_progress(cases, found):
+            self.stdout.write(f"  {cases} cases and {found} of their found reports archived")
+
+        def found_progress(archived):
+            self.stdout.write(f"  {archived} found reports without a case archived")
+
+        cases, found = archive.archive_theft_reports(batch_size=options['batch_size'], progress=case_progress)
+        unlinked = archive.archive_found_reports(batch_size=options['batch_size'], progress=found_progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {cases} cases with {found} found reports, and {unlinked} found reports without a case."
+        ))
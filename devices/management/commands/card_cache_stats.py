@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from devices import fragments
+
+
+class Command(BaseCommand):
+    help = "Shows hit/miss counters of the device and case card fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        if 'locmem' in settings.CACHES['default']['BACKEND'].lower():
+            self.stderr.write("The default cache is local memory: these are this process's counters only, "
+                              "not the web workers'. Configure a shared cache (CACHE_BACKEND) to see them.")
+        for kind, counts in fragments.stats().items():
+            ratio = f"{counts['hit_ratio']:.1%}" if counts['hit_ratio'] is not None else 'n/a'
+            self.stdout.write(f"{kind:<8} hits={counts['hits']:<8} misses={counts['misses']:<8} hit ratio={ratio}")
+        if options['reset']:
+            fragments.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from devices import duplicates
+from devices.models import FoundReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Groups existing found reports into clusters of the same find (see devices/duplicates.py), "
+        "the oldest report of each find being the root. With --notify, owners are then notified once "
+        "per cluster that has a matched device and hasn't notified anyone yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Dissolve all clusters first and recluster every report (e.g. after changing the thresholds).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--notify', action='store_true', help='Notify the owners of unnotified clusters.')
+        parser.add_argument('--site-url', help='Base URL for the links in notification emails, e.g. https://phoneindex.cm')
+
+    def handle(self, *args, **options):
+        if options['notify'] and not options['site_url']:
+            raise CommandError("--notify needs --site-url for the links in the emails.")
+        if options['reset']:
+            dissolved = FoundReport.objects.filter(duplicate_of__isnull=False).update(duplicate_of=None)
+            self.stdout.write(f"Dissolved {dissolved} cluster memberships.")
+
+        def progress(examined, attached):
+            self.stdout.write(f"  {examined} reports examined, {attached} attached as duplicates")
+
+        examined, attached = duplicates.cluster_existing(batch_size=options['batch_size'], progress=progress)
+        clusters = FoundReport.objects.filter(duplicate_of__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Examined {examined} reports: {attached} attached as duplicates, {clusters} clusters in total."
+        ))
+
+        if options['notify']:
+            action_url = options['site_url'].rstrip('/') + reverse('devices:user_device_list')
+            notified, failed = duplicates.notify_clusters(action_url)
+            self.stdout.write(self.style.SUCCESS(f"Notified the owners of {notified} clusters."))
+            if failed:
+                self.stdout.write(self.style.WARNING(f"{failed} notification emails could not be sent; see the log."))
+        else:
+            pending = duplicates.unnotified_clusters().count()
+            if pending:
+                self.stdout.write(f"{pending} clusters with a matched device have not notified their owner; use --notify.")
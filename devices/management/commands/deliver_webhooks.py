@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from devices import webhooks
+
+
+class Command(BaseCommand):
+    help = "Delivers pending partner webhooks (batched per subscriber, signed, retried with backoff)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the currently due deliveries and exit.')
+        parser.add_argument('--concurrency', type=int, help='Number of delivery threads (default: WEBHOOK_CONCURRENCY).')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to sleep when nothing is due.')
+
+    def handle(self, *args, **options):
+        webhooks.run_worker(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            stdout=self.stdout,
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from devices.api_auth import issue_token
+
+
+class Command(BaseCommand):
+    help = "Prints a signed API token for a machine client (sent as 'Authorization: Token <token>')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('client', help='Name identifying the client, e.g. the partner company.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(issue_token(options['client']))
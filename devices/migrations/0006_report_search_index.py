@@ -0,0 +1,50 @@
+"""
+Creates the full-text search indexes used by devices.search.
+
+PostgreSQL: generated tsvector column + GIN index on each report table.
+SQLite: FTS5 external-content table + sync triggers on each report table.
+Other backends: nothing, devices.search falls back to icontains.
+"""
+from django.db import migrations
+
+from devices import search
+
+# Frozen copy of the indexed columns at the time of this migration.
+INDEXED_TABLES = {
+    'devices_theftreport': ['last_known_location', 'circumstances', 'additional_details'],
+    'devices_foundreport': ['location_found', 'device_description_provided'],
+}
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, columns in INDEXED_TABLES.items():
+        if vendor == 'postgresql':
+            _run(schema_editor, search.postgres_schema_sql(table, columns))
+        elif vendor == 'sqlite':
+            _run(schema_editor, search.sqlite_schema_sql(table, columns))
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in INDEXED_TABLES:
+        if vendor == 'postgresql':
+            _run(schema_editor, search.postgres_drop_sql(table))
+        elif vendor == 'sqlite':
+            _run(schema_editor, search.sqlite_drop_sql(table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0005_foundreport_matched_device_direct_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-19 15:49
+
+import devices.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0006_report_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('device.stolen', 'Device reported stolen'), ('device.resolved', 'Theft case resolved')], max_length=50, verbose_name='Event Type')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Webhook Event',
+                'verbose_name_plural': 'Webhook Events',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Partner Name')),
+                ('url', models.URLField(max_length=500, verbose_name='Endpoint URL')),
+                ('secret', models.CharField(default=devices.models.generate_webhook_secret, help_text='Shared secret used to sign payloads (HMAC-SHA256).', max_length=64, verbose_name='Signing Secret')),
+                ('event_types', models.JSONField(blank=True, default=list, verbose_name='Event Types')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Webhook Subscription',
+                'verbose_name_plural': 'Webhook Subscriptions',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DELIVERED', 'Delivered'), ('FAILED', 'Failed')], default='PENDING', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Attempt At')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last Error')),
+                ('response_status', models.PositiveIntegerField(blank=True, null=True, verbose_name='Last Response Status')),
+                ('latency_ms', models.FloatField(blank=True, null=True, verbose_name='Delivery Latency (ms)')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Delivered At')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='devices.webhookevent')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='devices.webhooksubscription')),
+            ],
+            options={
+                'verbose_name': 'Webhook Delivery',
+                'verbose_name_plural': 'Webhook Deliveries',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='webhook_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('subscription', 'event'), name='unique_webhook_delivery')],
+            },
+        ),
+    ]
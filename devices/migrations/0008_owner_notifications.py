@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 15:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0007_webhooks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('DEVICE_FOUND', 'Your device may have been found'), ('STATUS', 'Case status update')], max_length=20, verbose_name='Kind')),
+                ('message', models.CharField(max_length=255, verbose_name='Message')),
+                ('url', models.CharField(blank=True, default='', max_length=255, verbose_name='Link')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='devices.registereddevice')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Owner Notification',
+                'verbose_name_plural': 'Owner Notifications',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['owner', 'id'], name='notification_owner_cursor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 16:24
+"""
+Adding a unique column makes Django rebuild the table on SQLite (create a copy, move
+the rows, drop the original), which drops the FTS5 sync triggers created in 0006.
+They are reinstalled after the rebuild, in both directions.
+"""
+from django.db import migrations, models
+
+from devices import search
+
+TABLE = 'devices_theftreport'
+# Frozen copy of the indexed columns, as in 0006.
+INDEXED_COLUMNS = ['last_known_location', 'circumstances', 'additional_details']
+
+
+def reinstall_sqlite_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in search.sqlite_drop_sql(TABLE) + search.sqlite_schema_sql(TABLE, INDEXED_COLUMNS):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0008_owner_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_sqlite_search_index),
+        migrations.AddField(
+            model_name='theftreport',
+            name='submission_key',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='Submission Key'),
+        ),
+        migrations.RunPython(reinstall_sqlite_search_index, migrations.RunPython.noop),
+    ]
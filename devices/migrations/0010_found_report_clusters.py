@@ -0,0 +1,75 @@
+# Generated by Django 5.2 on 2026-10-19 16:28
+"""
+Duplicate clustering for found reports (devices/duplicates.py).
+
+Existing reports are backfilled so that `manage.py cluster_found_reports --notify`
+doesn't notify owners again:
+- owner_notified_at: the owner was notified at submission whenever a device matched,
+  which is exactly when is_processed was set.
+- matched_device_direct: the view assigned the match to a non-existent attribute,
+  so the link was never stored; it is recovered from the linked theft report.
+
+Removing the duplicate_of foreign key rebuilds the table on SQLite, which drops the
+FTS5 sync triggers from 0006, so they are reinstalled when migrating backwards.
+"""
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+from devices import search
+
+TABLE = 'devices_foundreport'
+# Frozen copy of the indexed columns, as in 0006.
+INDEXED_COLUMNS = ['location_found', 'device_description_provided']
+
+
+def backfill(apps, schema_editor):
+    FoundReport = apps.get_model('devices', 'FoundReport')
+    TheftReport = apps.get_model('devices', 'TheftReport')
+    FoundReport.objects.filter(is_processed=True, owner_notified_at__isnull=True).update(
+        owner_notified_at=F('reported_at'),
+    )
+    FoundReport.objects.filter(theft_report__isnull=False, matched_device_direct__isnull=True).update(
+        matched_device_direct=Subquery(TheftReport.objects.filter(pk=OuterRef('theft_report')).values('device')[:1]),
+    )
+
+
+def reinstall_sqlite_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in search.sqlite_drop_sql(TABLE) + search.sqlite_schema_sql(TABLE, INDEXED_COLUMNS):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0009_theft_report_submission_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_sqlite_search_index),
+        migrations.AddField(
+            model_name='foundreport',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='First report of the same find, if this one is a duplicate.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='devices.foundreport'),
+        ),
+        migrations.AddField(
+            model_name='foundreport',
+            name='owner_notified_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Owner Notified At'),
+        ),
+        migrations.AddIndex(
+            model_name='foundreport',
+            index=models.Index(fields=['imei_provided', 'reported_at'], name='found_imei_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foundreport',
+            index=models.Index(fields=['case_id_provided', 'reported_at'], name='found_case_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foundreport',
+            index=models.Index(fields=['date_found'], name='found_date_found_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
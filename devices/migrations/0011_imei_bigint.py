@@ -0,0 +1,253 @@
+"""
+Stores RegisteredDevice.imei and FoundReport.imei_provided as BIGINT (devices.fields.IMEIField).
+
+The column is not converted in place, which would rewrite and lock the table in one
+statement. Instead:
+0. Every stored IMEI is checked first: a device IMEI that isn't 15 digits, or a found
+   report IMEI that isn't blank or up to 15 digits, stops the migration before anything
+   changes, listing the rows to fix.
+1. A nullable BIGINT column is added next to the old one, and triggers copy every
+   IMEI the running site writes into it from then on (SQLite and PostgreSQL).
+2. Existing rows are filled in chunks of BACKFILL_BATCH rows by primary key range,
+   one short transaction per chunk. The migration is non-atomic so that the chunks
+   commit as they go.
+3. In one transaction, the triggers are dropped, rows the triggers may have missed
+   are copied, and the old columns are dropped, so no write falls between the last
+   copy and the drop. The new columns are then renamed and their constraints restored.
+
+Migrating backwards runs the same steps in reverse, filling the text column back
+with zero-padded values.
+
+On SQLite, the steps that rebuild devices_foundreport drop the FTS5 sync triggers
+from 0006, so they are reinstalled at the end, in both directions.
+"""
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min, Value
+from django.db.models.functions import Cast, LPad
+
+import devices.fields
+import devices.models
+from devices import search
+
+BACKFILL_BATCH = 10_000
+DIGITS = r'^[0-9]{1,15}$'
+DEVICE_IMEI = r'^[0-9]{15}$' # Unique and NOT NULL: shorter values would collide once zero-padded
+
+FTS_TABLE = 'devices_foundreport'
+# Frozen copy of the indexed columns, as in 0006.
+FTS_COLUMNS = ['location_found', 'device_description_provided']
+
+# (model, text column, integer column)
+COLUMNS = [
+    ('RegisteredDevice', 'imei', 'imei_int'),
+    ('FoundReport', 'imei_provided', 'imei_provided_int'),
+]
+
+
+def _backfill(schema_editor, model, target, queryset, value):
+    """Sets `target` = `value` on `queryset` in primary key chunks, one transaction each."""
+    alias = schema_editor.connection.alias
+    bounds = model.objects.using(alias).aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, BACKFILL_BATCH):
+        with transaction.atomic(using=alias):
+            queryset.using(alias).filter(pk__gte=start, pk__lt=start + BACKFILL_BATCH).update(**{target: value})
+    # Rows added or changed by the running site while the chunks were copied
+    with transaction.atomic(using=alias):
+        queryset.using(alias).update(**{target: value})
+
+
+def check_imeis(apps, schema_editor):
+    """Stops the migration, before anything changes, if an IMEI can't be converted without loss."""
+    alias = schema_editor.connection.alias
+    RegisteredDevice = apps.get_model('devices', 'RegisteredDevice')
+    FoundReport = apps.get_model('devices', 'FoundReport')
+    invalid = {
+        'devices_registereddevice.imei (must be 15 digits)': RegisteredDevice.objects.using(alias).exclude(imei__regex=DEVICE_IMEI),
+        'devices_foundreport.imei_provided (must be blank or up to 15 digits)': FoundReport.objects.using(alias)
+            .exclude(imei_provided__isnull=True).exclude(imei_provided='').exclude(imei_provided__regex=DIGITS),
+    }
+    problems = []
+    for column, queryset in invalid.items():
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:20])
+        if pks:
+            problems.append(f"{column}: {queryset.count()} rows, e.g. ids {', '.join(map(str, pks))}")
+    if problems:
+        raise RuntimeError(
+            "Can't convert IMEIs to integers without losing data. Correct or clear these values, then migrate again:\n  "
+            + "\n  ".join(problems)
+        )
+
+
+def copy_text_to_int(apps, schema_editor):
+    for model_name, text_column, int_column in COLUMNS:
+        model = apps.get_model('devices', model_name)
+        pending = model.objects.filter(**{f'{int_column}__isnull': True, f'{text_column}__regex': DIGITS})
+        _backfill(schema_editor, model, int_column, pending, Cast(text_column, models.BigIntegerField()))
+
+
+def copy_int_to_text(apps, schema_editor):
+    for model_name, text_column, int_column in COLUMNS:
+        model = apps.get_model('devices', model_name)
+        pending = model.objects.filter(**{f'{text_column}__isnull': True, f'{int_column}__isnull': False})
+        padded = LPad(Cast(int_column, models.CharField(max_length=15)), 15, Value('0'))
+        _backfill(schema_editor, model, text_column, pending, padded)
+
+
+# --- Triggers copying writes of the running site into the integer columns (steps 1 to 3) ---
+
+def _sync_trigger_sql(vendor, table, text_column, int_column):
+    name = f'{table}_{int_column}_sync'
+    if vendor == 'sqlite':
+        value = (f"CASE WHEN new.{text_column} NOT GLOB '*[^0-9]*' AND length(new.{text_column}) BETWEEN 1 AND 15 "
+                 f"THEN CAST(new.{text_column} AS INTEGER) END")
+        update = f"UPDATE {table} SET {int_column} = {value} WHERE id = new.id"
+        return [
+            f"CREATE TRIGGER {name}_ai AFTER INSERT ON {table} BEGIN {update}; END",
+            f"CREATE TRIGGER {name}_au AFTER UPDATE OF {text_column} ON {table} BEGIN {update}; END",
+        ]
+    if vendor == 'postgresql':
+        return [
+            f"CREATE FUNCTION {name}() RETURNS trigger AS $$ BEGIN "
+            f"NEW.{int_column} := CASE WHEN NEW.{text_column} ~ '{DIGITS}' THEN NEW.{text_column}::bigint END; "
+            f"RETURN NEW; END $$ LANGUAGE plpgsql",
+            f"CREATE TRIGGER {name} BEFORE INSERT OR UPDATE OF {text_column} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {name}()",
+        ]
+    return [] # Other databases: stop writes to these tables while migrating
+
+
+def _drop_sync_trigger_sql(vendor, table, int_column):
+    name = f'{table}_{int_column}_sync'
+    if vendor == 'sqlite':
+        return [f"DROP TRIGGER IF EXISTS {name}_ai", f"DROP TRIGGER IF EXISTS {name}_au"]
+    if vendor == 'postgresql':
+        return [f"DROP TRIGGER IF EXISTS {name} ON {table}", f"DROP FUNCTION IF EXISTS {name}()"]
+    return []
+
+
+def _tables(apps):
+    for model_name, text_column, int_column in COLUMNS:
+        yield apps.get_model('devices', model_name), text_column, int_column
+
+
+def install_sync_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for model, text_column, int_column in _tables(apps):
+        for statement in _sync_trigger_sql(vendor, model._meta.db_table, text_column, int_column):
+            schema_editor.execute(statement, params=None)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for model, _, int_column in _tables(apps):
+        for statement in _drop_sync_trigger_sql(vendor, model._meta.db_table, int_column):
+            schema_editor.execute(statement, params=None)
+
+
+def drop_text_columns(apps, schema_editor):
+    """Step 3, in one transaction: the tables are write-locked from the first statement until the columns are gone."""
+    drop_sync_triggers(apps, schema_editor)
+    for model, text_column, int_column in _tables(apps):
+        model.objects.using(schema_editor.connection.alias).filter(
+            **{f'{text_column}__regex': DIGITS}
+        ).update(**{int_column: Cast(text_column, models.BigIntegerField())})
+        schema_editor.remove_field(model, model._meta.get_field(text_column))
+
+
+def add_text_columns(apps, schema_editor):
+    for model, text_column, _ in _tables(apps):
+        schema_editor.add_field(model, model._meta.get_field(text_column))
+
+
+def reinstall_sqlite_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in search.sqlite_drop_sql(FTS_TABLE) + search.sqlite_schema_sql(FTS_TABLE, FTS_COLUMNS):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False # Each backfill chunk commits on its own
+
+    dependencies = [
+        ('devices', '0010_found_report_clusters'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_sqlite_search_index),
+
+        # 0. Nothing changes if an IMEI can't be converted
+        migrations.RunPython(check_imeis, migrations.RunPython.noop),
+        # Backwards, the text column is filled before it becomes NOT NULL again. (On SQLite this rebuilds
+        # the table, so it comes before the triggers of step 1.)
+        migrations.AlterField(
+            model_name='registereddevice',
+            name='imei',
+            field=models.CharField(max_length=15, null=True, verbose_name='IMEI Number'),
+        ),
+
+        # 1. Expand: integer columns next to the text ones, kept up to date by triggers
+        migrations.AddField(
+            model_name='registereddevice',
+            name='imei_int',
+            field=devices.fields.IMEIField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='foundreport',
+            name='imei_provided_int',
+            field=devices.fields.IMEIField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_sync_triggers, drop_sync_triggers),
+
+        # 2. Backfill in chunks
+        migrations.RunPython(copy_text_to_int, migrations.RunPython.noop),
+
+        # 3. Contract: drop the text columns, the integer ones take their place
+        migrations.RunPython(migrations.RunPython.noop, copy_int_to_text), # Backwards: fill the text columns
+        migrations.RemoveIndex(
+            model_name='foundreport',
+            name='found_imei_reported_idx',
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(drop_text_columns, add_text_columns, atomic=True)],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='registereddevice',
+                    name='imei',
+                ),
+                migrations.RemoveField(
+                    model_name='foundreport',
+                    name='imei_provided',
+                ),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='registereddevice',
+            old_name='imei_int',
+            new_name='imei',
+        ),
+        migrations.RenameField(
+            model_name='foundreport',
+            old_name='imei_provided_int',
+            new_name='imei_provided',
+        ),
+        migrations.AlterField(
+            model_name='registereddevice',
+            name='imei',
+            field=devices.fields.IMEIField(help_text='Enter the 15-digit IMEI number of your device. Dial *#06# to find it.', unique=True, validators=[devices.models.validate_imei], verbose_name='IMEI Number'),
+        ),
+        migrations.AlterField(
+            model_name='foundreport',
+            name='imei_provided',
+            field=devices.fields.IMEIField(blank=True, help_text='The 15-digit IMEI, if you can find it (*#06# or on device).', null=True, validators=[devices.models.validate_imei], verbose_name='IMEI (if known)'),
+        ),
+        migrations.AddIndex(
+            model_name='foundreport',
+            index=models.Index(fields=['imei_provided', 'reported_at'], name='found_imei_reported_idx'),
+        ),
+
+        migrations.RunPython(reinstall_sqlite_search_index, migrations.RunPython.noop),
+    ]
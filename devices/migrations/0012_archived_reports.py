@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-19 16:56
+
+import devices.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0011_imei_bigint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTheftReport',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('region_of_theft', models.CharField(choices=[('AD', 'Adamaoua'), ('CE', 'Center'), ('ES', 'East'), ('FN', 'Far North'), ('LT', 'Littoral'), ('NO', 'North'), ('NW', 'North-West'), ('OU', 'West'), ('SU', 'South'), ('SW', 'South-West'), ('UN', 'Unknown/Other')], max_length=2, verbose_name='Region of Theft')),
+                ('case_id', models.CharField(max_length=30, unique=True, verbose_name='Case ID')),
+                ('date_time_of_theft', models.DateTimeField(verbose_name='Date and Time of Theft')),
+                ('is_time_approximate', models.BooleanField(default=True, verbose_name='Is Time Approximate?')),
+                ('last_known_location', models.CharField(max_length=255, verbose_name='Last Known Location')),
+                ('circumstances', models.TextField(verbose_name='Circumstances of Theft')),
+                ('additional_details', models.TextField(blank=True, null=True, verbose_name='Additional Details')),
+                ('reported_at', models.DateTimeField(verbose_name='Reported At')),
+                ('last_updated', models.DateTimeField(verbose_name='Report Last Updated')),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active Report'), ('OWNER_RECOVERED', 'Resolved - Recovered by Owner'), ('FINDER_RETURNED', 'Resolved - Returned by Finder'), ('RESOLVED_FALSE_ALARM', 'Resolved - False Alarm')], max_length=30, verbose_name='Report Status')),
+                ('submission_key', models.UUIDField(blank=True, null=True, verbose_name='Submission Key')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived At')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_theft_reports', to='devices.registereddevice')),
+            ],
+            options={
+                'verbose_name': 'Archived Theft Report',
+                'verbose_name_plural': 'Archived Theft Reports',
+                'ordering': ['-reported_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedFoundReport',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('case_id_provided', models.CharField(blank=True, max_length=30, null=True, verbose_name='Case ID (if known)')),
+                ('imei_provided', devices.fields.IMEIField(blank=True, null=True, verbose_name='IMEI (if known)')),
+                ('device_description_provided', models.TextField(blank=True, null=True, verbose_name='Device Description (if Case ID/IMEI unknown)')),
+                ('date_found', models.DateTimeField(verbose_name='Date and Time Found')),
+                ('location_found', models.TextField(verbose_name='Location Where Found')),
+                ('device_condition', models.CharField(choices=[('PERFECT', 'Perfect condition, like new'), ('GOOD', 'Good condition, minor wear'), ('FAIR', 'Fair condition, visible scratches/dents'), ('POOR', 'Poor condition, screen damaged or other issues'), ('NOT_WORKING', 'Not working / Unable to power on'), ('UNKNOWN', 'Condition unknown')], max_length=20, verbose_name='Condition of Device')),
+                ('return_method_preference', models.CharField(choices=[('POLICE', 'Deliver to a local police station'), ('ANONYMOUS_CHAT', 'Arrange anonymous handover (via this platform)'), ('DIRECT_CONTACT', 'Willing to coordinate directly (share my contact info with owner)'), ('OTHER', 'Other (please specify in message)')], max_length=20, verbose_name='Preferred Return Method')),
+                ('finder_message_to_owner', models.TextField(blank=True, null=True, verbose_name='Message to Owner (Optional)')),
+                ('finder_name', models.CharField(blank=True, max_length=100, null=True, verbose_name='Your Name (Optional)')),
+                ('finder_contact_email', models.EmailField(blank=True, max_length=254, null=True, verbose_name='Your Email (Optional)')),
+                ('finder_contact_phone', models.CharField(blank=True, max_length=20, null=True, verbose_name='Your Phone Number (Optional)')),
+                ('reported_at', models.DateTimeField(verbose_name='Found Report Submitted At')),
+                ('is_processed', models.BooleanField(default=False, verbose_name='Processed by System/Admin')),
+                ('duplicate_of_pk', models.BigIntegerField(blank=True, null=True, verbose_name='Duplicate Of')),
+                ('owner_notified_at', models.DateTimeField(blank=True, null=True, verbose_name='Owner Notified At')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived At')),
+                ('matched_device_direct', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_found_reports', to='devices.registereddevice')),
+                ('theft_report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='found_reports', to='devices.archivedtheftreport')),
+            ],
+            options={
+                'verbose_name': 'Archived Found Report',
+                'verbose_name_plural': 'Archived Found Reports',
+                'ordering': ['-reported_at'],
+            },
+        ),
+    ]
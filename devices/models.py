@@ -1,9 +1,11 @@
-from django.db import models,IntegrityError
+from django.db import models,IntegrityError,transaction
 from django.conf import settings # To refer to the CustomUser model
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 import re # For basic IMEI validation
+import secrets # For webhook signing secrets
 from django.utils import timezone # For date operations
+from .fields import IMEIField
 
 # Basic IMEI validator (length and digits only - Luhn algorithm is more complex)
 def validate_imei(value):
@@ -63,9 +65,8 @@ class RegisteredDevice(models.Model):
         on_delete=models.CASCADE, # If user is deleted, their devices are also deleted
         related_name='registered_devices' # Allows access like user.registered_devices.all()
     )
-    imei = models.CharField(
+    imei = IMEIField( # Stored as a BIGINT, used as a 15-digit string (see devices/fields.py)
         _('IMEI Number'),
-        max_length=15,
         unique=True, # IMEI must be unique across all devices
         validators=[validate_imei],
         help_text=_('Enter the 15-digit IMEI number of your device. Dial *#06# to find it.')
@@ -172,10 +173,23 @@ class TheftReport(models.Model):
         choices=REPORT_STATUS_CHOICES, # Make sure REPORT_STATUS_CHOICES is defined
         default='ACTIVE' # Assuming REPORT_STATUS_ACTIVE is defined
     )
+    # --- NEW: Idempotency key of the form submission that created the report ---
+    # A retried or double-clicked submission carries the same key and gets the existing case back
+    submission_key = models.UUIDField(_('Submission Key'), null=True, blank=True, unique=True, editable=False)
 
     def __str__(self):
         return f"Theft Report {self.case_id} for {self.device.imei}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the status as loaded so devices.signals can detect a case being resolved on save
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    CASE_ID_ATTEMPTS = 5 # Inserts tried when concurrent reports collide on the same case ID
+
     def _generate_case_id(self):
         today = timezone.now().date()
         date_str = today.strftime('%Y%m%d')
@@ -221,15 +235,20 @@ class TheftReport(models.Model):
                 # This state should be prevented by form validation making region_of_theft required
                 raise IntegrityError("Cannot save TheftReport: region_of_theft is required to generate a Case ID.")
 
-            while True:
-                potential_case_id = self._generate_case_id()
-                if not TheftReport.objects.filter(case_id=potential_case_id).exists():
-                    self.case_id = potential_case_id
-                    break
-                # If collision, _generate_case_id will try next sequence in its next call within the loop
-                # (This implies _generate_case_id's logic for finding next_sequence needs to be robust to repeated calls
-                # or the loop needs to increment something itself if _generate_case_id is deterministic given the same state)
-                # The current _generate_case_id relies on what's in DB, so re-querying is fine.
+            # Two reports in the same region and day can be given the same next sequence number
+            # concurrently; the unique constraint catches that, and the insert is retried with a
+            # freshly computed sequence inside a savepoint so the caller's transaction survives.
+            for attempt in range(self.CASE_ID_ATTEMPTS):
+                self.case_id = self._generate_case_id()
+                try:
+                    with transaction.atomic():
+                        super().save(*args, **kwargs)
+                    return
+                except IntegrityError:
+                    collided = TheftReport.objects.filter(case_id=self.case_id).exists()
+                    if attempt == self.CASE_ID_ATTEMPTS - 1 or not collided:
+                        self.case_id = ''
+                        raise # Not a case ID collision (or still colliding), let the caller handle it
         super().save(*args, **kwargs)
 
     class Meta:
@@ -237,19 +256,6 @@ class TheftReport(models.Model):
         verbose_name_plural = _('Theft Reports')
         ordering = ['-reported_at']
 
-# Ensure RegisteredDevice model is defined above or imported if in separate file
-# Ensure REPORT_STATUS_CHOICES, REPORT_STATUS_ACTIVE are defined within TheftReport or globally.
-
-from django.db import models
-from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.utils.translation import gettext_lazy as _
-from django.utils import timezone
-import re
-
-# ... (validate_imei, RegisteredDevice, TheftReport models as previously defined) ...
-
-
 # --- NEW FOUND REPORT MODEL ---
 class FoundReport(models.Model):
     CONDITION_CHOICES = [
@@ -293,9 +299,8 @@ class FoundReport(models.Model):
         blank=True, null=True,
         help_text=_("If you found a Case ID on the device's lock screen or were given one.")
     )
-    imei_provided = models.CharField(
+    imei_provided = IMEIField(
         _('IMEI (if known)'), 
-        max_length=15, 
         blank=True, null=True, 
         validators=[validate_imei], # Can still validate if they provide it
         help_text=_("The 15-digit IMEI, if you can find it (*#06# or on device).")
@@ -336,6 +341,18 @@ class FoundReport(models.Model):
     reported_at = models.DateTimeField(_('Found Report Submitted At'), auto_now_add=True)
     is_processed = models.BooleanField(_('Processed by System/Admin'), default=False, help_text="Indicates if this report has been reviewed or matched.")
 
+    # --- NEW: Duplicate clustering (see devices/duplicates.py) ---
+    # Repeat reports of the same find point at the first report of their cluster (the root);
+    # the owner is notified once per cluster, so a finder submitting three times sends one notification.
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='duplicates',
+        help_text="First report of the same find, if this one is a duplicate."
+    )
+    owner_notified_at = models.DateTimeField(_('Owner Notified At'), null=True, blank=True)
+
 
     def __str__(self):
         if self.theft_report:
@@ -349,4 +366,222 @@ class FoundReport(models.Model):
     class Meta:
         verbose_name = _('Found Device Report')
         verbose_name_plural = _('Found Device Reports')
-        ordering = ['-reported_at']
\ No newline at end of file
+        ordering = ['-reported_at']
+        indexes = [
+            # Duplicate candidates are looked up by identifier or find date (devices/duplicates.py)
+            models.Index(fields=['imei_provided', 'reported_at'], name='found_imei_reported_idx'),
+            models.Index(fields=['case_id_provided', 'reported_at'], name='found_case_reported_idx'),
+            models.Index(fields=['date_found'], name='found_date_found_idx'),
+        ]
+
+# --- WEBHOOKS FOR PARTNER SYSTEMS (CARRIERS, RESELLERS) ---
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookSubscription(models.Model):
+    EVENT_DEVICE_STOLEN = 'device.stolen'
+    EVENT_DEVICE_RESOLVED = 'device.resolved'
+
+    EVENT_CHOICES = [
+        (EVENT_DEVICE_STOLEN, _('Device reported stolen')),
+        (EVENT_DEVICE_RESOLVED, _('Theft case resolved')),
+    ]
+
+    name = models.CharField(_('Partner Name'), max_length=100)
+    url = models.URLField(_('Endpoint URL'), max_length=500)
+    secret = models.CharField(
+        _('Signing Secret'),
+        max_length=64,
+        default=generate_webhook_secret,
+        help_text=_('Shared secret used to sign payloads (HMAC-SHA256).')
+    )
+    # Empty list means "all events"
+    event_types = models.JSONField(_('Event Types'), default=list, blank=True)
+    is_active = models.BooleanField(_('Active'), default=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.url})"
+
+    def wants(self, event_type):
+        return not self.event_types or event_type in self.event_types
+
+    class Meta:
+        verbose_name = _('Webhook Subscription')
+        verbose_name_plural = _('Webhook Subscriptions')
+        ordering = ['name']
+
+
+class WebhookEvent(models.Model):
+    # Outbox row: written in the same transaction as the change it describes.
+    event_type = models.CharField(_('Event Type'), max_length=50, choices=WebhookSubscription.EVENT_CHOICES)
+    payload = models.JSONField(_('Payload'))
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk}"
+
+    class Meta:
+        verbose_name = _('Webhook Event')
+        verbose_name_plural = _('Webhook Events')
+        ordering = ['-created_at']
+
+
+class WebhookDelivery(models.Model):
+    STATUS_PENDING = 'PENDING'
+    STATUS_DELIVERED = 'DELIVERED'
+    STATUS_FAILED = 'FAILED' # Gave up after WEBHOOK_MAX_ATTEMPTS
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_DELIVERED, _('Delivered')),
+        (STATUS_FAILED, _('Failed')),
+    ]
+
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.ForeignKey(WebhookEvent, on_delete=models.CASCADE, related_name='deliveries')
+    status = models.CharField(_('Status'), max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('Next Attempt At'), default=timezone.now)
+    last_error = models.TextField(_('Last Error'), blank=True, default='')
+    response_status = models.PositiveIntegerField(_('Last Response Status'), null=True, blank=True)
+    latency_ms = models.FloatField(_('Delivery Latency (ms)'), null=True, blank=True)
+    delivered_at = models.DateTimeField(_('Delivered At'), null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event} -> {self.subscription.name} ({self.status})"
+
+    class Meta:
+        verbose_name = _('Webhook Delivery')
+        verbose_name_plural = _('Webhook Deliveries')
+        ordering = ['next_attempt_at']
+        constraints = [
+            models.UniqueConstraint(fields=['subscription', 'event'], name='unique_webhook_delivery'),
+        ]
+        indexes = [
+            # The worker polls "pending and due", oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_due_idx'),
+        ]
+
+
+# --- IN-APP OWNER NOTIFICATIONS (streamed live over server-sent events) ---
+class OwnerNotification(models.Model):
+    KIND_DEVICE_FOUND = 'DEVICE_FOUND'
+    KIND_STATUS = 'STATUS'
+
+    KIND_CHOICES = [
+        (KIND_DEVICE_FOUND, _('Your device may have been found')),
+        (KIND_STATUS, _('Case status update')),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='device_notifications'
+    )
+    device = models.ForeignKey(
+        RegisteredDevice,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='notifications'
+    )
+    kind = models.CharField(_('Kind'), max_length=20, choices=KIND_CHOICES)
+    message = models.CharField(_('Message'), max_length=255)
+    url = models.CharField(_('Link'), max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.owner}: {self.message}"
+
+    class Meta:
+        verbose_name = _('Owner Notification')
+        verbose_name_plural = _('Owner Notifications')
+        ordering = ['-created_at']
+        indexes = [
+            # Replay on reconnect: "this owner's notifications after event id X"
+            models.Index(fields=['owner', 'id'], name='notification_owner_cursor_idx'),
+        ]
+
+
+# --- ARCHIVE OF RESOLVED CASES (moved out of the hot tables by devices/archive.py) ---
+# Same columns as TheftReport/FoundReport and the same primary keys, so links to an archived
+# case or found report (notifications, emails, bookmarks) can still be resolved.
+class ArchivedTheftReport(models.Model):
+    REPORT_STATUS_ACTIVE = TheftReport.REPORT_STATUS_ACTIVE
+    REPORT_STATUS_OWNER_RECOVERY = TheftReport.REPORT_STATUS_OWNER_RECOVERY
+    REPORT_STATUS_FINDER_RETURN = TheftReport.REPORT_STATUS_FINDER_RETURN
+    REPORT_STATUS_FALSE_ALARM = TheftReport.REPORT_STATUS_FALSE_ALARM
+
+    id = models.BigIntegerField(primary_key=True) # The TheftReport's pk
+    # A ForeignKey here, unlike TheftReport.device: a device stolen again gets a new case
+    device = models.ForeignKey(
+        RegisteredDevice,
+        on_delete=models.CASCADE,
+        related_name='archived_theft_reports'
+    )
+    region_of_theft = models.CharField(_('Region of Theft'), max_length=2, choices=TheftReport.REGION_CHOICES)
+    case_id = models.CharField(_('Case ID'), max_length=30, unique=True)
+    date_time_of_theft = models.DateTimeField(_('Date and Time of Theft'))
+    is_time_approximate = models.BooleanField(_('Is Time Approximate?'), default=True)
+    last_known_location = models.CharField(_('Last Known Location'), max_length=255)
+    circumstances = models.TextField(_('Circumstances of Theft'))
+    additional_details = models.TextField(_('Additional Details'), blank=True, null=True)
+    reported_at = models.DateTimeField(_('Reported At'))
+    last_updated = models.DateTimeField(_('Report Last Updated'))
+    status = models.CharField(_('Report Status'), max_length=30, choices=TheftReport.REPORT_STATUS_CHOICES)
+    submission_key = models.UUIDField(_('Submission Key'), null=True, blank=True)
+    archived_at = models.DateTimeField(_('Archived At'), auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived theft report {self.case_id}"
+
+    class Meta:
+        verbose_name = _('Archived Theft Report')
+        verbose_name_plural = _('Archived Theft Reports')
+        ordering = ['-reported_at']
+
+
+class ArchivedFoundReport(models.Model):
+    CONDITION_CHOICES = FoundReport.CONDITION_CHOICES
+    RETURN_METHOD_CHOICES = FoundReport.RETURN_METHOD_CHOICES
+
+    id = models.BigIntegerField(primary_key=True) # The FoundReport's pk
+    # Found reports are archived together with their case, so the case is always in the archive too
+    theft_report = models.ForeignKey(
+        ArchivedTheftReport,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='found_reports'
+    )
+    matched_device_direct = models.ForeignKey(
+        RegisteredDevice,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='archived_found_reports'
+    )
+    case_id_provided = models.CharField(_('Case ID (if known)'), max_length=30, blank=True, null=True)
+    imei_provided = IMEIField(_('IMEI (if known)'), blank=True, null=True)
+    device_description_provided = models.TextField(_('Device Description (if Case ID/IMEI unknown)'), blank=True, null=True)
+    date_found = models.DateTimeField(_('Date and Time Found'))
+    location_found = models.TextField(_('Location Where Found'))
+    device_condition = models.CharField(_('Condition of Device'), max_length=20, choices=CONDITION_CHOICES)
+    return_method_preference = models.CharField(_('Preferred Return Method'), max_length=20, choices=RETURN_METHOD_CHOICES)
+    finder_message_to_owner = models.TextField(_('Message to Owner (Optional)'), blank=True, null=True)
+    finder_name = models.CharField(_('Your Name (Optional)'), max_length=100, blank=True, null=True)
+    finder_contact_email = models.EmailField(_('Your Email (Optional)'), blank=True, null=True)
+    finder_contact_phone = models.CharField(_('Your Phone Number (Optional)'), max_length=20, blank=True, null=True)
+    reported_at = models.DateTimeField(_('Found Report Submitted At'))
+    is_processed = models.BooleanField(_('Processed by System/Admin'), default=False)
+    # Pk of the cluster root (FoundReport.duplicate_of), which may still be in the hot table
+    duplicate_of_pk = models.BigIntegerField(_('Duplicate Of'), null=True, blank=True)
+    owner_notified_at = models.DateTimeField(_('Owner Notified At'), null=True, blank=True)
+    archived_at = models.DateTimeField(_('Archived At'), auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived found report submitted {self.reported_at.strftime('%Y-%m-%d')}"
+
+    class Meta:
+        verbose_name = _('Archived Found Report')
+        verbose_name_plural = _('Archived Found Reports')
+        ordering = ['-reported_at']
@@ -0,0 +1,211 @@
+"""
+Live owner notifications over server-sent events (SSE).
+
+Notifications are plain OwnerNotification rows, so they survive restarts and work
+with any number of processes. Each server process runs a single NotificationBroker
+task that polls the table with a cursor (``id > last seen id``) and fans new rows
+out to the in-memory queues of the owners connected to *that* process. The cost of
+polling is therefore one indexed query per interval per process, no matter how many
+clients are connected, and an idle client is just a suspended coroutine and a queue
+(no thread per connection). This needs an ASGI server; under WSGI each stream would
+hold a worker thread.
+
+A failed poll (e.g. the database restarting) is logged and retried with exponential
+backoff, up to MAX_BACKOFF_SECONDS; connected streams keep their heartbeats meanwhile
+and receive everything they missed once polling recovers, since the cursor only
+moves past delivered rows.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import FoundReport, OwnerNotification
+
+logger = logging.getLogger(__name__)
+
+POLL_BATCH_SIZE = 500
+MAX_BACKOFF_SECONDS = 60
+
+
+def notify_owner(owner, kind, message, device=None, url=''):
+    """Creates a notification; connected streams pick it up on the broker's next poll."""
+    return OwnerNotification.objects.create(owner=owner, device=device, kind=kind, message=message, url=url)
+
+
+# --- "Your device may have been found" (in-app + email), sent once per found report cluster ---
+
+def notify_owner_of_find(found_report, theft_report, device, action_url):
+    """
+    Tells the owner of `device` that it may have been found: an in-app notification plus an
+    email. Marks the found report as notified. Returns False if the email could not be sent.
+    """
+    owner = device.owner
+    email_context = {
+        'owner_name': owner.first_name or owner.email.split('@')[0],
+        'device_make_model': f"{device.make} {device.model_name}",
+        'case_id': theft_report.case_id if theft_report else "N/A (Check device details)",
+        'date_found': found_report.date_found,
+        'location_found': found_report.location_found,
+        'device_condition': found_report.get_device_condition_display(), # Uses model's get_FOO_display
+        'return_method_preference': found_report.get_return_method_preference_display(),
+        'finder_message': found_report.finder_message_to_owner or "No message provided by finder.",
+        'action_url': action_url,
+    }
+
+    # In-app notification, pushed live to the owner's open pages by OwnerEventStreamView
+    notify_owner(
+        owner,
+        OwnerNotification.KIND_DEVICE_FOUND,
+        f"Your {email_context['device_make_model']} may have been found (Case {email_context['case_id']}).",
+        device=device,
+        url=reverse('devices:found_report_owner_detail', kwargs={'pk': found_report.pk}) if theft_report
+            else reverse('devices:user_device_list'),
+    )
+    found_report.owner_notified_at = timezone.now()
+    FoundReport.objects.filter(pk=found_report.pk).update(owner_notified_at=found_report.owner_notified_at)
+
+    subject = f"Good News! Your device '{email_context['device_make_model']}' may have been found - Case {email_context['case_id']}"
+    html_message = render_to_string('devices/emails/owner_found_device_notification.html', email_context)
+    plain_message = render_to_string('devices/emails/owner_found_device_notification.txt', email_context)
+    try:
+        send_mail(
+            subject,
+            plain_message,
+            settings.DEFAULT_FROM_EMAIL,
+            [owner.email],
+            html_message=html_message,
+            fail_silently=False # Raise an error if email sending fails
+        )
+    except Exception:
+        # Logged for admin review; the in-app notification is already stored
+        logger.exception("Error sending 'found device' email to %s for found report %s", owner.email, found_report.pk)
+        return False
+    return True
+
+
+def serialize(notification):
+    return {
+        'id': notification.pk,
+        'kind': notification.kind,
+        'message': notification.message,
+        'url': notification.url,
+        'device_id': notification.device_id,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def format_event(notification):
+    """One SSE frame. The id lets the browser resume with Last-Event-ID after a reconnect."""
+    data = json.dumps(serialize(notification), separators=(',', ':'))
+    return f"id: {notification.pk}\nevent: {notification.kind.lower()}\ndata: {data}\n\n"
+
+
+class NotificationBroker:
+    def __init__(self, poll_interval=None):
+        self.poll_interval = poll_interval or getattr(settings, 'NOTIFICATION_POLL_INTERVAL_SECONDS', 2)
+        self._subscribers = defaultdict(set) # owner_id -> {asyncio.Queue, ...}
+        self._cursor = None
+        self._task = None
+        self._loop = None
+
+    @property
+    def connection_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def subscribe(self, owner_id):
+        queue = asyncio.Queue()
+        self._subscribers[owner_id].add(queue)
+        await self._ensure_running()
+        return queue
+
+    def unsubscribe(self, owner_id, queue):
+        queues = self._subscribers.get(owner_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[owner_id]
+
+    async def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        if self._cursor is None:
+            # Start from "now": older notifications are replayed per client via Last-Event-ID
+            latest = await OwnerNotification.objects.order_by('-pk').values_list('pk', flat=True).afirst()
+            self._cursor = latest or 0
+        self._loop = loop
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        failures = 0
+        while self._subscribers:
+            try:
+                await self.poll_once()
+            except Exception:
+                failures += 1
+                delay = min(self.poll_interval * 2 ** failures, MAX_BACKOFF_SECONDS)
+                logger.exception("Notification poll failed (%d in a row), retrying in %.1fs", failures, delay)
+                # Drops a connection the error left unusable, so the retry opens a new one
+                await sync_to_async(close_old_connections)()
+            else:
+                failures = 0
+                delay = self.poll_interval
+            await asyncio.sleep(delay)
+        # Nobody is listening any more; the next subscribe() restarts the task
+        self._task = None
+
+    async def poll_once(self):
+        notifications = [
+            notification async for notification in
+            OwnerNotification.objects.filter(pk__gt=self._cursor).order_by('pk')[:POLL_BATCH_SIZE]
+        ]
+        for notification in notifications:
+            self._cursor = notification.pk
+            for queue in self._subscribers.get(notification.owner_id, ()):
+                queue.put_nowait(notification)
+
+
+broker = NotificationBroker()
+
+
+async def missed_notifications(owner_id, last_event_id):
+    """Notifications created for this owner while the client was disconnected."""
+    return [
+        notification async for notification in
+        OwnerNotification.objects.filter(owner_id=owner_id, pk__gt=last_event_id).order_by('pk')[:POLL_BATCH_SIZE]
+    ]
+
+
+async def event_stream(owner_id, last_event_id=None, heartbeat=None):
+    """Async generator of SSE frames for one connected owner."""
+    heartbeat = heartbeat or getattr(settings, 'NOTIFICATION_HEARTBEAT_SECONDS', 15)
+    queue = await broker.subscribe(owner_id)
+    try:
+        # Ask the browser to wait a few seconds before reconnecting if the stream drops
+        yield "retry: 5000\n\n"
+        sent_up_to = last_event_id or 0
+        if last_event_id is not None:
+            for notification in await missed_notifications(owner_id, last_event_id):
+                sent_up_to = notification.pk
+                yield format_event(notification)
+        while True:
+            try:
+                notification = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies/load balancers from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            if notification.pk > sent_up_to: # Skip anything already replayed above
+                sent_up_to = notification.pk
+                yield format_event(notification)
+    finally:
+        broker.unsubscribe(owner_id, queue)
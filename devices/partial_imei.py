@@ -0,0 +1,145 @@
+"""
+Partial-IMEI recovery search.
+
+Finders often can only read part of an IMEI label (scratched, faded, cut off).
+Given a 15-character pattern where unreadable digits are wildcards, we enumerate
+only the completions that pass the Luhn check and resolve all of them against
+the stolen devices in a single indexed ``imei IN (...)`` query.
+
+Enumeration is not brute force + filter: all unknown digits but one are
+enumerated and the last one is solved directly from the Luhn equation. Every
+Luhn digit mapping is a bijection on 0-9, so exactly one digit satisfies the
+checksum. With 3 unknown digits that means 100 candidates instead of 1000.
+
+The search page is public, so it never shows a candidate's IMEI or case ID: only
+the digits the finder typed (mask_imei) and the make and model. "This is the device
+I found" passes a signed token naming the device (candidate_token), which the found
+report form resolves on the server.
+"""
+import itertools
+import re
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+from .models import RegisteredDevice, TheftReport
+
+IMEI_LENGTH = 15
+MAX_UNKNOWN_DIGITS = 3
+WILDCARD_CHARS = '?*_xX'
+CANDIDATE_TOKEN_SALT = 'phoneindex.partial-imei-candidate'
+CANDIDATE_TOKEN_MAX_AGE = 24 * 3600 # Seconds a search result stays usable for a found report
+
+# Characters people type between digit groups (e.g. "35-209900-176148-1" or "35 209900 ...")
+_SEPARATORS_RE = re.compile(r'[\s\-./]')
+# Luhn doubling: 0->0, 1->2, ..., 5->1 (10 -> 1+0), ..., 9->9 (18 -> 1+8)
+_DOUBLED = [0, 2, 4, 6, 8, 1, 3, 5, 7, 9]
+_UNDOUBLED = list(range(10))
+
+
+def normalize_pattern(value):
+    """
+    Strips separators and maps every wildcard character to '?'.
+    Raises ValidationError if the result isn't 15 digits/wildcards with at most
+    MAX_UNKNOWN_DIGITS wildcards.
+    """
+    pattern = _SEPARATORS_RE.sub('', value or '')
+    pattern = ''.join('?' if char in WILDCARD_CHARS else char for char in pattern)
+    if len(pattern) != IMEI_LENGTH or not all(char.isdigit() or char == '?' for char in pattern):
+        raise ValidationError(
+            _('Enter all 15 positions of the IMEI, using ? for each digit you cannot read.'),
+        )
+    unknown = pattern.count('?')
+    if unknown == 0:
+        raise ValidationError(
+            _('This IMEI has no unreadable digits. Use the regular IMEI field instead.'),
+        )
+    if unknown > MAX_UNKNOWN_DIGITS:
+        raise ValidationError(
+            _('Too many unreadable digits (%(count)s). At most %(max)s can be missing.'),
+            params={'count': unknown, 'max': MAX_UNKNOWN_DIGITS},
+        )
+    return pattern
+
+
+def _luhn_table(position):
+    # Mirrors validate_imei_luhn: the check digit (position 14) is added as-is,
+    # then from the right every other payload digit is doubled (positions 13, 11, 9, ...).
+    return _DOUBLED if position % 2 == 1 else _UNDOUBLED
+
+
+def luhn_completions(pattern):
+    """
+    Yields every Luhn-valid 15-digit IMEI matching a normalized pattern
+    (as returned by normalize_pattern). Yields 10 ** (unknown - 1) strings.
+    """
+    digits = list(pattern)
+    unknown_positions = [index for index, char in enumerate(digits) if char == '?']
+    known_total = sum(
+        _luhn_table(index)[int(char)] for index, char in enumerate(digits) if char != '?'
+    )
+
+    solved_position = unknown_positions[-1]
+    solved_table = _luhn_table(solved_position)
+    # Reverse lookup: the digit whose Luhn contribution equals a given value mod 10
+    solve_for = {contribution: digit for digit, contribution in enumerate(solved_table)}
+
+    enumerated_positions = unknown_positions[:-1]
+    for combination in itertools.product(range(10), repeat=len(enumerated_positions)):
+        total = known_total
+        for position, digit in zip(enumerated_positions, combination):
+            digits[position] = str(digit)
+            total += _luhn_table(position)[digit]
+        digits[solved_position] = str(solve_for[(-total) % 10])
+        yield ''.join(digits)
+
+
+def _description_score(device, description_tokens):
+    if not description_tokens:
+        return 0
+    device_tokens = set(f"{device.make} {device.model_name} {device.color}".lower().split())
+    return len(device_tokens & description_tokens)
+
+
+def find_stolen_candidates(pattern, description=''):
+    """
+    Returns the stolen devices whose IMEI matches the (normalized) pattern, best first.
+
+    Ranking: devices whose make/model/color share words with the finder's description
+    come first, then devices with an active theft report, then the most recently reported.
+    """
+    candidates = list(luhn_completions(pattern))
+    devices = list(
+        RegisteredDevice.objects.filter(
+            imei__in=candidates,
+            status=RegisteredDevice.STATUS_STOLEN,
+        ).select_related('theft_report')
+    )
+    description_tokens = set((description or '').lower().split())
+
+    def sort_key(device):
+        theft_report = getattr(device, 'theft_report', None)
+        is_active = bool(theft_report and theft_report.status == TheftReport.REPORT_STATUS_ACTIVE)
+        reported_at = theft_report.reported_at.timestamp() if theft_report else 0
+        return (_description_score(device, description_tokens), is_active, reported_at)
+
+    devices.sort(key=sort_key, reverse=True)
+    return devices
+
+
+def mask_imei(pattern):
+    """A normalized pattern for display: the digits the finder typed, • for the unreadable ones."""
+    return pattern.replace('?', '•')
+
+
+def candidate_token(device):
+    return signing.dumps(device.pk, salt=CANDIDATE_TOKEN_SALT)
+
+
+def device_pk_for_token(token):
+    """The pk a candidate token names, or None if it is invalid or expired."""
+    try:
+        return signing.loads(token, salt=CANDIDATE_TOKEN_SALT, max_age=CANDIDATE_TOKEN_MAX_AGE)
+    except signing.BadSignature: # Also covers expired tokens
+        return None
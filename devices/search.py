@@ -0,0 +1,200 @@
+"""
+Full-text search over theft and found report narratives.
+
+The search indexes live outside the ORM models and are created by migration
+0006_report_search_index:
+
+- On PostgreSQL each report table gets a generated ``search_vector`` tsvector
+  column (kept up to date by the database itself) with a GIN index on it.
+- On SQLite each report table gets an FTS5 "external content" table that is
+  kept in sync by INSERT/UPDATE/DELETE triggers.
+
+Any other backend falls back to plain ``icontains`` lookups, so the search page
+keeps working everywhere (just without ranking).
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import TheftReport, FoundReport
+
+# Indexed columns per table, in weight order (most important first).
+# The weights are used by ts_rank_cd on PostgreSQL ('A' > 'B' > 'C') and by bm25 on SQLite.
+SEARCH_INDEXES = {
+    'theft': {
+        'model': TheftReport,
+        'columns': ['last_known_location', 'circumstances', 'additional_details'],
+        'weights': [4.0, 2.0, 1.0],
+    },
+    'found': {
+        'model': FoundReport,
+        'columns': ['location_found', 'device_description_provided'],
+        'weights': [4.0, 1.0],
+    },
+}
+
+PG_WEIGHT_LABELS = ['A', 'B', 'C', 'D']
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+@dataclass
+class SearchHit:
+    kind: str  # 'theft' or 'found'
+    report: object  # TheftReport or FoundReport instance
+    rank: float
+
+
+# --- Schema helpers (used by the migration) ---
+
+def fts_table_name(table):
+    return f'{table}_fts'
+
+
+def postgres_schema_sql(table, columns):
+    """Returns the SQL statements that add the generated tsvector column and its GIN index."""
+    parts = [
+        f"setweight(to_tsvector('simple'::regconfig, coalesce({column}, '')), '{PG_WEIGHT_LABELS[index]}')"
+        for index, column in enumerate(columns)
+    ]
+    return [
+        f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({' || '.join(parts)}) STORED",
+        f"CREATE INDEX {table}_search_gin ON {table} USING gin (search_vector)",
+    ]
+
+
+def postgres_drop_sql(table):
+    return [
+        f"DROP INDEX IF EXISTS {table}_search_gin",
+        f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+
+def sqlite_schema_sql(table, columns):
+    """Returns the SQL statements that create the FTS5 table, its sync triggers, and fill it."""
+    fts = fts_table_name(table)
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column_list}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        # Only re-index when an indexed column changes, status updates stay cheap.
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def sqlite_drop_sql(table):
+    fts = fts_table_name(table)
+    return [
+        f"DROP TRIGGER IF EXISTS {fts}_ai",
+        f"DROP TRIGGER IF EXISTS {fts}_ad",
+        f"DROP TRIGGER IF EXISTS {fts}_au",
+        f"DROP TABLE IF EXISTS {fts}",
+    ]
+
+
+# --- Query helpers ---
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query or '')
+
+
+def _sqlite_match_expression(tokens):
+    # Quote every token so user input can never be parsed as FTS5 syntax (AND/OR/NEAR, column filters...).
+    # The last token gets a prefix match so "yaoun" finds "Yaounde" while typing.
+    quoted = ['"%s"' % token.replace('"', '""') for token in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _sqlite_fts_available(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [fts_table_name(table)],
+        )
+        return cursor.fetchone() is not None
+
+
+def ranked_ids(kind, query, limit=DEFAULT_LIMIT):
+    """
+    Returns a list of (pk, rank) tuples for the given index kind ('theft' or 'found'),
+    best match first. Higher rank is better on every backend.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    config = SEARCH_INDEXES[kind]
+    model = config['model']
+    table = model._meta.db_table
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT id, ts_rank_cd(search_vector, query) AS rank "
+            f"FROM {table}, websearch_to_tsquery('simple'::regconfig, %s) query "
+            f"WHERE search_vector @@ query "
+            f"ORDER BY rank DESC, id DESC LIMIT %s"
+        )
+        params = [' '.join(tokens), limit]
+    elif connection.vendor == 'sqlite' and _sqlite_fts_available(table):
+        fts = fts_table_name(table)
+        weights = ', '.join(str(weight) for weight in config['weights'])
+        # bm25() is "lower is better", negate it so callers can always sort descending.
+        sql = (
+            f"SELECT rowid, -bm25({fts}, {weights}) AS rank FROM {fts} "
+            f"WHERE {fts} MATCH %s ORDER BY rank DESC, rowid DESC LIMIT %s"
+        )
+        params = [_sqlite_match_expression(tokens), limit]
+    else:
+        # No full-text index on this backend: every token must appear in one of the columns.
+        condition = Q()
+        for token in tokens:
+            token_condition = Q()
+            for column in config['columns']:
+                token_condition |= Q(**{f'{column}__icontains': token})
+            condition &= token_condition
+        pks = model.objects.filter(condition).order_by('-pk').values_list('pk', flat=True)[:limit]
+        return [(pk, 0.0) for pk in pks]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+def search_reports(query, kinds=('theft', 'found'), limit=DEFAULT_LIMIT):
+    """
+    Searches theft and/or found reports and returns SearchHit objects ordered by rank.
+    Ranks from different indexes are not strictly comparable, so results are
+    interleaved by rank but each kind is capped at `limit` on its own.
+    """
+    hits = []
+    for kind in kinds:
+        ranked = ranked_ids(kind, query, limit)
+        if not ranked:
+            continue
+        model = SEARCH_INDEXES[kind]['model']
+        queryset = model.objects.all()
+        if model is TheftReport:
+            queryset = queryset.select_related('device')
+        else:
+            queryset = queryset.select_related('theft_report')
+        reports = queryset.in_bulk([pk for pk, _rank in ranked])
+        hits.extend(
+            SearchHit(kind=kind, report=reports[pk], rank=rank)
+            for pk, rank in ranked if pk in reports
+        )
+    hits.sort(key=lambda hit: hit.rank, reverse=True)
+    return hits[:limit]
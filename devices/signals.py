@@ -0,0 +1,64 @@
+"""
+Model signal receivers for the devices app. Connected in DevicesConfig.ready().
+
+Webhooks, notifications and metrics (prometheus_client) are imported inside the
+receivers: this module is imported while the app registry loads, so anything imported
+here at the top is paid by every management command, not just by requests that save.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import TheftReport, FoundReport, WebhookSubscription, OwnerNotification
+
+
+@receiver(post_save, sender=TheftReport)
+def theft_report_resolved(sender, instance, created, **kwargs):
+    """Notifies partners and the owner when an active case moves to one of the resolved statuses."""
+    previous_status = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+    if created or previous_status != TheftReport.REPORT_STATUS_ACTIVE:
+        return
+    if instance.status == TheftReport.REPORT_STATUS_ACTIVE:
+        return
+    from . import notifications, webhooks
+    webhooks.enqueue_event(
+        WebhookSubscription.EVENT_DEVICE_RESOLVED,
+        webhooks.device_payload(instance.device, instance),
+    )
+    notifications.notify_owner(
+        instance.device.owner,
+        OwnerNotification.KIND_STATUS,
+        f"Case {instance.case_id} is now: {instance.get_status_display()}.",
+        device=instance.device,
+        url=reverse('devices:theft_report_detail', kwargs={'pk': instance.pk}),
+    )
+
+
+@receiver(post_save, sender=FoundReport)
+@receiver(post_delete, sender=FoundReport)
+def found_report_changed(sender, instance, **kwargs):
+    """
+    Bumps the linked theft report's last_updated: the device and case cards show its
+    found reports and are cached by that timestamp (see fragments.py).
+    """
+    if instance.theft_report_id:
+        TheftReport.objects.filter(pk=instance.theft_report_id).update(last_updated=timezone.now())
+
+
+@receiver(post_save, sender=TheftReport)
+def count_theft_report(sender, instance, created, **kwargs):
+    if created:
+        from phoneindex import metrics
+        metrics.THEFT_REPORTS.inc()
+
+
+@receiver(post_save, sender=FoundReport)
+def count_found_report(sender, instance, created, **kwargs):
+    """The match rate is found_reports_total{matched="true"} over all found reports."""
+    if created:
+        from phoneindex import metrics
+        matched = bool(instance.theft_report_id or instance.matched_device_direct_id)
+        metrics.FOUND_REPORTS.labels(matched=str(matched).lower()).inc()
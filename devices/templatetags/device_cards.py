@@ -0,0 +1,47 @@
+from django import template
+from django.core.cache import cache
+
+from devices import fragments
+
+register = template.Library()
+
+
+class CardCacheNode(template.Node):
+    def __init__(self, nodelist, kind, obj):
+        self.nodelist = nodelist
+        self.kind = kind
+        self.obj = obj
+
+    def render(self, context):
+        kind = self.kind.resolve(context)
+        key = fragments.card_key(kind, self.obj.resolve(context))
+        # Filled by the view with one get_many() for the whole page (see fragments.load_cards)
+        preloaded = context.get('card_fragments')
+        if preloaded is not None:
+            html = preloaded.get(key)
+        else:
+            html = cache.get(key)
+            if html is not None:
+                fragments.record(kind, hits=1)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragments.store_card(key, html)
+            fragments.record(kind, misses=1)
+        return html
+
+
+@register.tag
+def cardcache(parser, token):
+    """
+    Caches the enclosed card markup, keyed by the object's version (see devices/fragments.py):
+
+        {% cardcache 'device' device %} ... {% endcardcache %}
+
+    Keep per-request content such as {% csrf_token %} outside the block.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a card kind and an object.")
+    nodelist = parser.parse(('endcardcache',))
+    parser.delete_first_token()
+    return CardCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
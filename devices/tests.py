@@ -1,3 +1,664 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import api_auth, archive, duplicates, fragments, search, webhooks
+from .notifications import NotificationBroker
+from .models import (
+    ArchivedFoundReport, ArchivedTheftReport, FoundReport, OwnerNotification, RegisteredDevice, TheftReport, WebhookDelivery,
+    WebhookSubscription,
+)
+
+
+def luhn_imei(prefix):
+    """A valid 15-digit IMEI: the 14-digit `prefix` plus its Luhn check digit."""
+    total = 0
+    for index, digit in enumerate(int(char) for char in prefix):
+        if index % 2:
+            digit *= 2
+            digit = digit - 9 if digit > 9 else digit
+        total += digit
+    return prefix + str((10 - total % 10) % 10)
+
+
+def report_form(submission_key):
+    return {
+        'region_of_theft': 'CE',
+        'date_time_of_theft': (timezone.now() - timedelta(hours=3)).strftime('%Y-%m-%dT%H:%M'),
+        'is_time_approximate': 'on',
+        'last_known_location': 'Bambili Near Corners',
+        'circumstances': 'Taken from a table.',
+        'submission_key': str(submission_key),
+    }
+
+
+class ReportStolenConcurrencyTests(TransactionTestCase):
+    """
+    Several sessions of the owner submit the report form for one device at the same instant
+    (double clicks, retries, two tabs). Each thread has its own database connection, so the
+    submissions really race for the device row (see ReportDeviceStolenView.form_valid).
+    """
+    sessions = 6
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.device = RegisteredDevice.objects.create(
+            owner=self.owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23',
+            color='Black',
+        )
+
+    def submit_concurrently(self, forms):
+        """POSTs each form from its own thread and client; returns (status code, message texts) per form."""
+        path = reverse('devices:report_device_stolen', kwargs={'device_pk': self.device.pk})
+        clients = []
+        for _ in forms:
+            client = Client()
+            client.force_login(self.owner)
+            clients.append(client)
+        barrier = threading.Barrier(len(forms))
+        outcomes = [None] * len(forms)
+
+        def submit(index):
+            try:
+                barrier.wait()
+                response = clients[index].post(path, forms[index])
+                outcomes[index] = (response.status_code, [str(m) for m in get_messages(response.wsgi_request)])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(forms))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def assert_one_case(self, outcomes):
+        reports = TheftReport.objects.filter(device=self.device)
+        self.assertEqual(reports.count(), 1)
+        case_id = reports.get().case_id
+        self.assertEqual(TheftReport.objects.filter(case_id=case_id).count(), 1)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.status, RegisteredDevice.STATUS_STOLEN)
+        for status, texts in outcomes:
+            self.assertEqual(status, 302)
+            self.assertTrue(any(case_id in text for text in texts), texts)
+        return case_id
+
+    def test_same_submission_key(self):
+        key = uuid.uuid4()
+        outcomes = self.submit_concurrently([report_form(key) for _ in range(self.sessions)])
+        self.assert_one_case(outcomes)
+        # Every retry of the one rendered form is answered like the submission that created the case
+        for _, texts in outcomes:
+            self.assertTrue(any('has been reported stolen' in text for text in texts), texts)
+
+    def test_different_submission_keys(self):
+        outcomes = self.submit_concurrently([report_form(uuid.uuid4()) for _ in range(self.sessions)])
+        self.assert_one_case(outcomes)
+        created = [texts for _, texts in outcomes if any('has been reported stolen' in text for text in texts)]
+        self.assertEqual(len(created), 1)
+
+
+class PartnerStub(BaseHTTPRequestHandler):
+    """A partner endpoint that answers with the queued status codes (then 200) and records each request."""
+    protocol_version = 'HTTP/1.1' # Keep-alive, like real partners
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((dict(self.headers), body))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WebhookDeliveryTests(TestCase):
+    secret = 'partner-secret'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PartnerStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.received = []
+        self.server.statuses = []
+        host, port = self.server.server_address
+        self.subscription = WebhookSubscription.objects.create(
+            name='Carrier', url=f'http://{host}:{port}/hooks/phoneindex', secret=self.secret,
+            event_types=[WebhookSubscription.EVENT_DEVICE_STOLEN],
+        )
+        self.event = webhooks.enqueue_event(WebhookSubscription.EVENT_DEVICE_STOLEN, {'imei': '356938035643809'})
+
+    def deliver(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return webhooks.deliver_due(executor)
+
+    def test_signed_batch_retried_after_server_error(self):
+        self.server.statuses = [500]
+        self.assertEqual(self.deliver(), (1, 0, 1))
+        delivery = WebhookDelivery.objects.get(subscription=self.subscription)
+        self.assertEqual(delivery.status, WebhookDelivery.STATUS_PENDING)
+        self.assertEqual((delivery.attempts, delivery.response_status, delivery.last_error), (1, 500, 'HTTP 500'))
+        self.assertGreater(delivery.next_attempt_at, timezone.now())
+
+        headers, body = self.server.received[0]
+        timestamp, signature = (part.split('=', 1)[1] for part in headers[webhooks.SIGNATURE_HEADER].split(','))
+        expected = hmac.new(self.secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+        self.assertTrue(hmac.compare_digest(signature, expected))
+        self.assertEqual(json.loads(body)['events'][0]['id'], self.event.pk)
+
+        # Not due again until the backoff has passed
+        self.assertEqual(self.deliver(), (0, 0, 0))
+        WebhookDelivery.objects.filter(pk=delivery.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(self.deliver(), (1, 1, 0))
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, WebhookDelivery.STATUS_DELIVERED)
+        self.assertEqual((delivery.attempts, delivery.response_status, delivery.last_error), (2, 200, ''))
+        self.assertEqual(len(self.server.received), 2)
+
+    def test_batch_that_raises_is_recorded_and_others_still_sent(self):
+        broken = WebhookSubscription.objects.create(
+            name='Broken', url='http://127.0.0.1:not-a-port/', secret=self.secret, event_types=[],
+        )
+        webhooks.enqueue_event(WebhookSubscription.EVENT_DEVICE_RESOLVED, {'imei': '356938035643809'})
+        with self.assertLogs('devices.webhooks', 'ERROR'):
+            self.assertEqual(self.deliver(), (2, 1, 1))
+
+        failed = WebhookDelivery.objects.get(subscription=broken)
+        self.assertEqual((failed.status, failed.attempts), (WebhookDelivery.STATUS_PENDING, 1))
+        self.assertTrue(failed.last_error.startswith('ValueError'))
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        delivered = WebhookDelivery.objects.get(subscription=self.subscription)
+        self.assertEqual(delivered.status, WebhookDelivery.STATUS_DELIVERED)
+
+
+class ArchiveFoundReportClusterTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.device = RegisteredDevice.objects.create(
+            owner=owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23', color='Black',
+        )
+
+    def found_report(self, days_ago, **fields):
+        report = FoundReport.objects.create(
+            matched_device_direct=self.device, is_processed=True, date_found=timezone.now() - timedelta(days=days_ago),
+            location_found='Bambili market', device_condition='GOOD', return_method_preference='POLICE', **fields,
+        )
+        FoundReport.objects.filter(pk=report.pk).update(reported_at=timezone.now() - timedelta(days=days_ago))
+        return report
+
+    def test_archived_root_hands_cluster_to_earliest_remaining_duplicate(self):
+        notified_at = timezone.now() - timedelta(days=400)
+        root = self.found_report(400, owner_notified_at=notified_at)
+        first = self.found_report(3, duplicate_of=root)
+        second = self.found_report(1, duplicate_of=root)
+
+        self.assertEqual(archive.archive_found_reports(), 1)
+
+        self.assertEqual(ArchivedFoundReport.objects.get().pk, root.pk)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNone(first.duplicate_of_id)
+        self.assertEqual(first.owner_notified_at, notified_at)
+        self.assertEqual(second.duplicate_of_id, first.pk)
+        # The owner was told about this find already, so nothing is notified again
+        self.assertFalse(duplicates.unnotified_clusters().exists())
+
+
+class ArchiveReportsTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.device = RegisteredDevice.objects.create(
+            owner=self.owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23', color='Black',
+            status=RegisteredDevice.STATUS_RECOVERED,
+        )
+        self.case = TheftReport.objects.create(
+            device=self.device, region_of_theft='CE', date_time_of_theft=timezone.now() - timedelta(days=400),
+            last_known_location='Bambili', circumstances='Taken from a table.',
+            status=TheftReport.REPORT_STATUS_FINDER_RETURN,
+        )
+        self.case_found = FoundReport.objects.create(
+            theft_report=self.case, matched_device_direct=self.device, is_processed=True,
+            date_found=timezone.now() - timedelta(days=390), location_found='Bambili market',
+            device_condition='GOOD', return_method_preference='POLICE',
+        )
+        self.loose_found = FoundReport.objects.create(
+            is_processed=True, date_found=timezone.now() - timedelta(days=390), location_found='Bambili market',
+            device_condition='GOOD', return_method_preference='POLICE',
+        )
+        other_device = RegisteredDevice.objects.create(
+            owner=self.owner, imei=luhn_imei('49015420323751'), make='Tecno', model_name='Spark 10', color='Blue',
+            status=RegisteredDevice.STATUS_STOLEN,
+        )
+        self.active_case = TheftReport.objects.create(
+            device=other_device, region_of_theft='CE', date_time_of_theft=timezone.now() - timedelta(days=400),
+            last_known_location='Bambili', circumstances='Taken from a bag.',
+        )
+        long_ago = timezone.now() - timedelta(days=400)
+        TheftReport.objects.update(last_updated=long_ago)
+        FoundReport.objects.update(reported_at=long_ago)
+        self.client.force_login(self.owner)
+
+    def test_rows_move_and_keep_their_pks(self):
+        self.assertEqual(archive.archive_theft_reports(), (1, 1))
+        self.assertEqual(archive.archive_found_reports(), 1)
+
+        self.assertEqual(list(TheftReport.objects.all()), [self.active_case])
+        self.assertFalse(FoundReport.objects.exists())
+        archived_case = ArchivedTheftReport.objects.get()
+        self.assertEqual((archived_case.pk, archived_case.case_id), (self.case.pk, self.case.case_id))
+        self.assertEqual(
+            set(ArchivedFoundReport.objects.values_list('pk', 'theft_report_id')),
+            {(self.case_found.pk, self.case.pk), (self.loose_found.pk, None)},
+        )
+        # Nothing left to do on a second run
+        self.assertEqual(archive.archive_theft_reports(), (0, 0))
+        self.assertEqual(archive.archive_found_reports(), 0)
+
+    def test_lookups_keep_working(self):
+        archive.archive_theft_reports()
+
+        history = self.client.get(reverse('devices:user_archived_theft_report_list'))
+        self.assertContains(history, self.case.case_id)
+        self.assertRedirects(
+            self.client.get(reverse('devices:theft_report_detail', args=[self.case.pk])),
+            reverse('devices:archived_theft_report_detail', args=[self.case.pk]),
+        )
+        self.assertRedirects(
+            self.client.get(reverse('devices:found_report_owner_detail', args=[self.case_found.pk])),
+            reverse('devices:archived_found_report_detail', args=[self.case_found.pk]),
+        )
+        self.assertEqual(self.client.get(reverse('devices:theft_report_detail', args=[self.active_case.pk])).status_code, 200)
+
+        self.client.logout()
+        verified = self.client.post(reverse('devices:verify_device_imei'), {'imei': self.device.imei})
+        self.assertContains(verified, 'NOT currently reported as stolen')
+
+
+class PartialIMEISearchTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.device = RegisteredDevice.objects.create(
+            owner=owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23', color='Black',
+            status=RegisteredDevice.STATUS_STOLEN,
+        )
+        self.theft_report = TheftReport.objects.create(
+            device=self.device, region_of_theft='CE', date_time_of_theft=timezone.now() - timedelta(days=1),
+            last_known_location='Bambili', circumstances='Taken from a table.',
+        )
+        self.pattern = self.device.imei[:6] + '??' + self.device.imei[8:]
+
+    def test_page_shows_neither_imei_nor_case_id(self):
+        response = self.client.get(reverse('devices:partial_imei_search'), {'imei_pattern': self.pattern})
+        content = response.content.decode()
+        self.assertIn('Samsung Galaxy S23', content)
+        self.assertIn(self.pattern.replace('?', '•'), content)
+        self.assertNotIn(self.device.imei, content)
+        self.assertNotIn(self.theft_report.case_id, content)
+
+    def test_chosen_candidate_is_linked_without_being_shown(self):
+        response = self.client.get(reverse('devices:partial_imei_search'), {'imei_pattern': self.pattern})
+        link = re.search(r'href="([^"]*\?candidate=[^"]+)"', response.content.decode()).group(1)
+
+        form_page = self.client.get(link.replace('&amp;', '&')).content.decode()
+        self.assertIn('Samsung Galaxy S23', form_page)
+        self.assertNotIn(self.device.imei, form_page)
+        self.assertNotIn(self.theft_report.case_id, form_page)
+
+        self.client.post(reverse('devices:report_found_device'), {
+            'device_description_provided': 'Samsung Galaxy S23, Black',
+            'date_found': (timezone.now() - timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M'),
+            'location_found': 'Bambili market', 'device_condition': 'GOOD', 'return_method_preference': 'POLICE',
+        })
+        found = FoundReport.objects.get()
+        self.assertEqual(found.matched_device_direct, self.device)
+        self.assertEqual(found.theft_report, self.theft_report)
+
+    def test_tampered_token_is_ignored(self):
+        url = reverse('devices:report_found_device')
+        self.client.get(url, {'candidate': f'{self.device.pk}:forged'})
+        self.assertNotIn('prefill_device', self.client.session)
+
+
+class VerifyIMEICsrfTests(TestCase):
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.url = reverse('devices:verify_device_imei')
+        self.data = {'imei': luhn_imei('35693803564380')}
+
+    def test_anonymous_lookup_needs_no_token(self):
+        page = self.client.get(self.url)
+        self.assertNotIn('csrfmiddlewaretoken', page.content.decode())
+        self.assertFalse(page.cookies) # So the anonymous page cache can share it
+        self.assertEqual(self.client.post(self.url, self.data).status_code, 200)
+
+    def test_logged_in_post_is_checked(self):
+        user = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.client.force_login(user)
+        self.assertEqual(self.client.post(self.url, self.data).status_code, 403)
+
+        page = self.client.get(self.url).content.decode()
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1)
+        self.assertEqual(self.client.post(self.url, {**self.data, 'csrfmiddlewaretoken': token}).status_code, 200)
+
+
+class FoundReportNotificationTests(TestCase):
+    """The owner hears once per found report cluster, whatever the order the cluster's reports arrive in."""
+
+    def setUp(self):
+        owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.device = RegisteredDevice.objects.create(
+            owner=owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23', color='Black',
+            status=RegisteredDevice.STATUS_STOLEN,
+        )
+        TheftReport.objects.create(
+            device=self.device, region_of_theft='CE', date_time_of_theft=timezone.now() - timedelta(days=2),
+            last_known_location='Bambili', circumstances='Taken from a table.',
+        )
+
+    def report_found(self, **fields):
+        self.client.post(reverse('devices:report_found_device'), {
+            'device_description_provided': 'Black Samsung Galaxy with a cracked corner',
+            'date_found': (timezone.now() - timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M'),
+            'location_found': 'Bambili market, near the bus stop',
+            'device_condition': 'GOOD', 'return_method_preference': 'POLICE',
+            **fields,
+        })
+        return FoundReport.objects.latest('pk')
+
+    def test_matched_report_after_unmatched_one_notifies_owner(self):
+        description_only = self.report_found()
+        self.assertIsNone(description_only.matched_device_direct_id)
+
+        matched = self.report_found(imei_provided=self.device.imei)
+        self.assertEqual(matched.matched_device_direct, self.device)
+        self.assertIsNone(matched.duplicate_of_id) # Not folded under the root without the match
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OwnerNotification.objects.count(), 1)
+
+        repeat = self.report_found(imei_provided=self.device.imei)
+        self.assertEqual(repeat.duplicate_of_id, matched.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(duplicates.unnotified_clusters().exists())
+
+    def test_batch_notifies_cluster_matched_only_on_a_duplicate(self):
+        # Clustered before matched reports were kept out of unmatched clusters
+        fields = {
+            'date_found': timezone.now() - timedelta(hours=2), 'location_found': 'Bambili market',
+            'device_condition': 'GOOD', 'return_method_preference': 'POLICE',
+        }
+        root = FoundReport.objects.create(device_description_provided='Black Samsung', **fields)
+        duplicate = FoundReport.objects.create(
+            duplicate_of=root, imei_provided=self.device.imei, matched_device_direct=self.device, is_processed=True,
+            **fields,
+        )
+        self.assertEqual(list(duplicates.unnotified_clusters()), [root])
+
+        self.assertEqual(duplicates.notify_clusters('https://phoneindex.example/devices/my-devices/'), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        duplicate.refresh_from_db()
+        self.assertIsNotNone(duplicate.owner_notified_at)
+        self.assertFalse(duplicates.unnotified_clusters().exists())
+
+
+class IMEIFieldTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+
+    def device(self, imei):
+        return RegisteredDevice.objects.create(owner=self.owner, imei=imei, make='Tecno', model_name='Spark 10', color='Blue')
+
+    def test_round_trips_as_string_with_leading_zeros(self):
+        device = self.device('012345678901237')
+        device.refresh_from_db()
+        self.assertEqual(device.imei, '012345678901237')
+        self.assertEqual(RegisteredDevice.objects.values_list('imei', flat=True).get(), '012345678901237')
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT imei FROM devices_registereddevice')
+            self.assertEqual(cursor.fetchone(), (12345678901237,))
+
+    def test_lookups(self):
+        device = self.device('012345678901237')
+        other = self.device(luhn_imei('35693803564380'))
+        devices = RegisteredDevice.objects.order_by('pk')
+        self.assertEqual(list(devices.filter(imei='012345678901237')), [device])
+        self.assertEqual(list(devices.filter(imei=12345678901237)), [device])
+        self.assertEqual(list(devices.filter(imei__in=['012345678901237', other.imei])), [device, other])
+        # Text lookups compare the zero-padded text
+        self.assertEqual(list(devices.filter(imei__startswith='0123')), [device])
+        self.assertEqual(list(devices.filter(imei__contains='56938')), [other])
+
+    def test_invalid_lookup_value_matches_nothing(self):
+        self.device('012345678901237')
+        for value in ['not-an-imei', '1234567890123456', -5]:
+            with self.subTest(value=value):
+                self.assertFalse(RegisteredDevice.objects.filter(imei=value).exists())
+                self.assertFalse(RegisteredDevice.objects.filter(imei__in=[value]).exists())
+
+    def test_saving_invalid_value_raises(self):
+        for value in ['35693803564380x', '1234567890123456']:
+            with self.subTest(value=value), self.assertRaisesMessage(ValueError, 'expected an IMEI'):
+                with transaction.atomic():
+                    self.device(value)
+        self.assertFalse(RegisteredDevice.objects.exists())
+
+
+class NotificationBrokerTests(TransactionTestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.other = User.objects.create_user(email='other@example.com', password='secret-pass-1')
+        self.broker = NotificationBroker(poll_interval=0.01)
+
+    async def stop(self, *subscriptions):
+        for owner_id, queue in subscriptions:
+            self.broker.unsubscribe(owner_id, queue)
+        await asyncio.wait_for(self.broker._task, timeout=1)
+
+    async def notify(self, owner, message):
+        return await OwnerNotification.objects.acreate(owner=owner, kind=OwnerNotification.KIND_STATUS, message=message)
+
+    async def test_fans_out_to_every_queue_of_the_owner(self):
+        first = await self.broker.subscribe(self.owner.pk)
+        second = await self.broker.subscribe(self.owner.pk)
+        other = await self.broker.subscribe(self.other.pk)
+        self.assertEqual(self.broker.connection_count, 3)
+
+        notification = await self.notify(self.owner, 'Case updated')
+        for queue in (first, second):
+            self.assertEqual((await asyncio.wait_for(queue.get(), timeout=1)).pk, notification.pk)
+        self.assertTrue(other.empty())
+
+        await self.stop((self.owner.pk, first), (self.owner.pk, second), (self.other.pk, other))
+        self.assertIsNone(self.broker._task)
+
+    async def test_keeps_polling_after_a_failed_poll(self):
+        queue = await self.broker.subscribe(self.owner.pk)
+        poll_once = self.broker.poll_once
+        failures = [OperationalError('server closed the connection unexpectedly')] * 2
+
+        async def flaky_poll():
+            if failures:
+                raise failures.pop()
+            await poll_once()
+
+        self.broker.poll_once = flaky_poll
+        with self.assertLogs('devices.notifications', 'ERROR') as logs:
+            notification = await self.notify(self.owner, 'Case updated')
+            self.assertEqual((await asyncio.wait_for(queue.get(), timeout=1)).pk, notification.pk)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('2 in a row', logs.output[1])
+
+        await self.stop((self.owner.pk, queue))
+
+
+@override_settings(API_REQUIRE_TOKEN=True, API_TOKEN_MAX_AGE_SECONDS=3600, API_REVOKED_CLIENTS=['Revoked Ltd'])
+class APITokenTests(TestCase):
+    def setUp(self):
+        self.url = reverse('api:verify_imei', kwargs={'imei': luhn_imei('35693803564380')})
+
+    def get(self, token=None):
+        headers = {'Authorization': f'Token {token}'} if token is not None else {}
+        return self.client.get(self.url, headers=headers)
+
+    def test_valid_token(self):
+        response = self.get(api_auth.issue_token('Acme Mobile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'NOT_IN_OUR_REGISTRY')
+
+    def test_missing_token(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        self.assertEqual(self.client.get(self.url, headers={'Authorization': 'Bearer x'}).status_code, 401)
+
+    def test_tampered_token(self):
+        token = api_auth.issue_token('Acme Mobile')
+        payload, signature = token.rsplit(':', 1)
+        forged = api_auth.issue_token('Other Client').rsplit(':', 1)[0]
+        self.assertEqual(self.get(f'{forged}:{signature}').status_code, 401)
+        self.assertEqual(self.get(f'{payload}:{signature[::-1]}').status_code, 401)
+
+    def test_expired_token(self):
+        token = api_auth.issue_token('Acme Mobile')
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 3500):
+            self.assertEqual(self.get(token).status_code, 200)
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 3700):
+            self.assertEqual(self.get(token).status_code, 401)
+
+    def test_revoked_client(self):
+        self.assertEqual(self.get(api_auth.issue_token('Revoked Ltd')).status_code, 401)
+
+
+class ReportSearchIndexTests(TestCase):
+    """The FTS5 triggers (SQLite) or generated tsvector column (PostgreSQL) keep the index in step with the rows."""
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.device = RegisteredDevice.objects.create(
+            owner=self.owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23', color='Black',
+        )
+        self.theft_report = TheftReport.objects.create(
+            device=self.device, region_of_theft='CE', date_time_of_theft=timezone.now() - timedelta(days=1),
+            last_known_location='Mokolo market', circumstances='Snatched from a bag near the taxi rank.',
+        )
+
+    def ids(self, kind, query):
+        return [pk for pk, _rank in search.ranked_ids(kind, query)]
+
+    def test_new_and_edited_theft_report_is_searchable(self):
+        self.assertEqual(self.ids('theft', 'mokolo'), [self.theft_report.pk])
+        self.assertEqual(self.ids('theft', 'taxi'), [self.theft_report.pk])
+
+        self.theft_report.last_known_location = 'Bonaberi bridge'
+        self.theft_report.save()
+        self.assertEqual(self.ids('theft', 'mokolo'), [])
+        self.assertEqual(self.ids('theft', 'bonaberi'), [self.theft_report.pk])
+
+        self.theft_report.delete()
+        self.assertEqual(self.ids('theft', 'bonaberi'), [])
+
+    def test_new_and_edited_found_report_is_searchable(self):
+        found = FoundReport.objects.create(
+            date_found=timezone.now(), location_found='Bambili market', device_condition='GOOD',
+            return_method_preference='POLICE', device_description_provided='Black phone, cracked screen',
+        )
+        self.assertEqual(self.ids('found', 'cracked'), [found.pk])
+
+        FoundReport.objects.filter(pk=found.pk).update(device_description_provided='Blue phone in a leather case')
+        self.assertEqual(self.ids('found', 'cracked'), [])
+        self.assertEqual(self.ids('found', 'leather'), [found.pk])
+
+    def test_admin_search_uses_the_index(self):
+        staff = get_user_model().objects.create_superuser(email='staff@example.com', password='secret-pass-1')
+        self.client.force_login(staff)
+        url = reverse('admin:devices_theftreport_changelist')
+
+        for query in ['mokolo', 'taxi rank', self.theft_report.case_id, 'Galaxy']:
+            with self.subTest(query=query):
+                self.assertContains(self.client.get(url, {'q': query}), self.theft_report.case_id)
+        self.assertNotContains(self.client.get(url, {'q': 'bonaberi'}), self.theft_report.case_id)
+        # Index matches stay within the changelist filters
+        self.assertNotContains(
+            self.client.get(url, {'q': 'mokolo', 'status__exact': TheftReport.REPORT_STATUS_FALSE_ALARM}), self.theft_report.case_id,
+        )
+
+
+class CardFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.client.force_login(owner)
+        self.device = RegisteredDevice.objects.create(
+            owner=owner, imei=luhn_imei('35693803564380'), make='Samsung', model_name='Galaxy S23', color='Black',
+            status=RegisteredDevice.STATUS_STOLEN,
+        )
+        self.theft_report = TheftReport.objects.create(
+            device=self.device, region_of_theft='CE', date_time_of_theft=timezone.now() - timedelta(days=1),
+            last_known_location='Bambili', circumstances='Taken from a table.',
+        )
+
+    def card_key(self, kind, obj):
+        obj.refresh_from_db()
+        return fragments.card_key(kind, obj)
+
+    def test_editing_the_device_changes_its_card(self):
+        url = reverse('devices:user_device_list')
+        key = self.card_key(fragments.KIND_DEVICE, self.device)
+        self.assertContains(self.client.get(url), '<strong>Color:</strong> Black')
+        self.assertEqual(self.client.get(url).context['card_fragments'].keys(), {key}) # Cached now
+
+        self.device.color = 'Blue'
+        self.device.save()
+        self.assertNotEqual(self.card_key(fragments.KIND_DEVICE, self.device), key)
+        self.assertContains(self.client.get(url), '<strong>Color:</strong> Blue')
+
+    def test_editing_the_case_or_its_reports_changes_its_card(self):
+        url = reverse('devices:user_theft_report_list')
+        key = self.card_key(fragments.KIND_CASE, self.theft_report)
+        self.assertContains(self.client.get(url), 'Active Report')
+
+        self.theft_report.status = TheftReport.REPORT_STATUS_OWNER_RECOVERY
+        self.theft_report.save()
+        status_key = self.card_key(fragments.KIND_CASE, self.theft_report)
+        self.assertNotEqual(status_key, key)
+        self.assertContains(self.client.get(url), 'Resolved - Recovered by Owner')
+        self.assertNotContains(self.client.get(url), 'A found report has been submitted')
+
+        FoundReport.objects.create(
+            theft_report=self.theft_report, date_found=timezone.now(), location_found='Bambili market',
+            device_condition='GOOD', return_method_preference='POLICE',
+        )
+        self.assertNotEqual(self.card_key(fragments.KIND_CASE, self.theft_report), status_key)
+        self.assertContains(self.client.get(url), 'A found report has been submitted')
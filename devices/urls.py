@@ -1,19 +1,29 @@
+from django.conf import settings
 from django.urls import path
+from phoneindex.http_cache import anonymous_page_cache, csrf_exempt_anonymous
+from phoneindex.replicas import replica_reads # Read-only pages may read from a replica
 from .views import (RegisterDeviceView, 
                     UserDeviceListView, 
                     ReportDeviceStolenView,
                     TheftReportDetailView,
                     VerifyDeviceView,
+                    AsyncVerifyDeviceView,
                     ReportFoundDeviceView,
                     UserTheftReportListView,
                     FoundReportOwnerDetailView,
-                    DeleteDeviceView) # Import ReportDeviceStolenView
+                    DeleteDeviceView,
+                    ReportSearchView,
+                    PartialIMEISearchView,
+                    OwnerEventStreamView,
+                    UserArchivedTheftReportListView,
+                    ArchivedTheftReportDetailView,
+                    ArchivedFoundReportDetailView) # Import ReportDeviceStolenView
 
 app_name = 'devices'  # Define an application namespace
 
 urlpatterns = [
     path('register/', RegisterDeviceView.as_view(), name='register_device'),
-    path('my-devices/', UserDeviceListView.as_view(), name='user_device_list'),
+    path('my-devices/', replica_reads(UserDeviceListView.as_view()), name='user_device_list'),
     # Add other device-related URLs here in the future (e.g., device detail, edit, report stolen)
      # --- NEW URL FOR REPORTING A DEVICE STOLEN ---
     # It expects an integer 'device_pk' in the URL, which corresponds to the RegisteredDevice's primary key.
@@ -24,14 +34,29 @@ urlpatterns = [
     # --- NEW URL FOR VIEWING THEFT REPORT DETAILS ---
     # It expects an integer 'pk' which is the primary key of the TheftReport instance.
     path('report/<int:pk>/', TheftReportDetailView.as_view(), name='theft_report_detail'),
-    path('verify-imei/', VerifyDeviceView.as_view(), name='verify_device_imei'),
+    # Async-native variant when served by ASGI (see ASYNC_VIEWS in settings.py)
+    # Public lookup page: the GET form is served from the anonymous page cache, so the cached page carries
+    # no per-visitor token and the read-only anonymous lookup POST needs none; logged-in visitors' POSTs are checked
+    path('verify-imei/', anonymous_page_cache(csrf_exempt_anonymous(
+        replica_reads((AsyncVerifyDeviceView if settings.ASYNC_VIEWS else VerifyDeviceView).as_view()))), name='verify_device_imei'),
     # --- NEW URL FOR REPORTING A FOUND DEVICE (PUBLIC) ---
     path('report-found/', ReportFoundDeviceView.as_view(), name='report_found_device'),
+    # --- NEW URL FOR FINDERS WHO CAN ONLY READ PART OF THE IMEI (PUBLIC) ---
+    path('report-found/partial-imei/', replica_reads(PartialIMEISearchView.as_view()), name='partial_imei_search'),
+    # --- NEW URL FOR THE OWNER'S LIVE NOTIFICATION STREAM (SERVER-SENT EVENTS) ---
+    path('my-notifications/stream/', OwnerEventStreamView.as_view(), name='owner_event_stream'),
     # --- NEW URL FOR USER'S THEFT REPORT LIST ("MY CASES") ---
-    path('my-theft-reports/', UserTheftReportListView.as_view(), name='user_theft_report_list'),
+    path('my-theft-reports/', replica_reads(UserTheftReportListView.as_view()), name='user_theft_report_list'),
+    # --- CASE HISTORY: RESOLVED CASES AND FOUND REPORTS MOVED TO THE ARCHIVE (see devices/archive.py) ---
+    # The pks are those the reports had before archiving; the live detail URLs redirect here
+    path('my-theft-reports/history/', replica_reads(UserArchivedTheftReportListView.as_view()), name='user_archived_theft_report_list'),
+    path('report/archived/<int:pk>/', ArchivedTheftReportDetailView.as_view(), name='archived_theft_report_detail'),
+    path('found-report/archived/<int:pk>/view/', ArchivedFoundReportDetailView.as_view(), name='archived_found_report_detail'),
     # --- NEW URL FOR OWNER TO VIEW A SPECIFIC FOUND REPORT ---
     # pk here is the primary key of the FoundReport instance
     path('found-report/<int:pk>/view/', FoundReportOwnerDetailView.as_view(), name='found_report_owner_detail'), # --- NEW URL FOR DELETING A REGISTERED DEVICE ---
     # pk here is the primary key of the RegisteredDevice instance
     path('device/<int:pk>/delete/', DeleteDeviceView.as_view(), name='delete_device'),
+    # --- NEW URL FOR STAFF FULL-TEXT SEARCH OVER THEFT/FOUND REPORTS ---
+    path('staff/search/', replica_reads(ReportSearchView.as_view()), name='report_search'),
     ]
\ No newline at end of file
@@ -1,14 +1,22 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy,reverse
-from django.views.generic import CreateView, ListView,DetailView,FormView,DeleteView 
+from django.views.generic import View,CreateView, ListView,DetailView,FormView,DeleteView,TemplateView
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin,UserPassesTestMixin  # To protect views
 from django.contrib import messages
-from .models import RegisteredDevice,TheftReport
-from .forms import DeviceRegistrationForm,TheftReportForm,IMEIVerificationForm,FoundReport,FoundDeviceForm 
-from django.db import transaction # For atomic operations
-from django.core.mail import send_mail # For sending email notifications
-from django.conf import settings # To get DEFAULT_FROM_EMAIL
-from django.template.loader import render_to_string # For email templates
+from .models import RegisteredDevice,TheftReport,WebhookSubscription,ArchivedTheftReport,ArchivedFoundReport
+from .forms import DeviceRegistrationForm,TheftReportForm,IMEIVerificationForm,FoundReport,FoundDeviceForm,ReportSearchForm,PartialIMEISearchForm
+from . import search, webhooks, notifications, lookups, fragments, duplicates, locking
+from .partial_imei import candidate_token, device_pk_for_token, find_stolen_candidates, mask_imei
+from django.db import transaction, DatabaseError # For atomic operations
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.db.models import prefetch_related_objects
+from phoneindex import metrics # Business counters exported at /metrics
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class RegisterDeviceView(LoginRequiredMixin, CreateView):
@@ -40,17 +48,18 @@ class UserDeviceListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         # Optimized queryset to fetch related theft_report and its linked found_reports
         # This helps avoid multiple database hits in the template.
+        # Found reports are only prefetched for the cards that aren't cached (see get_context_data).
         return RegisteredDevice.objects.filter(
             owner=self.request.user
         ).select_related(
             'theft_report' # Selects the one-to-one theft_report
-        ).prefetch_related(
-            'theft_report__found_reports' # Prefetches all found_reports for each theft_report
         ).order_by('-registration_date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'My Registered Devices'
+        context['card_fragments'], missed = fragments.load_cards(fragments.KIND_DEVICE, context['devices'])
+        prefetch_related_objects(missed, 'theft_report__found_reports')
         if not context['devices'].exists():
             messages.info(self.request, "You haven't registered any devices yet. Register one now!")
         return context
@@ -80,9 +89,11 @@ class ReportDeviceStolenView(LoginRequiredMixin, UserPassesTestMixin, CreateView
 
 
     def get_device(self):
-        # Helper method to get the RegisteredDevice instance
-        device_pk = self.kwargs.get('device_pk')
-        return get_object_or_404(RegisteredDevice, pk=device_pk)
+        # Helper method to get the RegisteredDevice instance (cached, it's needed by every step of the request)
+        if not hasattr(self, '_device'):
+            device_pk = self.kwargs.get('device_pk')
+            self._device = get_object_or_404(RegisteredDevice.objects.select_related('theft_report'), pk=device_pk)
+        return self._device
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -90,20 +101,43 @@ class ReportDeviceStolenView(LoginRequiredMixin, UserPassesTestMixin, CreateView
         context['page_title'] = f"Report Stolen: {context['device'].make} {context['device'].model_name}"
         return context
 
-    def form_valid(self, form):
-        device_to_report = self.get_device()
-
-        # Check again if user is owner and device is 'NORMAL' before proceeding
-        if device_to_report.owner != self.request.user or device_to_report.status != RegisteredDevice.STATUS_NORMAL:
-            messages.error(self.request, "This device cannot be reported stolen at this time.")
-            return redirect(self.get_success_url()) # Or some other appropriate redirect
+    def already_reported(self, device, theft_report, submission_key):
+        """
+        Response for a device that already has a theft report. If the report was created by this
+        same form submission (a retry or double submit), answer exactly as the first submission did.
+        """
+        if submission_key and theft_report.submission_key and str(theft_report.submission_key) == str(submission_key):
+            messages.success(self.request,
+                             f"Device '{device.make} {device.model_name}' "
+                             f"has been reported stolen. Case ID: {theft_report.case_id}")
+        else:
+            messages.warning(self.request, f"Device '{device.make} {device.model_name}' already has an active theft report (Case ID: {theft_report.case_id}).")
+        return redirect(self.get_success_url())
 
+    def form_valid(self, form):
+        submission_key = form.cleaned_data.get('submission_key')
         try:
             with transaction.atomic(): # Ensure both operations succeed or fail together
+                # Lock the device row: a concurrent submission for the same device (double click, two tabs)
+                # waits here until this one commits, then finds its report instead of inserting a second one.
+                # (On SQLite, which has no FOR UPDATE, writers are serialized instead; see devices/locking.py.)
+                device_to_report = get_object_or_404(
+                    locking.for_update(RegisteredDevice.objects.all()), pk=self.kwargs.get('device_pk')
+                )
+                existing_report = TheftReport.objects.filter(device=device_to_report).first()
+                if existing_report is not None:
+                    return self.already_reported(device_to_report, existing_report, submission_key)
+
+                # Check again if user is owner and device is 'NORMAL' before proceeding
+                if device_to_report.owner_id != self.request.user.pk or device_to_report.status != RegisteredDevice.STATUS_NORMAL:
+                    messages.error(self.request, "This device cannot be reported stolen at this time.")
+                    return redirect(self.get_success_url()) # Or some other appropriate redirect
+
                 # 1. Save the TheftReport instance
                 # The form's model is TheftReport, so form.instance is a TheftReport object
                 theft_report = form.save(commit=False) # Don't save to DB yet
                 theft_report.device = device_to_report # Link the report to the specific device
+                theft_report.submission_key = submission_key
                 # case_id will be generated by TheftReport's save() method
                 theft_report.save() # Now save the TheftReport, generating case_id
 
@@ -111,29 +145,56 @@ class ReportDeviceStolenView(LoginRequiredMixin, UserPassesTestMixin, CreateView
                 device_to_report.status = RegisteredDevice.STATUS_STOLEN
                 device_to_report.save() # Save the updated device status
 
-            messages.success(self.request, 
+                # 3. Queue the partner webhook (delivered later by `manage.py deliver_webhooks`)
+                webhooks.enqueue_event(
+                    WebhookSubscription.EVENT_DEVICE_STOLEN,
+                    webhooks.device_payload(device_to_report, theft_report),
+                )
+
+            messages.success(self.request,
                              f"Device '{device_to_report.make} {device_to_report.model_name}' "
                              f"has been reported stolen. Case ID: {theft_report.case_id}")
-        except Exception as e:
-            # Log the exception e
+        except (DatabaseError, ValidationError):
+            logger.exception("Reporting device %s stolen failed", self.kwargs.get('device_pk'))
             messages.error(self.request, "An error occurred while reporting the device. Please try again.")
-            # Optionally, redirect to an error page or back to the form
             return self.form_invalid(form)
-            
+
         return redirect(self.get_success_url())
 
     def dispatch(self, request, *args, **kwargs):
         # Additional check before even displaying the form
         # Check if a theft report already exists for this device
         device = self.get_device()
-        if hasattr(device, 'theft_report') and device.theft_report is not None:
-            messages.warning(request, f"Device '{device.make} {device.model_name}' already has an active theft report (Case ID: {device.theft_report.case_id}).")
-            return redirect(reverse_lazy('devices:user_device_list'))
+        theft_report = getattr(device, 'theft_report', None)
+        if theft_report is not None:
+            # A resubmission of the form that created the report gets the original answer back
+            submission_key = request.POST.get('submission_key') if device.owner_id == request.user.pk else None
+            return self.already_reported(device, theft_report, submission_key)
         return super().dispatch(request, *args, **kwargs)
 
 # --- NEW VIEW FOR DISPLAYING THEFT REPORT DETAILS ---
-class TheftReportDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class ArchiveRedirectMixin:
+    """
+    Detail views of TheftReport/FoundReport: rows moved to the archive keep their pk
+    (devices/archive.py), so a missing pk is looked up there and redirected to its
+    archived page. Costs nothing for rows that are still in the hot table.
+    """
+    archive_model = None
+    archive_url_name = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            if self.archive_model is not None and self.archive_model.objects.filter(pk=kwargs['pk']).exists():
+                return redirect(self.archive_url_name, pk=kwargs['pk'])
+            raise
+
+
+class TheftReportDetailView(ArchiveRedirectMixin, LoginRequiredMixin, UserPassesTestMixin, DetailView):
     model = TheftReport
+    archive_model = ArchivedTheftReport
+    archive_url_name = 'devices:archived_theft_report_detail'
     template_name = 'devices/theft_report_detail.html'
     context_object_name = 'theft_report' # Name to use in the template for the TheftReport instance
 
@@ -183,48 +244,9 @@ class VerifyDeviceView(FormView):
         imei_to_check = form.cleaned_data['imei']
         context = self.get_context_data() # Get existing context (includes the form)
         context['submitted_imei'] = imei_to_check # Pass submitted IMEI back to template
-
-        try:
-            device = RegisteredDevice.objects.get(imei=imei_to_check)
-            
-            if device.status == RegisteredDevice.STATUS_STOLEN:
-                context['verification_status'] = 'STOLEN'
-                context['device_info'] = {
-                    'make': device.make,
-                    'model_name': device.model_name,
-                    'color': device.color,
-                    'storage_capacity': device.storage_capacity,
-                    # Add other non-PII general description fields if desired
-                }
-                if hasattr(device, 'theft_report') and device.theft_report:
-                    context['theft_report_info'] = {
-                        'case_id': device.theft_report.case_id,
-                        'date_reported': device.theft_report.reported_at,
-                        'status': device.theft_report.get_status_display(), # Human-readable status
-                    }
-                else:
-                    # This case should ideally not happen if a device is STOLEN
-                    # but its theft_report was somehow deleted or not created.
-                    context['theft_report_info'] = { 
-                        'status': 'Details Unavailable' 
-                    }
-
-            elif device.status in [RegisteredDevice.STATUS_NORMAL, 
-                                   RegisteredDevice.STATUS_RECOVERED, 
-                                   RegisteredDevice.STATUS_FALSE_ALARM]:
-                context['verification_status'] = 'CLEAN'
-                context['message'] = "This device is registered in our system and is NOT currently reported as stolen."
-            
-            else: # Other statuses, treat as clean for verification purposes for now
-                context['verification_status'] = 'CLEAN'
-                context['message'] = f"This device is registered with status: {device.get_status_display()}."
-
-
-        except RegisteredDevice.DoesNotExist:
-            context['verification_status'] = 'NOT_IN_OUR_REGISTRY'
-            context['message'] = "This IMEI was not found in our device registry. This means it is not reported as stolen through our system."
-            # For Sarah, this is effectively "CLEAN" in terms of being reported on our platform.
-
+        # Adds verification_status plus message or device_info/theft_report_info (see devices/lookups.py)
+        context.update(lookups.verification_result(lookups.lookup_device_for_verification(imei_to_check)))
+        metrics.record_verification('web', context['verification_status'])
         # Re-render the same page with the form and the results in the context
         return self.render_to_response(context)
 
@@ -236,6 +258,39 @@ class VerifyDeviceView(FormView):
         messages.error(self.request, "Invalid IMEI format. Please check the number and try again.")
         return self.render_to_response(context)
 
+# --- ASYNC-NATIVE VERSION OF VerifyDeviceView (USED WHEN settings.ASYNC_VIEWS IS ON, I.E. UNDER ASGI) ---
+class AsyncVerifyDeviceView(View):
+    """
+    Same page and behaviour as VerifyDeviceView, but every handler is async so under
+    ASGI the request never leaves the event loop: the device lookup uses afirst(), the
+    user is resolved with auser(), and the template is rendered directly (rendering
+    does no I/O once the user and session are loaded).
+    """
+    template_name = VerifyDeviceView.template_name
+    form_class = VerifyDeviceView.form_class
+
+    async def _render(self, request, form, **extra_context):
+        # The base template reads `user`; resolve it asynchronously so the lazy
+        # request.user doesn't hit the database synchronously while rendering.
+        request.user = await request.auser()
+        context = {'form': form, 'page_title': 'Verify Device IMEI', 'view': self}
+        context.update(extra_context)
+        return render(request, self.template_name, context)
+
+    async def get(self, request, *args, **kwargs):
+        return await self._render(request, self.form_class())
+
+    async def post(self, request, *args, **kwargs):
+        form = self.form_class(request.POST)
+        if not form.is_valid(): # Format checks only, no database access
+            messages.error(request, "Invalid IMEI format. Please check the number and try again.")
+            return await self._render(request, form, page_title='Verify Device IMEI - Error')
+        imei_to_check = form.cleaned_data['imei']
+        device = await lookups.alookup_device_for_verification(imei_to_check)
+        result = lookups.verification_result(device)
+        metrics.record_verification('web', result['verification_status'])
+        return await self._render(request, form, submitted_imei=imei_to_check, **result)
+
 # --- NEW VIEW FOR SUBMITTING A FOUND DEVICE REPORT (PUBLIC) ---
 class ReportFoundDeviceView(CreateView):
     model = FoundReport
@@ -256,8 +311,6 @@ class ReportFoundDeviceView(CreateView):
         # Attempt to get 'case_id' and 'imei' from URL query parameters (e.g., /?case_id=X&imei=Y)
         case_id_from_get = self.request.GET.get('case_id')
         imei_from_get = self.request.GET.get('imei')
-        
-        prefilled_description = None # To store any generated description
 
         # --- Session Management for Pre-filled Data ---
         # On a GET request, we capture the pre-fill values from URL parameters
@@ -269,6 +322,18 @@ class ReportFoundDeviceView(CreateView):
             self.request.session.pop('prefill_case_id', None)
             self.request.session.pop('prefill_imei', None)
             self.request.session.pop('prefill_description', None)
+            self.request.session.pop('prefill_device', None)
+
+            # A device chosen on the partial IMEI search comes as a signed token, never as its IMEI or
+            # Case ID (that page is public); it is matched on submission and not shown in the form
+            device_pk = device_pk_for_token(self.request.GET.get('candidate', ''))
+            device = RegisteredDevice.objects.filter(pk=device_pk).first() if device_pk else None
+            if device is not None:
+                self.request.session['prefill_device'] = device.pk
+                initial['device_description_provided'] = (
+                    f"{device.make} {device.model_name}, {device.color} (chosen in the partial IMEI search)."
+                )
+                self.request.session['prefill_description'] = initial['device_description_provided']
 
             if case_id_from_get:
                 initial['case_id_provided'] = case_id_from_get
@@ -291,50 +356,20 @@ class ReportFoundDeviceView(CreateView):
         # --- End Session Management ---
 
         # --- Logic to Generate Pre-filled Description ---
-        # This runs for both GET (to initially pre-fill) and POST (to re-populate initial for the form)
-        current_case_id_for_desc = initial.get('case_id_provided')
-        current_imei_for_desc = initial.get('imei_provided')
-
-        if current_case_id_for_desc:
-            try:
-                theft_report = TheftReport.objects.select_related('device').get(case_id=current_case_id_for_desc)
-                device = theft_report.device
-                prefilled_description = f"Device linked to Case ID {current_case_id_for_desc}: {device.make} {device.model_name}, {device.color}."
-                # If IMEI wasn't passed in URL but we found it via Case ID, add it to initial for the form
-                if not current_imei_for_desc and device.imei:
-                     initial['imei_provided'] = device.imei
-                     # If this is a GET request, also store this newly found IMEI in session
-                     if self.request.method == 'GET': 
-                         self.request.session['prefill_imei'] = device.imei
-            except TheftReport.DoesNotExist:
-                prefilled_description = f"No active theft report found for Case ID {current_case_id_for_desc}. Please describe the device you found."
-        
-        # Check current_imei_for_desc (it might have been populated by the case_id logic above or from GET param)
-        if current_imei_for_desc:
-            if not prefilled_description: # Only generate description from IMEI if Case ID didn't already do it
-                try:
-                    device = RegisteredDevice.objects.get(imei=current_imei_for_desc)
-                    prefilled_description = f"Device with IMEI {current_imei_for_desc}: {device.make} {device.model_name}, {device.color}."
-                    # If device is stolen and has a report, and case_id wasn't initially provided, pre-fill it
-                    if device.status == RegisteredDevice.STATUS_STOLEN and \
-                       hasattr(device, 'theft_report') and device.theft_report and \
-                       not initial.get('case_id_provided'): # Check if case_id is not already set in initial
-                        initial['case_id_provided'] = device.theft_report.case_id
-                        # If this is a GET request, also store this newly found Case ID in session
-                        if self.request.method == 'GET': 
-                            self.request.session['prefill_case_id'] = device.theft_report.case_id
-                        # Update description to reflect that Case ID was found
-                        prefilled_description = f"Device linked to Case ID {device.theft_report.case_id} (IMEI {current_imei_for_desc}): {device.make} {device.model_name}, {device.color}."
-                except RegisteredDevice.DoesNotExist:
-                    if not prefilled_description: # Only if no description was generated yet
-                        prefilled_description = f"Device with IMEI {current_imei_for_desc} not found in our registry. Please describe the device you found."
-        
-        if prefilled_description:
-            initial['device_description_provided'] = prefilled_description
-            # If this is a GET request, store the generated description in session as well
-            if self.request.method == 'GET':
-                 self.request.session['prefill_description'] = prefilled_description
-        
+        # This runs for both GET (to initially pre-fill) and POST (to re-populate initial for the form).
+        # The lookups live in devices/lookups.py so the async API can share them.
+        prefill = lookups.found_prefill(initial.get('case_id_provided'), initial.get('imei_provided'))
+        initial.update(prefill)
+        # If this is a GET request, also store anything newly found (Case ID via IMEI, IMEI via Case ID,
+        # the generated description) in session so an invalid POST can re-render it
+        if self.request.method == 'GET':
+            if 'case_id_provided' in prefill:
+                self.request.session['prefill_case_id'] = prefill['case_id_provided']
+            if 'imei_provided' in prefill:
+                self.request.session['prefill_imei'] = prefill['imei_provided']
+            if 'device_description_provided' in prefill:
+                self.request.session['prefill_description'] = prefill['device_description_provided']
+
         return initial
 
     def form_valid(self, form):
@@ -351,85 +386,56 @@ class ReportFoundDeviceView(CreateView):
         case_id_from_form = form.cleaned_data.get('case_id_provided')
         imei_from_form = form.cleaned_data.get('imei_provided')
         
-        matched_theft_report = None
-        matched_device = None
-
-        # Attempt to match with an existing TheftReport using the provided Case ID
-        if case_id_from_form:
-            try:
-                # select_related is used to optimize DB query by fetching related objects in one go
-                matched_theft_report = TheftReport.objects.select_related('device__owner').get(case_id=case_id_from_form)
-                matched_device = matched_theft_report.device
-            except TheftReport.DoesNotExist:
-                pass # No report found for this Case ID, will proceed to check IMEI if provided
-        
-        # If no match by Case ID, or if Case ID wasn't provided, try by IMEI
-        if not matched_theft_report and imei_from_form:
-            try:
-                device_by_imei = RegisteredDevice.objects.select_related('owner').get(imei=imei_from_form)
-                matched_device = device_by_imei # We found a device
-                # Check if this device has an active theft report associated with it
-                if hasattr(device_by_imei, 'theft_report') and device_by_imei.theft_report:
-                    matched_theft_report = device_by_imei.theft_report
-            except RegisteredDevice.DoesNotExist:
-                pass # No device found for this IMEI
+        # Match by Case ID first, then by IMEI (see devices/lookups.py)
+        matched_theft_report, matched_device = lookups.match_found_report(case_id_from_form, imei_from_form)
+        if matched_device is None and self.request.session.get('prefill_device'):
+            matched_theft_report, matched_device = lookups.match_found_device(pk=self.request.session['prefill_device'])
 
         # Link the FoundReport to the matched TheftReport and/or RegisteredDevice
         if matched_theft_report:
             found_report.theft_report = matched_theft_report
         if matched_device:
-            found_report.matched_device = matched_device # Store direct link to the device
+            found_report.matched_device_direct = matched_device # Store direct link to the device
         
         # Mark as processed if we found a device match in our system
         found_report.is_processed = bool(matched_device) 
-        found_report.save() # Now save the FoundReport with any established links
+        with transaction.atomic():
+            if matched_device:
+                # Lock the device so simultaneous reports of the same find can't both start a cluster
+                # (and both notify the owner); the second one waits and joins the first one's cluster
+                locking.for_update(RegisteredDevice.objects.filter(pk=matched_device.pk)).exists()
+            else:
+                locking.write_lock(FoundReport) # SQLite: the cluster lookup below reads before the insert
+            # Repeat submissions of a find already reported join its cluster (see devices/duplicates.py)
+            found_report.duplicate_of = duplicates.find_cluster_root(found_report)
+            # One notification per cluster: a duplicate stays silent if the owner was already told about the find.
+            # Claimed before the lock is released, so a simultaneous duplicate sees it and stays silent too.
+            notify_owner = bool(matched_device and matched_device.owner) and (
+                found_report.duplicate_of is None or not duplicates.owner_already_notified(found_report.duplicate_of)
+            )
+            if notify_owner:
+                found_report.owner_notified_at = timezone.now()
+            found_report.save() # Now save the FoundReport with any established links
 
         # --- Send notification to owner if a match was successful ---
-        if matched_device and matched_device.owner:
-            owner = matched_device.owner
-            email_context = {
-                'owner_name': owner.first_name or owner.email.split('@')[0],
-                'device_make_model': f"{matched_device.make} {matched_device.model_name}",
-                'case_id': matched_theft_report.case_id if matched_theft_report else "N/A (Check device details)",
-                'date_found': found_report.date_found,
-                'location_found': found_report.location_found,
-                'device_condition': found_report.get_device_condition_display(), # Uses model's get_FOO_display
-                'return_method_preference': found_report.get_return_method_preference_display(),
-                'finder_message': found_report.finder_message_to_owner or "No message provided by finder.",
-                'action_url': self.request.build_absolute_uri(
+        if notify_owner:
+            email_sent = notifications.notify_owner_of_find(
+                found_report, matched_theft_report, matched_device,
+                action_url=self.request.build_absolute_uri(
                     reverse('devices:user_device_list') # Direct owner to their list of devices
                 ),
-            }
-            
-            subject = f"Good News! Your device '{email_context['device_make_model']}' may have been found - Case {email_context['case_id']}"
-            html_message = render_to_string('devices/emails/owner_found_device_notification.html', email_context)
-            plain_message = render_to_string('devices/emails/owner_found_device_notification.txt', email_context)
-
-            try:
-                send_mail(
-                    subject,
-                    plain_message,
-                    settings.DEFAULT_FROM_EMAIL, # From settings.py
-                    [owner.email],
-                    html_message=html_message,
-                    fail_silently=False # Raise an error if email sending fails
-                )
-                # TODO (Future): Create an in-app Notification model instance here for the owner
-            except Exception as e:
-                # Log the email sending failure for admin review
-                print(f"CRITICAL: Error sending 'found device' email to {owner.email} for case {found_report.pk}: {e}")
+            )
+            if not email_sent:
                 # Inform the finder that their report is submitted, but also note the notification issue subtly
                 messages.warning(self.request, 
                                  "Thank you for your report! It has been submitted. "
                                  "There was an issue sending an immediate notification to the owner, but our team will review.")
-                # Don't redirect yet, let the main success message handle it or decide on specific error flow
-                # For now, we'll let it fall through to the generic success message and redirect.
-                # In a production system, you might want to handle this more gracefully or retry email.
 
         # Clear session prefill data on successful submission
         self.request.session.pop('prefill_case_id', None)
         self.request.session.pop('prefill_imei', None)
         self.request.session.pop('prefill_description', None)
+        self.request.session.pop('prefill_device', None)
 
         messages.success(self.request, 
                          "Thank you for your report! We have recorded the information. "
@@ -472,6 +478,8 @@ class UserTheftReportListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'My Reported Cases'
+        context['card_fragments'], missed = fragments.load_cards(fragments.KIND_CASE, context['theft_reports'])
+        prefetch_related_objects(missed, 'found_reports')
         if not context['theft_reports'].exists() and not self.request.GET.get('page'): # Avoid message on subsequent pages of pagination
             messages.info(self.request, "You have not reported any devices stolen, or all your reported cases are resolved in a way that removes them from this list (pending logic).")
             # Note: The message above might need refinement based on how "resolved" cases are handled.
@@ -479,8 +487,10 @@ class UserTheftReportListView(LoginRequiredMixin, ListView):
         return context
 
 # --- NEW VIEW FOR OWNER TO SEE DETAILS OF A SPECIFIC FOUND REPORT ---
-class FoundReportOwnerDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class FoundReportOwnerDetailView(ArchiveRedirectMixin, LoginRequiredMixin, UserPassesTestMixin, DetailView):
     model = FoundReport # This view is for the FoundReport model
+    archive_model = ArchivedFoundReport
+    archive_url_name = 'devices:archived_found_report_detail'
     template_name = 'devices/found_report_owner_detail.html' # New template
     context_object_name = 'found_report' # Name to use in the template for the FoundReport instance
 
@@ -535,6 +545,57 @@ class FoundReportOwnerDetailView(LoginRequiredMixin, UserPassesTestMixin, Detail
         
         return context
 
+# --- CASE HISTORY: RESOLVED CASES MOVED TO THE ARCHIVE (see devices/archive.py) ---
+class UserArchivedTheftReportListView(LoginRequiredMixin, ListView):
+    model = ArchivedTheftReport
+    template_name = 'devices/archived_theft_report_list.html'
+    context_object_name = 'theft_reports'
+    paginate_by = 10
+
+    def get_queryset(self):
+        return (ArchivedTheftReport.objects.filter(device__owner=self.request.user)
+                .select_related('device').prefetch_related('found_reports').order_by('-reported_at'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = 'Case History'
+        context['archive_after_days'] = settings.THEFT_REPORT_ARCHIVE_AFTER_DAYS
+        return context
+
+
+class ArchivedTheftReportDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+    model = ArchivedTheftReport
+    template_name = 'devices/archived_theft_report_detail.html'
+    context_object_name = 'theft_report'
+
+    def get_queryset(self):
+        return ArchivedTheftReport.objects.select_related('device__owner')
+
+    def test_func(self):
+        return self.get_object().device.owner == self.request.user or self.request.user.is_staff
+
+    def handle_no_permission(self):
+        messages.error(self.request, "You do not have permission to view this theft report.")
+        if self.request.user.is_authenticated:
+            return redirect(reverse_lazy('devices:user_device_list'))
+        return redirect(reverse_lazy('home'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['device'] = self.object.device
+        context['found_reports'] = self.object.found_reports.all()
+        context['page_title'] = f"Archived Theft Report: Case ID {self.object.case_id}"
+        return context
+
+
+class ArchivedFoundReportDetailView(FoundReportOwnerDetailView):
+    """Same page as FoundReportOwnerDetailView, for a found report moved to the archive."""
+    model = ArchivedFoundReport
+    archive_model = None
+
+    def get_queryset(self):
+        return ArchivedFoundReport.objects.select_related('theft_report__device__owner')
+
 # --- NEW VIEW FOR DELETING A REGISTERED DEVICE ---
 class DeleteDeviceView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     model = RegisteredDevice
@@ -564,4 +625,78 @@ class DeleteDeviceView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = f"Confirm Delete: {self.object.make} {self.object.model_name}"
-        return context
\ No newline at end of file
+        return context
+# --- NEW VIEW FOR STAFF FULL-TEXT SEARCH OVER REPORTS ---
+class ReportSearchView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    template_name = 'devices/report_search.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def handle_no_permission(self):
+        messages.error(self.request, "Only staff members can search reports.")
+        if self.request.user.is_authenticated:
+            return redirect(reverse_lazy('devices:user_device_list'))
+        return redirect(reverse_lazy('login'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = 'Search Reports'
+        # Bind the form only when a query was submitted so the empty page doesn't show errors
+        form = ReportSearchForm(self.request.GET or None)
+        context['form'] = form
+        if form.is_bound and form.is_valid():
+            context['query'] = form.cleaned_data['q']
+            context['hits'] = search.search_reports(form.cleaned_data['q'], kinds=form.get_kinds())
+        return context
+
+# --- NEW VIEW FOR FINDERS WHO CAN ONLY READ PART OF THE IMEI (PUBLIC) ---
+class PartialIMEISearchView(TemplateView):
+    template_name = 'devices/partial_imei_search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = 'Find a Device by Partial IMEI'
+        # Read-only lookup, so it is a GET form (bookmarkable, no CSRF token needed)
+        form = PartialIMEISearchForm(self.request.GET or None)
+        context['form'] = form
+        if form.is_bound and form.is_valid():
+            pattern = form.cleaned_data['imei_pattern']
+            context['pattern'] = pattern
+            context['masked_imei'] = mask_imei(pattern)
+            candidates = find_stolen_candidates(pattern, form.cleaned_data.get('device_description'))
+            for device in candidates:
+                device.candidate_token = candidate_token(device)
+            context['candidates'] = candidates
+        return context
+
+# --- NEW VIEW STREAMING LIVE NOTIFICATIONS TO THE OWNER (SERVER-SENT EVENTS, ASYNC) ---
+class OwnerEventStreamView(View):
+    """
+    Fully async so that, under ASGI, every open stream is a coroutine rather than a thread.
+    See devices/notifications.py for the broker feeding it.
+
+    With LIVE_NOTIFICATIONS off (WSGI), answers 204 at once: the endless stream would be
+    collected into a list before sending anything, and EventSource stops reconnecting on a 204.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if not settings.LIVE_NOTIFICATIONS:
+            return HttpResponse(status=204)
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponse(status=401)
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            notifications.event_stream(user.pk, last_event_id),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no' # Don't let nginx buffer the stream
+        return response
@@ -0,0 +1,271 @@
+"""
+Webhook fan-out to partner systems (carriers, resellers).
+
+Request path: views call enqueue_event() inside their transaction. It only writes
+an outbox WebhookEvent row plus one pending WebhookDelivery per interested
+subscription, no network I/O happens while serving the user.
+
+Worker (`python manage.py deliver_webhooks`): claims due deliveries, groups them
+per subscription into batches, and POSTs each batch as one signed JSON document.
+Batches are sent concurrently from a bounded thread pool; every worker thread
+keeps its own keep-alive HTTP connections per host so consecutive batches reuse
+the TCP/TLS connection. Failures are retried with exponential backoff and jitter.
+
+Signature header (verify on the partner side):
+    X-PhoneIndex-Signature: t=<unix timestamp>,v1=<hex HMAC-SHA256(secret, "<t>.<body>")>
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import locking
+from .models import WebhookSubscription, WebhookEvent, WebhookDelivery
+
+USER_AGENT = 'PhoneIndex-Webhooks/1.0'
+SIGNATURE_HEADER = 'X-PhoneIndex-Signature'
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# --- Request path ---
+
+def device_payload(device, theft_report=None):
+    """Partner-facing description of a device. Never includes owner details."""
+    payload = {
+        'imei': device.imei,
+        'make': device.make,
+        'model_name': device.model_name,
+        'color': device.color,
+        'device_status': device.status,
+    }
+    if theft_report is not None:
+        payload.update({
+            'case_id': theft_report.case_id,
+            'case_status': theft_report.status,
+            'region_of_theft': theft_report.region_of_theft,
+            'reported_at': theft_report.reported_at.isoformat() if theft_report.reported_at else None,
+        })
+    return payload
+
+
+def enqueue_event(event_type, payload):
+    """
+    Records an event in the outbox and creates a pending delivery for every active
+    subscription interested in it. Call it inside the transaction that made the change
+    so the event exists if and only if the change was committed.
+    """
+    subscriptions = [
+        subscription for subscription in WebhookSubscription.objects.filter(is_active=True)
+        if subscription.wants(event_type)
+    ]
+    if not subscriptions:
+        return None
+    event = WebhookEvent.objects.create(event_type=event_type, payload=payload)
+    WebhookDelivery.objects.bulk_create([
+        WebhookDelivery(subscription=subscription, event=event)
+        for subscription in subscriptions
+    ])
+    return event
+
+
+# --- Worker ---
+
+def sign_payload(secret, body, timestamp=None):
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next attempt: exponential, capped, with +/-20% jitter."""
+    base = _setting('WEBHOOK_BACKOFF_BASE_SECONDS', 10)
+    cap = _setting('WEBHOOK_BACKOFF_MAX_SECONDS', 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class ConnectionPool(threading.local):
+    """Per-thread keep-alive HTTP(S) connections, keyed by (scheme, host, port)."""
+
+    def get(self, scheme, host, port, timeout):
+        connections = self.__dict__.setdefault('connections', {})
+        key = (scheme, host, port)
+        conn = connections.get(key)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = conn_class(host, port, timeout=timeout)
+            connections[key] = conn
+        return conn
+
+    def discard(self, scheme, host, port):
+        conn = self.__dict__.get('connections', {}).pop((scheme, host, port), None)
+        if conn is not None:
+            conn.close()
+
+
+_pool = ConnectionPool()
+
+
+def post_batch(url, secret, events, timeout=None):
+    """
+    POSTs one batch of events to a subscriber. Runs in a worker thread and does no DB access.
+    Returns (response_status or None, latency in ms, error message).
+    """
+    timeout = timeout or _setting('WEBHOOK_TIMEOUT_SECONDS', 5)
+    body = json.dumps({'events': events}, separators=(',', ':'), default=str).encode()
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': USER_AGENT,
+        SIGNATURE_HEADER: sign_payload(secret, body),
+    }
+
+    started = time.perf_counter()
+    # A pooled connection may have been closed by the server since the last batch,
+    # so one failure on a reused connection is retried on a fresh one.
+    for attempt in range(2):
+        conn = _pool.get(parts.scheme, parts.hostname, port, timeout)
+        try:
+            conn.request('POST', path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read() # Drain so the connection can be reused
+            if response.will_close:
+                _pool.discard(parts.scheme, parts.hostname, port)
+            latency_ms = (time.perf_counter() - started) * 1000
+            error = '' if 200 <= response.status < 300 else f"HTTP {response.status}"
+            return response.status, latency_ms, error
+        except (OSError, http.client.HTTPException) as exc:
+            _pool.discard(parts.scheme, parts.hostname, port)
+            if attempt == 1:
+                return None, (time.perf_counter() - started) * 1000, f"{exc.__class__.__name__}: {exc}"
+
+
+def claim_due_deliveries(limit):
+    """
+    Leases up to `limit` due deliveries by pushing their next_attempt_at forward.
+    A crashed worker's lease simply expires and the deliveries are picked up again.
+    On PostgreSQL, SKIP LOCKED lets several workers claim disjoint sets concurrently.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=_setting('WEBHOOK_LEASE_SECONDS', 60))
+    with transaction.atomic():
+        queryset = WebhookDelivery.objects.filter(
+            status=WebhookDelivery.STATUS_PENDING,
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            # Lock only the delivery rows; locking the joined subscription would make
+            # a second worker skip every delivery of that subscription.
+            of = ('self',) if connection.features.has_select_for_update_of else ()
+            queryset = queryset.select_for_update(skip_locked=True, of=of)
+        else:
+            # SQLite: a second worker waits here, then sees the first one's leases
+            queryset = locking.for_update(queryset)
+        deliveries = list(queryset.select_related('subscription', 'event')[:limit])
+        if deliveries:
+            WebhookDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(next_attempt_at=now + lease)
+    return deliveries
+
+
+def _record_results(deliveries, status, latency_ms, error):
+    now = timezone.now()
+    max_attempts = _setting('WEBHOOK_MAX_ATTEMPTS', 8)
+    for delivery in deliveries:
+        delivery.attempts += 1
+        delivery.response_status = status
+        delivery.latency_ms = latency_ms
+        delivery.last_error = error
+        if not error:
+            delivery.status = WebhookDelivery.STATUS_DELIVERED
+            delivery.delivered_at = now
+        elif delivery.attempts >= max_attempts:
+            delivery.status = WebhookDelivery.STATUS_FAILED
+        else:
+            delivery.next_attempt_at = now + timedelta(seconds=backoff_delay(delivery.attempts))
+    WebhookDelivery.objects.bulk_update(
+        deliveries,
+        ['attempts', 'response_status', 'latency_ms', 'last_error', 'status', 'delivered_at', 'next_attempt_at'],
+    )
+
+
+def deliver_due(executor, limit=None, batch_size=None):
+    """
+    Claims due deliveries, sends them batched per subscription on the executor,
+    records the outcome. Returns (batches sent, deliveries succeeded, deliveries failed).
+    """
+    limit = limit or _setting('WEBHOOK_CLAIM_LIMIT', 500)
+    batch_size = batch_size or _setting('WEBHOOK_BATCH_SIZE', 50)
+    deliveries = claim_due_deliveries(limit)
+    if not deliveries:
+        return 0, 0, 0
+
+    per_subscription = defaultdict(list)
+    for delivery in deliveries:
+        per_subscription[delivery.subscription_id].append(delivery)
+
+    futures = []
+    for subscription_deliveries in per_subscription.values():
+        subscription = subscription_deliveries[0].subscription
+        for start in range(0, len(subscription_deliveries), batch_size):
+            batch = subscription_deliveries[start:start + batch_size]
+            events = [
+                {
+                    'id': delivery.event_id,
+                    'type': delivery.event.event_type,
+                    'created_at': delivery.event.created_at.isoformat(),
+                    'data': delivery.event.payload,
+                }
+                for delivery in batch
+            ]
+            futures.append((batch, executor.submit(post_batch, subscription.url, subscription.secret, events)))
+
+    succeeded = failed = 0
+    # DB writes stay on this thread, worker threads only do HTTP
+    for batch, future in futures:
+        try:
+            status, latency_ms, error = future.result()
+        except Exception as exc:
+            logger.exception("Sending a webhook batch to subscription %s failed", batch[0].subscription_id)
+            # A bug or a malformed subscription URL fails this batch like a network error would,
+            # with backoff, instead of aborting the loop and leaving the other batches unrecorded
+            status, latency_ms, error = None, None, f"{exc.__class__.__name__}: {exc}"
+        _record_results(batch, status, latency_ms, error)
+        if error:
+            failed += len(batch)
+        else:
+            succeeded += len(batch)
+    return len(futures), succeeded, failed
+
+
+def run_worker(concurrency=None, poll_interval=None, once=False, stdout=None):
+    concurrency = concurrency or _setting('WEBHOOK_CONCURRENCY', 8)
+    poll_interval = poll_interval if poll_interval is not None else _setting('WEBHOOK_POLL_INTERVAL_SECONDS', 2)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='webhook') as executor:
+        # Pooled connections live in the executor's threads and are closed when they exit
+        while True:
+            batches, succeeded, failed = deliver_due(executor)
+            if batches and stdout is not None:
+                stdout.write(f"Sent {batches} batch(es): {succeeded} delivered, {failed} failed")
+            if once:
+                break
+            if not batches:
+                time.sleep(poll_interval)
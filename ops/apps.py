@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class OpsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ops'
+
+    def ready(self):
+        # Installs the slow-query timer on every DB connection, also for management commands
+        from . import slow_queries # noqa: F401
+        from . import checks # noqa: F401 (registers the system checks)
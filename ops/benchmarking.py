@@ -0,0 +1,200 @@
+"""
+Small helpers shared by the benchmark and load-test management commands:
+latency summaries, a keep-alive HTTP load generator, and a context manager that
+runs a real server process (gunicorn/uvicorn) for the duration of a benchmark.
+"""
+import http.client
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (pct in 0-100)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms, elapsed_seconds=None):
+    """Count, throughput and latency distribution (milliseconds) of a list of samples."""
+    values = sorted(latencies_ms)
+    summary = {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 3) if values else None,
+        'p50_ms': percentile(values, 50),
+        'p95_ms': percentile(values, 95),
+        'p99_ms': percentile(values, 99),
+        'max_ms': values[-1] if values else None,
+    }
+    for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'):
+        if summary[key] is not None:
+            summary[key] = round(summary[key], 3)
+    if elapsed_seconds:
+        summary['throughput_rps'] = round(len(values) / elapsed_seconds, 1)
+    return summary
+
+
+def environment_info():
+    """Recorded next to results so runs on different machines aren't compared blindly."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database_vendor': settings.DATABASES['default'].get('ENGINE', '').rsplit('.', 1)[-1],
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def write_results(path, results):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True, default=str) + '\n')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# --- HTTP load generation ---
+
+def run_http_load(host, port, paths, total_requests, concurrency, headers=None, timeout=30):
+    """
+    Sends `total_requests` GET requests spread round-robin over `paths` from
+    `concurrency` threads, each holding one keep-alive connection.
+    Returns {'elapsed_seconds', 'paths': {path: {'latencies_ms': [...], 'errors': n, 'statuses': {...}}}}.
+    """
+    headers = dict(headers or {})
+    results = defaultdict(lambda: {'latencies_ms': [], 'errors': 0, 'statuses': defaultdict(int)})
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker():
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        local = defaultdict(lambda: {'latencies_ms': [], 'errors': 0, 'statuses': defaultdict(int)})
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            path = paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                local[path]['statuses'][response.status] += 1
+                if response.status >= 400:
+                    local[path]['errors'] += 1
+                else:
+                    local[path]['latencies_ms'].append(elapsed_ms)
+                if response.will_close:
+                    conn.close()
+                    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+            except (OSError, http.client.HTTPException):
+                local[path]['errors'] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn.close()
+        with lock:
+            for path, data in local.items():
+                results[path]['latencies_ms'].extend(data['latencies_ms'])
+                results[path]['errors'] += data['errors']
+                for status, count in data['statuses'].items():
+                    results[path]['statuses'][status] += count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return {
+        'elapsed_seconds': time.perf_counter() - started,
+        'paths': {path: {**data, 'statuses': dict(data['statuses'])} for path, data in results.items()},
+    }
+
+
+def wait_until_ready(host, port, path, timeout, headers=None):
+    """Polls `path` until it answers with a non-5xx status. Returns seconds waited, or None on timeout."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', path, headers=headers or {})
+            status = conn.getresponse().status
+            conn.close()
+            if status < 500:
+                return time.perf_counter() - started
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+class ServerProcess:
+    """
+    Runs a server command (e.g. gunicorn) in a subprocess for the duration of a `with` block.
+
+        with ServerProcess(['gunicorn', 'phoneindex.wsgi:application', '--bind', f'127.0.0.1:{port}'],
+                           port=port, ready_path='/') as server:
+            ...  # server.startup_seconds is the time to the first non-5xx response
+    """
+
+    def __init__(self, command, port, ready_path='/', env=None, startup_timeout=60, host='127.0.0.1'):
+        self.command = command
+        self.host = host
+        self.port = port
+        self.ready_path = ready_path
+        self.env = {**os.environ, 'ALLOWED_HOSTS': f'{host},localhost', **(env or {})}
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.log = None
+        self.startup_seconds = None
+
+    def __enter__(self):
+        # A file rather than a pipe, so a chatty server can never block on a full pipe buffer
+        self.log = tempfile.TemporaryFile()
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            self.command, env=self.env, cwd=settings.BASE_DIR,
+            stdout=subprocess.DEVNULL, stderr=self.log,
+        )
+        waited = wait_until_ready(self.host, self.port, self.ready_path, self.startup_timeout)
+        if waited is None or self.process.poll() is not None:
+            self.log.seek(0)
+            output = self.log.read().decode(errors='replace')[-2000:]
+            self.__exit__(None, None, None)
+            raise RuntimeError(f"Server did not become ready: {' '.join(self.command)}\n{output}")
+        self.startup_seconds = time.perf_counter() - started
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+        return False
+
+
+def gunicorn_command(*args):
+    """gunicorn from the same environment as the running interpreter."""
+    return [sys.executable, '-m', 'gunicorn', *args]
@@ -0,0 +1,19 @@
+"""
+System checks for the deploy.
+
+Without `npm run build` (deploy/build.sh), static/dist/ doesn't exist: pages still render,
+but the stylesheet and script they link to are missing, so they come out unstyled.
+"""
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register(checks.Tags.staticfiles)
+def check_static_build(app_configs, **kwargs):
+    if settings.STATIC_BUILT:
+        return []
+    return [checks.Warning(
+        f"{settings.STATIC_DIST_DIR} doesn't exist: pages will be served without the site's CSS and JS.",
+        hint='Run `npm ci && npm run build` (deploy/build.sh does it for a deploy).',
+        id='ops.W001',
+    )]
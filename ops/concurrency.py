@@ -0,0 +1,103 @@
+"""
+Concurrency check for reporting a device stolen.
+
+Several logged-in sessions of the same owner (think double clicks, retries, two
+browser tabs) submit the report form for one device at the same instant, against a
+real multi-worker server. Afterwards the device must have exactly one theft report,
+every submission must have been answered with a redirect, and every answer must
+name that one case:
+
+- same_key=True:  all submissions carry the idempotency key of one rendered form,
+                  so all of them are told the device "has been reported stolen".
+- same_key=False: each session renders its own form; one submission creates the
+                  case, the others are told it "already has an active theft report".
+"""
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from .loadtest import Recorder, VirtualUser
+
+_SUBMISSION_KEY = re.compile(r'name="submission_key" value="([0-9a-f-]+)"')
+_ALERT = re.compile(r'class="alert alert-(\w+)[^"]*"[^>]*>\s*(.*?)\s*<button', re.S)
+_CASE_ID = re.compile(r'Case ID: (CR-[\w-]+)')
+
+
+def _report_form(rng):
+    stolen_at = datetime.now(dt_timezone.utc) - timedelta(hours=rng.randrange(2, 48))
+    return {
+        'region_of_theft': 'CE', 'date_time_of_theft': stolen_at.strftime('%Y-%m-%dT%H:%M'),
+        'is_time_approximate': 'on', 'last_known_location': 'Concurrency check',
+        'circumstances': 'Concurrency check: parallel submissions for one device.',
+    }
+
+
+def race_report_stolen(host, port, email, password, device_pk, sessions, same_key, seed=1):
+    """
+    Fires `sessions` simultaneous report submissions for `device_pk`.
+    Returns one {'status', 'alert', 'case_id'} per submission, where 'alert' is the kind of
+    message shown on the page the submission redirected to (success, warning, danger).
+    """
+    rng = random.Random(seed)
+    path = f'/devices/{device_pk}/report-stolen/'
+    users = [VirtualUser(host, port, email, password, Recorder(), 0, rng) for _ in range(sessions)]
+    try:
+        forms = []
+        for user in users:
+            if not user.login():
+                raise RuntimeError(f"Could not log in as {email}")
+            _, content, _ = user._request('GET', path)
+            match = _SUBMISSION_KEY.search(content.decode(errors='replace'))
+            if match is None:
+                raise RuntimeError(f"No submission key on {path}; is the device reportable?")
+            forms.append({**_report_form(rng), 'submission_key': match.group(1)})
+        if same_key:
+            forms = [{**form, 'submission_key': forms[0]['submission_key']} for form in forms]
+
+        barrier = threading.Barrier(sessions)
+        outcomes = [None] * sessions
+
+        def submit(index):
+            user = users[index]
+            user.reconnect() # The server may have closed the idle keep-alive connection meanwhile
+            barrier.wait() # Release every submission at the same instant
+            status, _, _ = user._request('POST', path, forms[index])
+            outcome = {'status': status, 'alert': None, 'case_id': None}
+            if status == 302:
+                _, content, _ = user._request('GET', '/devices/my-devices/')
+                alert = _ALERT.search(content.decode(errors='replace'))
+                if alert:
+                    outcome['alert'] = alert.group(1)
+                    case_id = _CASE_ID.search(alert.group(2))
+                    outcome['case_id'] = case_id.group(1) if case_id else None
+            outcomes[index] = outcome
+
+        threads = [threading.Thread(target=submit, args=(index,), daemon=True) for index in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+    finally:
+        for user in users:
+            user.close()
+
+
+def problems(outcomes, case_ids, same_key):
+    """What went wrong in a race, given its outcomes and the case IDs now stored for the device."""
+    found = []
+    if len(case_ids) != 1:
+        found.append(f"{len(case_ids)} theft reports stored for the device, expected 1")
+    statuses = sorted({outcome['status'] for outcome in outcomes}, key=str)
+    if statuses != [302]:
+        found.append(f"response statuses {statuses}, expected only 302")
+    named = {outcome['case_id'] for outcome in outcomes}
+    if len(case_ids) == 1 and named != set(case_ids):
+        found.append(f"responses named cases {sorted(named, key=str)}, expected {case_ids[0]}")
+    alerts = [outcome['alert'] for outcome in outcomes]
+    if same_key and set(alerts) != {'success'}:
+        found.append(f"alerts {alerts}, expected only success for retries of one submission")
+    if not same_key and (alerts.count('success') != 1 or alerts.count('warning') != len(alerts) - 1):
+        found.append(f"alerts {alerts}, expected one success and warnings for the other submissions")
+    return found
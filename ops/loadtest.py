@@ -0,0 +1,238 @@
+"""
+End-to-end load test of the main user flows against a real server process.
+
+Each virtual user is a thread holding one keep-alive connection and its own cookies
+(session, CSRF). It logs in as one of the synthetic owners (ops/synthetic.py), then
+repeats the flows below, pausing between requests for an exponentially distributed
+think time, as a person filling in forms would:
+
+- verify:        GET the verification page, POST an IMEI (stolen, clean or unknown)
+- register:      GET the registration form, POST a new device
+- report_stolen: GET My Devices, GET the report form of a NORMAL device, POST it
+- report_found:  GET the found report form pre-filled from a stolen IMEI, POST it
+- lists:         GET My Devices and My Cases
+
+Queries per request come from the server's own /metrics (phoneindex/metrics.py):
+the DB-queries histogram per URL name is read before and after the run and diffed.
+"""
+import http.client
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from .synthetic import DEVICE_MODELS, PLACES, REGIONS, luhn_check_digit
+
+FLOWS = ('verify', 'register', 'report_stolen', 'report_found', 'lists')
+REGISTER_TAC = '35888888' # IMEIs registered during load tests
+_REPORT_LINK = re.compile(r'href="/devices/(\d+)/report-stolen/"')
+
+# Step name -> URL name the server labels its metrics with
+STEP_VIEWS = {
+    'login': 'login',
+    'verify_form': 'devices:verify_device_imei',
+    'verify_submit': 'devices:verify_device_imei',
+    'register_form': 'devices:register_device',
+    'register_submit': 'devices:register_device',
+    'my_devices': 'devices:user_device_list',
+    'report_stolen_form': 'devices:report_device_stolen',
+    'report_stolen_submit': 'devices:report_device_stolen',
+    'report_found_form': 'devices:report_found_device',
+    'report_found_submit': 'devices:report_found_device',
+    'my_cases': 'devices:user_theft_report_list',
+}
+
+
+class Recorder:
+    """Thread-safe latency/status collection per (flow, step)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(lambda: {'latencies_ms': [], 'errors': 0, 'statuses': defaultdict(int)})
+
+    def add(self, flow, step, status, elapsed_ms, ok):
+        with self._lock:
+            sample = self.samples[(flow, step)]
+            sample['statuses'][status] += 1
+            if ok:
+                sample['latencies_ms'].append(elapsed_ms)
+            else:
+                sample['errors'] += 1
+
+
+class VirtualUser:
+    def __init__(self, host, port, email, password, recorder, think_time, rng, timeout=30):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.email, self.password = email, password
+        self.recorder = recorder
+        self.think_time = think_time
+        self.rng = rng
+        self.cookies = {}
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    # --- HTTP ---
+
+    def _request(self, method, path, form=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if form is not None:
+            form = {**form, 'csrfmiddlewaretoken': self.cookies.get('csrftoken', '')}
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.reconnect()
+            return None, b'', (time.perf_counter() - started) * 1000
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        if response.will_close:
+            self.reconnect()
+        return response.status, content, elapsed_ms
+
+    def reconnect(self):
+        self.conn.close()
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def step(self, flow, step, method, path, form=None, expect=(200,)):
+        status, content, elapsed_ms = self._request(method, path, form)
+        self.recorder.add(flow, step, status, elapsed_ms, status in expect)
+        self.think()
+        return status, content
+
+    def think(self):
+        if self.think_time:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+
+    # --- Flows ---
+
+    def login(self):
+        self._request('GET', '/accounts/login/') # Sets the CSRF cookie
+        status, _ = self.step('login', 'login', 'POST', '/accounts/login/',
+                              {'username': self.email, 'password': self.password}, expect=(302,))
+        return status == 302
+
+    def verify(self, imeis):
+        self.step('verify', 'verify_form', 'GET', '/devices/verify-imei/')
+        self.step('verify', 'verify_submit', 'POST', '/devices/verify-imei/', {'imei': self.rng.choice(imeis)})
+
+    def register(self):
+        make, model, _ = self.rng.choice(DEVICE_MODELS)
+        partial = f'{REGISTER_TAC}{self.rng.randrange(10 ** 6):06d}'
+        self.step('register', 'register_form', 'GET', '/devices/register/')
+        self.step('register', 'register_submit', 'POST', '/devices/register/', {
+            'imei': partial + luhn_check_digit(partial), 'make': make, 'model_name': model,
+            'color': 'Black', 'storage_capacity': '128GB', 'distinguishing_features': 'Load test device',
+        }, expect=(302,))
+
+    def report_stolen(self):
+        _, content = self.step('report_stolen', 'my_devices', 'GET', '/devices/my-devices/')
+        device_pks = _REPORT_LINK.findall(content.decode(errors='replace'))
+        if not device_pks:
+            return # Every device of this owner is already reported; the register flow adds new ones
+        path = f'/devices/{self.rng.choice(device_pks)}/report-stolen/'
+        region = self.rng.choice(REGIONS)
+        stolen_at = datetime.now(dt_timezone.utc) - timedelta(days=1, hours=self.rng.randrange(48))
+        self.step('report_stolen', 'report_stolen_form', 'GET', path)
+        self.step('report_stolen', 'report_stolen_submit', 'POST', path, {
+            'region_of_theft': region, 'date_time_of_theft': stolen_at.strftime('%Y-%m-%dT%H:%M'),
+            'is_time_approximate': 'on', 'last_known_location': self.rng.choice(PLACES[region]),
+            'circumstances': 'Load test: taken from a bag at the market.',
+        }, expect=(302,))
+
+    def report_found(self, stolen_imeis):
+        path = f'/devices/report-found/?imei={self.rng.choice(stolen_imeis)}'
+        found_at = datetime.now(dt_timezone.utc) - timedelta(hours=self.rng.randrange(2, 48))
+        self.step('report_found', 'report_found_form', 'GET', path)
+        self.step('report_found', 'report_found_submit', 'POST', path, {
+            'date_found': found_at.strftime('%Y-%m-%dT%H:%M'), 'location_found': 'Load test: on a bench',
+            'device_condition': 'GOOD', 'return_method_preference': 'POLICE',
+        }, expect=(302,))
+
+    def lists(self):
+        self.step('lists', 'my_devices', 'GET', '/devices/my-devices/')
+        self.step('lists', 'my_cases', 'GET', '/devices/my-theft-reports/')
+
+    def close(self):
+        self.conn.close()
+
+
+def run(host, port, owners, iterations, think_time, flows, lookup_imeis, stolen_imeis, seed=1):
+    """
+    Runs `iterations` rounds of `flows` for every owner (email, password) concurrently.
+    Returns (Recorder, elapsed seconds).
+    """
+    recorder = Recorder()
+
+    def user_loop(index, email, password):
+        rng = random.Random(f'{seed}:{index}')
+        user = VirtualUser(host, port, email, password, recorder, think_time, rng)
+        try:
+            if not user.login():
+                return
+            for _ in range(iterations):
+                for flow in rng.sample(flows, len(flows)): # Same flows, different order per round
+                    if flow == 'verify':
+                        user.verify(lookup_imeis)
+                    elif flow == 'report_found':
+                        user.report_found(stolen_imeis)
+                    else:
+                        getattr(user, flow)()
+        finally:
+            user.close()
+
+    threads = [
+        threading.Thread(target=user_loop, args=(index, email, password), daemon=True)
+        for index, (email, password) in enumerate(owners)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+# --- Server-side query counts from /metrics ---
+
+_SAMPLE = re.compile(r'^phoneindex_http_request_db_queries_(sum|count)\{([^}]*)\} ([0-9.eE+-]+)$')
+_VIEW_LABEL = re.compile(r'view="([^"]*)"')
+
+
+def scrape_query_totals(host, port):
+    """{view name: [queries, requests]} from the server's /metrics, summed over label sets."""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        conn.request('GET', '/metrics')
+        text = conn.getresponse().read().decode()
+    finally:
+        conn.close()
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            kind, labels, value = match.groups()
+            view = _VIEW_LABEL.search(labels).group(1)
+            totals[view][0 if kind == 'sum' else 1] += float(value)
+    return totals
+
+
+def queries_per_request(before, after):
+    result = {}
+    for view, (queries, requests) in after.items():
+        queries -= before.get(view, (0, 0))[0]
+        requests -= before.get(view, (0, 0))[1]
+        if requests:
+            result[view] = round(queries / requests, 2)
+    return result
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from devices.api_auth import issue_token
+from devices.models import RegisteredDevice
+from ops.benchmarking import (
+    ServerProcess, environment_info, free_port, gunicorn_command, run_http_load, summarize, write_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the verify/lookup endpoints served by gunicorn WSGI (gthread workers, sync views) "
+        "and gunicorn + uvicorn ASGI workers (async views) under the same concurrent load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per server (default: 2000).')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections (default: 32).')
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes (default: 2).')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per WSGI worker (default: 8).')
+        parser.add_argument('--imei', help='IMEI to look up (default: the first stolen device, else any device).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        imei = options['imei'] or self._pick_imei()
+        paths = [
+            '/devices/verify-imei/',
+            f'/api/verify/{imei}/',
+            f'/api/found-prefill/?imei={imei}',
+        ]
+        headers = {'Authorization': f"Token {issue_token('bench_asgi')}"}
+        servers = {
+            'wsgi': (
+                ['phoneindex.wsgi:application', '--worker-class', 'gthread',
+                 '--workers', str(options['workers']), '--threads', str(options['threads'])],
+                {'ASYNC_VIEWS': 'False'},
+            ),
+            'asgi': (
+                ['phoneindex.asgi:application', '-c', 'deploy/gunicorn_asgi.py',
+                 '--workers', str(options['workers'])],
+                {'ASYNC_VIEWS': 'True'},
+            ),
+        }
+
+        results = {'environment': environment_info(), 'options': {
+            'requests': options['requests'], 'concurrency': options['concurrency'],
+            'workers': options['workers'], 'threads': options['threads'], 'imei': imei,
+        }, 'servers': {}}
+
+        for name, (args, env) in servers.items():
+            port = free_port()
+            command = gunicorn_command(*args, '--bind', f'127.0.0.1:{port}')
+            self.stdout.write(f"Starting {name}: {' '.join(command)}")
+            try:
+                with ServerProcess(command, port=port, ready_path=paths[1], env=env) as server:
+                    # Warm every worker's imports and DB connection before measuring
+                    run_http_load(server.host, port, paths, options['concurrency'] * 4, options['concurrency'], headers)
+                    load = run_http_load(server.host, port, paths, options['requests'], options['concurrency'], headers)
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            results['servers'][name] = {
+                'startup_seconds': round(server.startup_seconds, 3),
+                'elapsed_seconds': round(load['elapsed_seconds'], 3),
+                'paths': {
+                    path: {**summarize(data['latencies_ms'], load['elapsed_seconds']),
+                           'errors': data['errors'], 'statuses': data['statuses']}
+                    for path, data in load['paths'].items()
+                },
+            }
+
+        self._print_table(results['servers'])
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _pick_imei(self):
+        device = (RegisteredDevice.objects.filter(status=RegisteredDevice.STATUS_STOLEN).first()
+                  or RegisteredDevice.objects.first())
+        if device is None:
+            raise CommandError("No registered devices to look up; pass --imei or create some data first.")
+        return device.imei
+
+    def _print_table(self, servers):
+        self.stdout.write(f"{'server':<6} {'path':<45} {'ok':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for name, data in servers.items():
+            for path, stats in data['paths'].items():
+                self.stdout.write(
+                    f"{name:<6} {path:<45} {stats['count']:>6} {stats['errors']:>5} "
+                    f"{stats['p50_ms'] or 0:>8.2f} {stats['p95_ms'] or 0:>8.2f} {stats['p99_ms'] or 0:>8.2f} "
+                    f"{stats.get('throughput_rps', 0):>8.1f}"
+                )
@@ -0,0 +1,109 @@
+import copy
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from devices.lookups import _device_queryset
+from devices.models import RegisteredDevice
+from ops.benchmarking import environment_info, summarize, write_results
+
+MODES = ('none', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the database part of a verify request under each connection mode (see DB_CONNECTIONS in "
+        "settings.py): 'none' connects per request, 'persistent' reuses the thread's connection, 'pool' "
+        "borrows one from a psycopg pool (PostgreSQL only). Each simulated request does what Django does "
+        "around a view (close_old_connections before and after) plus the verify lookup query, on "
+        "--threads threads like a gthread worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--requests', type=int, default=2000, help='Simulated requests per mode and thread.')
+        parser.add_argument('--threads', type=int, default=1, help='Concurrent request threads (default: 1).')
+        parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated, from {', '.join(MODES)}.")
+        parser.add_argument('--pool-size', type=int, default=4, help='max_size of the pool in pool mode.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        base = connections[options['database']].settings_dict
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        if unknown := set(modes) - set(MODES):
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        if 'pool' in modes and connections[options['database']].vendor != 'postgresql':
+            self.stdout.write("Skipping 'pool': connection pooling needs PostgreSQL.")
+            modes.remove('pool')
+        imeis = list(RegisteredDevice.objects.values_list('imei', flat=True)[:1000]) or ['490154203237518']
+
+        results = {
+            'environment': environment_info(),
+            'options': {key: options[key] for key in ('database', 'requests', 'threads', 'pool_size')},
+            'modes': {},
+        }
+        for mode in modes:
+            self.stdout.write(f"{mode}: {options['requests']} requests x {options['threads']} threads...")
+            results['modes'][mode] = self._run(mode, base, imeis, options)
+
+        self.stdout.write(f"{'mode':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'connects':>10}")
+        for mode, data in results['modes'].items():
+            self.stdout.write(
+                f"{mode:<12}{data.get('throughput_rps') or 0:>9.0f}{data['p50_ms']:>9.3f}{data['p95_ms']:>9.3f}"
+                f"{data['p99_ms']:>9.3f}{data['connects']:>10}"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _settings(self, mode, base, options):
+        settings_dict = copy.deepcopy(base)
+        settings_dict['OPTIONS'].pop('pool', None)
+        settings_dict['CONN_MAX_AGE'] = 600 if mode == 'persistent' else 0
+        if mode == 'pool':
+            settings_dict['OPTIONS']['pool'] = {'min_size': 1, 'max_size': options['pool_size']}
+        return settings_dict
+
+    def _run(self, mode, base, imeis, options):
+        settings_dict = self._settings(mode, base, options)
+        backend = type(connections[options['database']])
+        alias = f"bench_{mode}" # Own alias, so the pool doesn't replace the site's (pools are kept per alias)
+        latencies, connects, lock = [], [0], threading.Lock()
+
+        def worker(seed):
+            wrapper = backend(copy.deepcopy(settings_dict), alias)
+            rng = random.Random(seed)
+            own, opened = [], 0
+            for _ in range(options['requests']):
+                sql, params = _device_queryset(rng.choice(imeis))[:1].query.get_compiler(connection=wrapper).as_sql()
+                started = time.perf_counter()
+                wrapper.close_if_unusable_or_obsolete() # request_started
+                if wrapper.connection is None and mode != 'pool':
+                    opened += 1
+                with wrapper.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                wrapper.close_if_unusable_or_obsolete() # request_finished
+                own.append((time.perf_counter() - started) * 1000)
+            wrapper.close()
+            with lock:
+                latencies.extend(own)
+                connects[0] += opened
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if mode == 'pool':
+            wrapper = backend(copy.deepcopy(settings_dict), alias)
+            connects[0] = wrapper.pool.get_stats().get('connections_num', 0)
+            wrapper.close_pool()
+        latencies.sort()
+        return {**summarize(latencies, elapsed), 'connects': connects[0]}
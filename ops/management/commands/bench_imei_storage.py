@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ops.benchmarking import environment_info, percentile, write_results
+from ops.synthetic import imei_for
+
+TABLES = {
+    # layout name -> (scratch table, column type, IMEI -> parameter)
+    'varchar(15)': ('bench_imei_text', 'varchar(15)', str),
+    'bigint': ('bench_imei_int', 'bigint', int),
+}
+IN_LIST_SIZE = 10 # About the number of Luhn-valid completions of a partial IMEI with one unknown digit
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares storing IMEIs as varchar(15) (before) and as bigint (after, devices.fields.IMEIField): "
+        "size of the unique index and latency of point and IN-list lookups, on two scratch tables filled "
+        "with the same IMEIs in the current database. The scratch tables are dropped afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000, help='IMEIs per table (default: 200000).')
+        parser.add_argument('--lookups', type=int, default=20_000, help='Timed lookups per query type (default: 20000).')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError("Index sizes can only be measured on SQLite and PostgreSQL.")
+        rows = options['rows']
+        imeis = [imei_for(index, options['seed']) for index in range(rows)]
+        rng = random.Random(options['seed'])
+        probes = [rng.choice(imeis) for _ in range(options['lookups'])]
+        in_lists = [rng.sample(imeis, IN_LIST_SIZE) for _ in range(options['lookups'] // IN_LIST_SIZE)]
+
+        results = {'environment': environment_info(), 'options': {'rows': rows, 'lookups': options['lookups']}, 'layouts': {}}
+        for layout, (table, column_type, to_param) in TABLES.items():
+            self.stdout.write(f"Filling {table} ({column_type}) with {rows} IMEIs...")
+            try:
+                self._create(table, column_type, [to_param(imei) for imei in imeis])
+                index_bytes = self._index_bytes(table)
+                results['layouts'][layout] = {
+                    'index_bytes': index_bytes,
+                    'index_bytes_per_row': round(index_bytes / rows, 1) if index_bytes else None,
+                    'point_lookup': self._time(table, [[to_param(imei)] for imei in probes], 'imei = %s'),
+                    'in_list_lookup': self._time(
+                        table, [[to_param(imei) for imei in batch] for batch in in_lists],
+                        f"imei IN ({', '.join(['%s'] * IN_LIST_SIZE)})",
+                    ),
+                }
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+        self.stdout.write(f"{'layout':<14}{'index KiB':>11}{'B/row':>8}{'point p50 us':>14}{'p95 us':>9}{'IN p50 us':>11}{'p95 us':>9}")
+        for layout, data in results['layouts'].items():
+            point, in_list = data['point_lookup'], data['in_list_lookup']
+            self.stdout.write(
+                f"{layout:<14}{(data['index_bytes'] or 0) / 1024:>11.0f}{data['index_bytes_per_row'] or 0:>8}"
+                f"{point['p50_us']:>14.1f}{point['p95_us']:>9.1f}{in_list['p50_us']:>11.1f}{in_list['p95_us']:>9.1f}"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _create(self, table, column_type, values):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute(f'CREATE TABLE {table} (id integer PRIMARY KEY, imei {column_type} NOT NULL UNIQUE)')
+            for start in range(0, len(values), 10_000):
+                cursor.executemany(
+                    f'INSERT INTO {table} (id, imei) VALUES (%s, %s)',
+                    [(start + offset + 1, value) for offset, value in enumerate(values[start:start + 10_000])],
+                )
+            cursor.execute(f'ANALYZE {table}')
+
+    def _index_bytes(self, table):
+        """Size of the unique index on the imei column."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT sum(pg_relation_size(indexrelid)) FROM pg_index "
+                    "WHERE indrelid = %s::regclass AND NOT indisprimary", [table],
+                )
+                return int(cursor.fetchone()[0] or 0)
+            try:
+                cursor.execute(
+                    "SELECT sum(pgsize) FROM dbstat WHERE name IN "
+                    "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)", [table],
+                )
+            except Exception: # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+                return None
+            return int(cursor.fetchone()[0] or 0)
+
+    def _time(self, table, param_sets, condition):
+        sql = f'SELECT id FROM {table} WHERE {condition}'
+        timings = []
+        with connection.cursor() as cursor:
+            for params in param_sets[:100]: # Warm-up
+                cursor.execute(sql, params)
+                cursor.fetchall()
+            for params in param_sets:
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1e6)
+        timings.sort()
+        return {
+            'count': len(timings),
+            'mean_us': round(statistics.fmean(timings), 2),
+            'p50_us': round(percentile(timings, 50), 2),
+            'p95_us': round(percentile(timings, 95), 2),
+        }
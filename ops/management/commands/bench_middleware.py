@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from devices.api_auth import issue_token
+from devices.models import RegisteredDevice
+from ops.benchmarking import environment_info, summarize, write_results
+
+LEAN_MIDDLEWARE = 'phoneindex.routing.LeanRouteMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures in-process latency and DB queries of the API verify endpoint through the full "
+        "middleware stack and through the lean route (phoneindex/routing.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario (default: 2000).')
+        parser.add_argument('--imei', help='IMEI to look up (default: any registered device).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        imei = options['imei'] or RegisteredDevice.objects.values_list('imei', flat=True).first()
+        if not imei:
+            raise CommandError("No registered devices to look up; pass --imei or create some data first.")
+        path = f'/api/verify/{imei}/'
+        token = issue_token('bench_middleware')
+
+        full_stack = [name for name in settings.MIDDLEWARE if name != LEAN_MIDDLEWARE]
+        lean_stack = list(settings.MIDDLEWARE) if LEAN_MIDDLEWARE in settings.MIDDLEWARE else [full_stack[0], LEAN_MIDDLEWARE, *full_stack[1:]]
+
+        # A client that also carries a (non-empty) session cookie, like a script reusing a browser
+        # session: with SESSION_SAVE_EVERY_REQUEST the full stack reads and writes it every time.
+        session = SessionStore()
+        session['bench'] = True
+        session.create()
+
+        results = {'environment': environment_info(), 'options': {'requests': options['requests'], 'path': path}, 'scenarios': {}}
+        try:
+            for stack_name, middleware in (('full', full_stack), ('lean', lean_stack)):
+                for client_name, cookies in (('token', {}), ('token+session', {settings.SESSION_COOKIE_NAME: session.session_key})):
+                    name = f'{stack_name}/{client_name}'
+                    results['scenarios'][name] = self._run(middleware, path, token, cookies, options['requests'])
+        finally:
+            session.delete()
+
+        self.stdout.write(f"{'scenario':<22} {'queries/req':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for name, data in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<22} {data['queries_per_request']:>11} {data['p50_ms']:>8.3f} {data['p95_ms']:>8.3f} "
+                f"{data['p99_ms']:>8.3f} {data['throughput_rps']:>8.1f}"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _run(self, middleware, path, token, cookies, total):
+        with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+            client.cookies.load(cookies)
+            response = client.get(path) # Warm up: loads the middleware chain and URL resolver
+            if response.status_code != 200:
+                raise CommandError(f"{path} answered {response.status_code}: {response.content[:200]!r}")
+
+            with CaptureQueriesContext(connection) as captured:
+                client.get(path)
+            # Copied now: the context reads the connection's query log lazily, and every
+            # following request clears that log.
+            queries = [query['sql'] for query in captured]
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(total):
+                request_started = time.perf_counter()
+                client.get(path)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            elapsed = time.perf_counter() - started
+        return {**summarize(latencies, elapsed), 'queries_per_request': len(queries), 'queries': queries}
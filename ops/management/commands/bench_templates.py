@@ -0,0 +1,207 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template import engines
+from django.template.loader import get_template
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from accounts.forms import UserLoginForm, UserSignUpForm
+from devices.forms import (
+    DeviceRegistrationForm, FoundDeviceForm, IMEIVerificationForm, PartialIMEISearchForm, ReportSearchForm,
+    TheftReportForm,
+)
+from devices.models import FoundReport, RegisteredDevice, TheftReport
+from devices.search import SearchHit
+from ops.benchmarking import environment_info, summarize, write_results
+from ops.warmup import project_template_names
+
+
+def _prefetched(instance, name, objects):
+    """Fills a reverse relation's prefetch cache so rendering doesn't query the database."""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    instance._prefetched_objects_cache = {**getattr(instance, '_prefetched_objects_cache', {}), name: queryset}
+
+
+class SampleData:
+    """Unsaved, fully related model instances shaped like a typical owner's account."""
+
+    def __init__(self, device_count):
+        now = timezone.now()
+        self.owner = get_user_model()(pk=1, email='amina.owner@example.com', first_name='Amina')
+        self.devices, self.theft_reports, self.found_reports = [], [], []
+        for index in range(device_count):
+            stolen = index % 3 == 0
+            device = RegisteredDevice(
+                pk=index + 1, owner=self.owner, imei=f'35209900{index:06d}1'[:15],
+                make='Samsung', model_name=f'Galaxy A{index % 60}', color='Midnight Black', storage_capacity='128GB',
+                distinguishing_features='Cracked bottom-left corner, blue silicone case with a sticker on the back.',
+                status=RegisteredDevice.STATUS_STOLEN if stolen else RegisteredDevice.STATUS_NORMAL,
+                registration_date=now, last_updated=now,
+            )
+            device._state.fields_cache['theft_report'] = None
+            if stolen:
+                report = TheftReport(
+                    pk=index + 1, device=device, case_id=f'CR-20260101-CE-{index:04d}', region_of_theft='CE',
+                    date_time_of_theft=now, last_known_location='Marché Central, Yaoundé',
+                    circumstances='Snatched from my hand by a passenger on a moto-taxi near the market entrance.',
+                    additional_details='Lock screen shows a photo of a beach.',
+                    reported_at=now, last_updated=now, status=TheftReport.REPORT_STATUS_ACTIVE,
+                )
+                found = FoundReport(
+                    pk=index + 1, theft_report=report, date_found=now, location_found='Bus station, Mvan',
+                    device_condition='GOOD', return_method_preference='POLICE',
+                    finder_message_to_owner='Found it under a bench, battery was flat.', reported_at=now,
+                )
+                _prefetched(report, 'found_reports', [found] if index % 2 == 0 else [])
+                device._state.fields_cache['theft_report'] = report
+                self.theft_reports.append(report)
+                self.found_reports.append(found)
+            self.devices.append(device)
+
+
+def _page(objects, per_page=10):
+    page = Paginator(objects, per_page).page(1)
+    return {'page_obj': page, 'paginator': page.paginator, 'is_paginated': page.has_other_pages()}
+
+
+def build_contexts(data):
+    """Template name -> (URL the page is served at, context the view would pass)."""
+    device = data.devices[0]
+    report = data.theft_reports[0]
+    found = data.found_reports[0]
+    return {
+        'home.html': (reverse('home'), {}),
+        'about_us.html': (reverse('about_us'), {}),
+        'base.html': (reverse('home'), {}),
+        'accounts/login.html': (reverse('login'), {'form': UserLoginForm()}),
+        'accounts/signup.html': (reverse('signup'), {'form': UserSignUpForm()}),
+        'devices/register_device.html': (reverse('devices:register_device'), {'form': DeviceRegistrationForm(), 'page_title': 'Register New Device'}),
+        'devices/user_device_list.html': (reverse('devices:user_device_list'), {
+            'devices': data.devices[:10], 'object_list': data.devices[:10], 'page_title': 'My Registered Devices',
+            'card_fragments': {}, # Always render the cards (no fragment cache hits)
+            **_page(data.devices),
+        }),
+        'devices/user_theft_report_list.html': (reverse('devices:user_theft_report_list'), {
+            'theft_reports': data.theft_reports[:10], 'object_list': data.theft_reports[:10],
+            'page_title': 'My Reported Cases', 'card_fragments': {}, **_page(data.theft_reports),
+        }),
+        'devices/report_stolen_form.html': (reverse('devices:report_device_stolen', kwargs={'device_pk': device.pk}), {
+            'form': TheftReportForm(), 'device': device, 'page_title': f'Report Stolen: {device.make} {device.model_name}',
+        }),
+        'devices/theft_report_detail.html': (reverse('devices:theft_report_detail', kwargs={'pk': report.pk}), {
+            'theft_report': report, 'object': report, 'device': report.device,
+            'page_title': f'Theft Report Details: Case ID {report.case_id}',
+        }),
+        'devices/verify_device.html': (reverse('devices:verify_device_imei'), {
+            'form': IMEIVerificationForm(initial={'imei': device.imei}), 'page_title': 'Verify Device IMEI',
+            'submitted_imei': device.imei, 'verification_status': 'STOLEN',
+            'device_info': {'make': device.make, 'model_name': device.model_name, 'color': device.color,
+                            'storage_capacity': device.storage_capacity},
+            'theft_report_info': {'case_id': report.case_id, 'date_reported': report.reported_at, 'status': 'Active Report'},
+        }),
+        'devices/report_found_device.html': (reverse('devices:report_found_device'), {
+            'form': FoundDeviceForm(), 'page_title': 'Report a Found Device',
+        }),
+        'devices/found_report_owner_detail.html': (reverse('devices:found_report_owner_detail', kwargs={'pk': found.pk}), {
+            'found_report': found, 'object': found, 'theft_report_instance': report, 'device_instance': report.device,
+            'can_show_finder_contact': False, 'page_title': 'Details for Found Report on Your Device',
+        }),
+        'devices/device_confirm_delete.html': (reverse('devices:delete_device', kwargs={'pk': device.pk}), {
+            'device': device, 'object': device, 'page_title': f'Confirm Delete: {device.make} {device.model_name}',
+        }),
+        'devices/registereddevice_confirm_delete.html': (reverse('devices:delete_device', kwargs={'pk': device.pk}), {'device': device, 'object': device}),
+        'devices/report_search.html': (reverse('devices:report_search'), {
+            'form': ReportSearchForm({'q': 'moto-taxi market'}), 'query': 'moto-taxi market', 'page_title': 'Search Reports',
+            'hits': [SearchHit('theft', r, 1.0) for r in data.theft_reports[:10]]
+                    + [SearchHit('found', f, 0.5) for f in data.found_reports[:10]],
+        }),
+        'devices/partial_imei_search.html': (reverse('devices:partial_imei_search'), {
+            'form': PartialIMEISearchForm({'pattern': device.imei[:-3] + '???'}), 'pattern': device.imei[:-3] + '???',
+            'candidates': [d for d in data.devices if d.status == RegisteredDevice.STATUS_STOLEN][:20],
+            'page_title': 'Find a Device by Partial IMEI',
+        }),
+        'devices/emails/owner_found_device_notification.html': (reverse('devices:report_found_device'), _email_context(device, report, found)),
+        'devices/emails/owner_found_device_notification.txt': (reverse('devices:report_found_device'), _email_context(device, report, found)),
+    }
+
+
+def _email_context(device, report, found):
+    return {
+        'owner_name': 'Amina', 'device_make_model': f'{device.make} {device.model_name}', 'case_id': report.case_id,
+        'date_found': found.date_found, 'location_found': found.location_found,
+        'device_condition': found.get_device_condition_display(),
+        'return_method_preference': found.get_return_method_preference_display(),
+        'finder_message': found.finder_message_to_owner, 'action_url': 'https://example.com/devices/my-devices/',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures per-template compile time (cold cached loader) and render time (warm) "
+        "with contexts shaped like the views' real ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Renders per template (default: 200).')
+        parser.add_argument('--devices', type=int, default=30, help='Devices in the sample account (default: 30).')
+        parser.add_argument('--template', action='append', dest='templates', help='Only these templates (repeatable).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        data = SampleData(options['devices'])
+        contexts = build_contexts(data)
+        names = options['templates'] or project_template_names()
+        unknown = [name for name in names if name not in contexts]
+        if options['templates'] and unknown:
+            raise CommandError(f"No sample context for: {', '.join(unknown)}")
+        factory = RequestFactory()
+        results = {'environment': environment_info(), 'options': {
+            'iterations': options['iterations'], 'devices': options['devices']}, 'templates': {}}
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name in names:
+                url, context = contexts.get(name, (reverse('home'), {}))
+                request = factory.get(url)
+                request.user = data.owner
+                request.resolver_match = resolve(url)
+                request._messages = CookieStorage(request)
+
+                self._reset_template_cache()
+                started = time.perf_counter()
+                template = get_template(name)
+                template.render(context, request) # First render also compiles the {% extends %} parents
+                cold_ms = (time.perf_counter() - started) * 1000
+
+                with CaptureQueriesContext(connection) as captured:
+                    template.render(context, request)
+                queries = len(captured)
+                latencies = []
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    template.render(context, request)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                results['templates'][name] = {'cold_ms': round(cold_ms, 3), 'queries': queries, **summarize(latencies)}
+
+        self.stdout.write(f"{'template':<55} {'cold ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'queries':>7}")
+        for name, stats in sorted(results['templates'].items(), key=lambda item: -item[1]['p50_ms']):
+            self.stdout.write(
+                f"{name:<55} {stats['cold_ms']:>8.2f} {stats['p50_ms']:>8.3f} {stats['p95_ms']:>8.3f} {stats['queries']:>7}"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _reset_template_cache(self):
+        for engine in engines.all():
+            for loader in engine.engine.template_loaders:
+                if hasattr(loader, 'reset'):
+                    loader.reset()
@@ -0,0 +1,92 @@
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from devices.api_auth import issue_token
+from devices.models import RegisteredDevice
+from ops.benchmarking import (
+    ServerProcess, environment_info, free_port, gunicorn_command, run_http_load, summarize, write_results,
+)
+
+VARIANTS = {
+    # name -> environment for deploy/gunicorn_conf.py
+    'cold': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'False'},
+    'warm': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'True'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how soon a freshly started gunicorn (deploy/gunicorn_conf.py) serves good responses, "
+        "without ('cold') and with ('warm') preloading and warm-up: seconds from launch to the first 200 "
+        "of the verify page, latency of the first requests to each page (one per worker at a time, so they "
+        "land on fresh workers without queueing behind each other), and steady-state latency afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Server starts per variant (default: 3).')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes (default: 2).')
+        parser.add_argument('--requests', type=int, default=300, help='Steady-state requests after the wave.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        device = RegisteredDevice.objects.filter(status=RegisteredDevice.STATUS_STOLEN).first() or RegisteredDevice.objects.first()
+        imei = device.imei if device else '490154203237518'
+        ready_path = '/devices/verify-imei/'
+        paths = ['/', ready_path, f'/api/verify/{imei}/', '/devices/report-found/']
+        headers = {'Authorization': f"Token {issue_token('bench_warm_start')}"}
+
+        results = {'environment': environment_info(), 'options': {
+            key: options[key] for key in ('runs', 'workers', 'requests')
+        }, 'variants': {}}
+        for name, env in VARIANTS.items():
+            runs = []
+            for run in range(options['runs']):
+                port = free_port()
+                command = gunicorn_command(
+                    'phoneindex.wsgi:application', '-c', 'deploy/gunicorn_conf.py',
+                    '--workers', str(options['workers']), '--bind', f'127.0.0.1:{port}',
+                )
+                try:
+                    with ServerProcess(command, port=port, ready_path=ready_path, env=env) as server:
+                        workers = options['workers']
+                        wave = [run_http_load(server.host, port, [path], workers, workers, headers) for path in paths]
+                        steady = run_http_load(server.host, port, paths, options['requests'], workers, headers)
+                except RuntimeError as exc:
+                    raise CommandError(str(exc))
+                runs.append({
+                    'first_good_response_seconds': round(server.startup_seconds, 3),
+                    'first_wave': self._merge(*wave),
+                    'steady': self._merge(steady),
+                })
+                self.stdout.write(
+                    f"{name} run {run + 1}: first good response after {server.startup_seconds:.2f}s, "
+                    f"first wave p50 {runs[-1]['first_wave']['p50_ms'] or 0:.1f} ms / "
+                    f"max {runs[-1]['first_wave']['max_ms'] or 0:.1f} ms"
+                )
+            results['variants'][name] = {
+                'runs': runs,
+                'median_first_good_response_seconds': statistics.median(
+                    run['first_good_response_seconds'] for run in runs),
+                'median_first_wave_max_ms': statistics.median(run['first_wave']['max_ms'] or 0 for run in runs),
+            }
+
+        self.stdout.write(f"{'variant':<8}{'first good s':>14}{'wave p50 ms':>13}{'wave max ms':>13}{'steady p50 ms':>15}")
+        for name, data in results['variants'].items():
+            runs = data['runs']
+            self.stdout.write(
+                f"{name:<8}{data['median_first_good_response_seconds']:>14.2f}"
+                f"{statistics.median(run['first_wave']['p50_ms'] or 0 for run in runs):>13.1f}"
+                f"{data['median_first_wave_max_ms']:>13.1f}"
+                f"{statistics.median(run['steady']['p50_ms'] or 0 for run in runs):>15.2f}"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _merge(self, *loads):
+        """One summary over all paths of all `loads`, plus the error count."""
+        paths = [data for load in loads for data in load['paths'].values()]
+        latencies = [value for data in paths for value in data['latencies_ms']]
+        errors = sum(data['errors'] for data in paths)
+        return {**summarize(latencies), 'errors': errors}
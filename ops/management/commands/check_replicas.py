@@ -0,0 +1,58 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from phoneindex.replicas import probe, replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Probes each read replica (DATABASE_REPLICA_URLS) the way the router does and fails if any is "
+        "unhealthy. With --copy-sqlite, first copies a SQLite primary into the SQLite replica files, to "
+        "stand in for replication when testing locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--copy-sqlite', action='store_true',
+            help='Copy the SQLite primary into every SQLite replica (online backup, safe while the site runs).',
+        )
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            self.stdout.write("No read replicas configured (DATABASE_REPLICA_URLS is empty).")
+            return
+        if options['copy_sqlite']:
+            self._copy_sqlite(aliases)
+
+        unhealthy = []
+        for alias in aliases:
+            status = probe(alias)
+            lag = f"lag {status.lag_seconds:.1f}s" if status.lag_seconds is not None else "lag n/a"
+            if status.healthy:
+                self.stdout.write(self.style.SUCCESS(f"{alias}: healthy, {lag}"))
+            else:
+                unhealthy.append(alias)
+                self.stdout.write(self.style.ERROR(f"{alias}: unhealthy, {status.error}"))
+        if unhealthy:
+            raise CommandError(f"Unhealthy replicas: {', '.join(unhealthy)}")
+
+    def _copy_sqlite(self, aliases):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("--copy-sqlite needs a SQLite primary.")
+        primary.ensure_connection()
+        for alias in aliases:
+            replica = connections[alias]
+            if replica.vendor != 'sqlite':
+                continue
+            path = replica.settings_dict['NAME'].removeprefix('file:').split('?')[0]
+            replica.close()
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"Copied {primary.settings_dict['NAME']} to {path} ({alias}).")
@@ -0,0 +1,86 @@
+import random
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from devices.models import RegisteredDevice, TheftReport
+from ops import concurrency, synthetic
+from ops.benchmarking import ServerProcess, free_port, gunicorn_command
+
+RACE_TAC = '35777777' # IMEIs of the throwaway devices created by this check
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires parallel 'report stolen' submissions for one device at a multi-worker gunicorn server, "
+        "once with the same idempotency key (retries) and once with different keys (two tabs), and fails "
+        "unless exactly one theft report was created and every submission was answered with it. "
+        "A throwaway owner and devices are created and removed again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=8, help='Simultaneous submissions per race (default: 8).')
+        parser.add_argument('--rounds', type=int, default=3, help='Races per scenario (default: 3).')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--workers', type=int, default=4, help='Server worker processes (default: 4).')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per WSGI worker (default: 4).')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        email = f'race.check@{synthetic.EMAIL_DOMAIN}'
+        User = get_user_model()
+        User.objects.filter(email=email).delete()
+        owner = User.objects.create_user(email=email, password=synthetic.PASSWORD)
+        rng = random.Random(options['seed'])
+
+        port = free_port()
+        if options['server'] == 'wsgi':
+            args = ['phoneindex.wsgi:application', '--worker-class', 'gthread',
+                    '--workers', str(options['workers']), '--threads', str(options['threads'])]
+        else:
+            args = ['phoneindex.asgi:application', '-c', 'deploy/gunicorn_asgi.py', '--workers', str(options['workers'])]
+        command = gunicorn_command(*args, '--bind', f'127.0.0.1:{port}')
+
+        failures = 0
+        try:
+            with tempfile.TemporaryDirectory(prefix='race-metrics-') as metrics_dir:
+                env = {'PROMETHEUS_MULTIPROC_DIR': metrics_dir, 'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend'}
+                with ServerProcess(command, port=port, ready_path='/devices/verify-imei/', env=env) as server:
+                    for same_key in (True, False):
+                        scenario = 'same key' if same_key else 'different keys'
+                        for round_number in range(1, options['rounds'] + 1):
+                            device = self._device(owner, rng)
+                            outcomes = concurrency.race_report_stolen(
+                                server.host, port, email, synthetic.PASSWORD, device.pk,
+                                options['sessions'], same_key, seed=rng.randrange(10 ** 6),
+                            )
+                            case_ids = list(TheftReport.objects.filter(device=device).values_list('case_id', flat=True))
+                            found = concurrency.problems(outcomes, case_ids, same_key)
+                            label = f"{scenario}, round {round_number}: {options['sessions']} submissions"
+                            if found:
+                                failures += 1
+                                self.stdout.write(self.style.ERROR(f"{label} FAILED"))
+                                for problem in found:
+                                    self.stdout.write(f"  - {problem}")
+                            else:
+                                self.stdout.write(self.style.SUCCESS(f"{label} -> 1 report ({case_ids[0]})"))
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        finally:
+            owner.delete() # Devices and reports go with it (CASCADE)
+
+        if failures:
+            raise CommandError(f"{failures} race(s) failed.")
+
+    def _device(self, owner, rng):
+        while True:
+            partial = f'{RACE_TAC}{rng.randrange(10 ** 6):06d}'
+            imei = partial + synthetic.luhn_check_digit(partial)
+            if not RegisteredDevice.objects.filter(imei=imei).exists():
+                break
+        make, model, _ = rng.choice(synthetic.DEVICE_MODELS)
+        return RegisteredDevice.objects.create(
+            owner=owner, imei=imei, make=make, model_name=model, color='Black',
+            storage_capacity='128GB', status=RegisteredDevice.STATUS_NORMAL,
+        )
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ops import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with deterministic synthetic owners, devices (Luhn-valid IMEIs), theft reports "
+        "and found reports for load tests and benchmarks. The same --seed and --chunk-users always give the same rows."
+    )
+
+    def add_arguments(self, parser):
+        defaults = synthetic.Options()
+        parser.add_argument('--devices', type=int, default=defaults.devices)
+        parser.add_argument('--devices-per-user', type=int, default=defaults.devices_per_user)
+        parser.add_argument('--stolen-ratio', type=float, default=defaults.stolen_ratio,
+                            help="Share of devices with a theft report.")
+        parser.add_argument('--resolved-ratio', type=float, default=defaults.resolved_ratio,
+                            help="Share of theft reports already resolved.")
+        parser.add_argument('--found-ratio', type=float, default=defaults.found_ratio,
+                            help="Found reports per theft report.")
+        parser.add_argument('--match-ratio', type=float, default=defaults.match_ratio,
+                            help="Share of found reports matching a theft report.")
+        parser.add_argument('--history-days', type=int, default=defaults.history_days)
+        parser.add_argument('--chunk-users', type=int, default=defaults.chunk_users,
+                            help="Owners per chunk (one transaction, the unit of work of a process).")
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size, help="Rows per INSERT.")
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--processes', type=int, default=1,
+                            help="Worker processes (PostgreSQL/MySQL; SQLite allows one writer at a time).")
+        parser.add_argument('--flush', action='store_true', help="Delete previously generated synthetic data first.")
+
+    def handle(self, *args, **options):
+        settings = synthetic.Options(
+            devices=options['devices'], devices_per_user=options['devices_per_user'],
+            stolen_ratio=options['stolen_ratio'], resolved_ratio=options['resolved_ratio'],
+            found_ratio=options['found_ratio'], match_ratio=options['match_ratio'],
+            history_days=options['history_days'], chunk_users=options['chunk_users'],
+            batch_size=options['batch_size'], seed=options['seed'],
+        )
+        processes = options['processes']
+        if processes > 1 and connection.vendor == 'sqlite':
+            self.stderr.write(self.style.WARNING("SQLite serializes writers; using a single process."))
+            processes = 1
+
+        if options['flush']:
+            deleted, _ = synthetic.delete_synthetic_data()
+            self.stdout.write(f"Deleted {deleted} synthetic rows.")
+
+        self.stdout.write(
+            f"Generating {settings.devices} devices for {settings.users} owners "
+            f"in {settings.chunks} chunk(s) with {processes} process(es), seed {settings.seed}..."
+        )
+        started = time.perf_counter()
+
+        def progress(chunk, counts, seconds, totals):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  chunk {chunk}: {counts['devices']} devices in {seconds:.1f}s "
+                f"({totals['devices']}/{settings.devices} total, {totals['devices'] / elapsed:,.0f} devices/s)"
+            )
+
+        try:
+            totals = synthetic.generate(settings, processes=processes, progress=progress)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals['users']} owners, {totals['devices']} devices, {totals['theft_reports']} theft reports "
+            f"and {totals['found_reports']} found reports in {elapsed:.1f}s. "
+            f"Owners log in with password '{synthetic.PASSWORD}'."
+        ))
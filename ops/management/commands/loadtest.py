@@ -0,0 +1,128 @@
+import random
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from devices.models import RegisteredDevice
+from ops import loadtest, synthetic
+from ops.benchmarking import (
+    ServerProcess, environment_info, free_port, gunicorn_command, summarize, write_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the main user flows (verify, register, report stolen, report found, lists) against a "
+        "gunicorn server on the current database, as synthetic owners with think times. Reports p50/p95/p99 "
+        "latency, throughput and queries per request for every flow and step. The run creates devices and "
+        "reports, so use a throwaway database seeded with generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users (default: 20).')
+        parser.add_argument('--iterations', type=int, default=5, help='Rounds of all flows per user (default: 5).')
+        parser.add_argument('--think-time', type=float, default=0.5,
+                            help='Mean pause between requests in seconds, exponentially distributed (default: 0.5).')
+        parser.add_argument('--flows', default=','.join(loadtest.FLOWS),
+                            help=f"Comma-separated subset of: {', '.join(loadtest.FLOWS)}.")
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes (default: 2).')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per WSGI worker (default: 8).')
+        parser.add_argument('--seed', type=int, default=1, help='Seeds the virtual users\' choices.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        flows = [flow for flow in options['flows'].split(',') if flow]
+        unknown = set(flows) - set(loadtest.FLOWS)
+        if unknown:
+            raise CommandError(f"Unknown flow(s): {', '.join(sorted(unknown))}")
+        owners, lookup_imeis, stolen_imeis = self._dataset(options['users'], options['seed'])
+
+        port = free_port()
+        if options['server'] == 'wsgi':
+            args = ['phoneindex.wsgi:application', '--worker-class', 'gthread',
+                    '--workers', str(options['workers']), '--threads', str(options['threads'])]
+        else:
+            args = ['phoneindex.asgi:application', '-c', 'deploy/gunicorn_asgi.py', '--workers', str(options['workers'])]
+        command = gunicorn_command(*args, '--bind', f'127.0.0.1:{port}')
+
+        with tempfile.TemporaryDirectory(prefix='loadtest-metrics-') as metrics_dir:
+            env = {'PROMETHEUS_MULTIPROC_DIR': metrics_dir, 'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend'}
+            self.stdout.write(f"Starting {options['server']} server: {' '.join(command)}")
+            try:
+                with ServerProcess(command, port=port, ready_path='/devices/verify-imei/', env=env) as server:
+                    before = loadtest.scrape_query_totals(server.host, port)
+                    self.stdout.write(f"Running {options['users']} users x {options['iterations']} rounds of {', '.join(flows)}...")
+                    recorder, elapsed = loadtest.run(
+                        server.host, port, owners, options['iterations'], options['think_time'], flows,
+                        lookup_imeis, stolen_imeis, seed=options['seed'],
+                    )
+                    after = loadtest.scrape_query_totals(server.host, port)
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        queries = loadtest.queries_per_request(before, after)
+        results = {
+            'environment': environment_info(),
+            'options': {key: options[key] for key in ('users', 'iterations', 'think_time', 'server', 'workers', 'threads', 'seed')},
+            'elapsed_seconds': round(elapsed, 3),
+            'flows': self._summaries(recorder, elapsed, queries),
+        }
+        self._print_table(results['flows'])
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _dataset(self, user_count, seed):
+        from django.contrib.auth import get_user_model
+        emails = list(
+            get_user_model().objects.filter(email__endswith=f'@{synthetic.EMAIL_DOMAIN}')
+            .order_by('pk').values_list('email', flat=True)[:user_count]
+        )
+        if not emails:
+            raise CommandError("No synthetic owners found; run `python manage.py generate_synthetic_data` first.")
+        if len(emails) < user_count:
+            self.stderr.write(self.style.WARNING(f"Only {len(emails)} synthetic owners exist; using {len(emails)} users."))
+        devices = RegisteredDevice.objects.order_by('?')
+        stolen = list(devices.filter(status=RegisteredDevice.STATUS_STOLEN).values_list('imei', flat=True)[:200])
+        clean = list(devices.exclude(status=RegisteredDevice.STATUS_STOLEN).values_list('imei', flat=True)[:200])
+        if not stolen:
+            raise CommandError("No stolen devices to look up; generate data with --stolen-ratio > 0.")
+        rng = random.Random(seed)
+        unknown = []
+        for _ in range(100):
+            partial = f'{synthetic.UNREGISTERED_TAC}{rng.randrange(10 ** 6):06d}'
+            unknown.append(partial + synthetic.luhn_check_digit(partial))
+        owners = [(email, synthetic.PASSWORD) for email in emails]
+        return owners, stolen + clean + unknown, stolen
+
+    def _summaries(self, recorder, elapsed, queries):
+        flows = {}
+        for (flow, step), data in sorted(recorder.samples.items()):
+            entry = flows.setdefault(flow, {'steps': {}, 'latencies_ms': [], 'errors': 0})
+            entry['steps'][step] = {
+                **summarize(data['latencies_ms'], elapsed),
+                'errors': data['errors'],
+                'statuses': dict(data['statuses']),
+                'queries_per_request': queries.get(loadtest.STEP_VIEWS.get(step)),
+            }
+            entry['latencies_ms'] += data['latencies_ms']
+            entry['errors'] += data['errors']
+        for flow, entry in flows.items():
+            entry.update(summarize(entry.pop('latencies_ms'), elapsed))
+        return flows
+
+    def _print_table(self, flows):
+        self.stdout.write(f"{'flow / step':<36}{'count':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}{'queries':>9}")
+        for flow, entry in flows.items():
+            self.stdout.write(
+                f"{flow:<36}{entry['count']:>7}{entry['errors']:>5}{entry['p50_ms'] or 0:>9.1f}"
+                f"{entry['p95_ms'] or 0:>9.1f}{entry['p99_ms'] or 0:>9.1f}{entry.get('throughput_rps', 0):>8.1f}"
+            )
+            for step, data in entry['steps'].items():
+                queries = data['queries_per_request']
+                self.stdout.write(
+                    f"  {step:<34}{data['count']:>7}{data['errors']:>5}{data['p50_ms'] or 0:>9.1f}"
+                    f"{data['p95_ms'] or 0:>9.1f}{data['p99_ms'] or 0:>9.1f}{data.get('throughput_rps', 0):>8.1f}"
+                    f"{queries if queries is not None else '-':>9}"
+                )
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ops import microbench
+from ops.benchmarking import environment_info, write_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the micro-benchmarks of the core domain functions (IMEI validation, case IDs, found report "
+        "form and matching, list querysets). --save writes a JSON baseline; --compare checks the run against "
+        "one and fails when a benchmark got slower than --threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only run benchmarks whose name contains one of these.')
+        parser.add_argument('--rounds', type=int, default=5, help='Timed rounds per benchmark (default: 5).')
+        parser.add_argument('--min-round-seconds', type=float, default=0.1,
+                            help='Loops per round are calibrated so a round lasts at least this long (default: 0.1).')
+        parser.add_argument('--save', help='Write the results as a JSON baseline to this file.')
+        parser.add_argument('--compare', help='Baseline JSON file to compare against.')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Allowed slowdown of the median in percent before flagging (default: 10).')
+        parser.add_argument('--list', action='store_true', help='List the benchmarks and exit.')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name in microbench.BENCHMARKS:
+                self.stdout.write(name)
+            return
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())['benchmarks']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {exc}")
+
+        self.stdout.write(f"{'benchmark':<36}{'median us':>12}{'min us':>12}{'stdev':>10}{'loops':>9}{'queries':>9}")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<36}{result['median_us']:>12.3f}{result['min_us']:>12.3f}{result['stdev_us']:>10.3f}"
+                f"{result['loops']:>9}{result['queries']:>9}"
+            )
+
+        results, skipped = microbench.run_benchmarks(
+            options['names'], options['rounds'], options['min_round_seconds'], progress,
+        )
+        for name, reason in skipped.items():
+            self.stdout.write(self.style.WARNING(f"{name:<36}skipped: {reason}"))
+
+        if options['save']:
+            write_results(options['save'], {'environment': environment_info(), 'benchmarks': results})
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['save']}"))
+
+        if baseline is not None:
+            self._compare(results, baseline, options['threshold'])
+
+    def _compare(self, results, baseline, threshold_percent):
+        rows = microbench.compare(results, baseline, threshold_percent / 100)
+        self.stdout.write('')
+        self.stdout.write(f"{'benchmark':<36}{'baseline us':>13}{'current us':>13}{'change':>9}")
+        for name, base, current, change, regressed in rows:
+            line = f"{name:<36}{base:>13.3f}{current:>13.3f}{change * 100:>+8.1f}%"
+            self.stdout.write(self.style.ERROR(line + '  REGRESSION') if regressed else line)
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) slower than the baseline by more than {threshold_percent}%: "
+                + ', '.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions beyond {threshold_percent}%."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ops.warmup import precompile_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Compiles every project template (Templates/, <app>/templates/). Run at deploy time to fail "
+        "fast on template syntax errors; server processes do the same on start (see deploy/)."
+    )
+
+    def handle(self, *args, **options):
+        timings, errors = precompile_templates()
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"{seconds * 1000:8.2f} ms  {name}")
+        if errors:
+            for name, error in errors.items():
+                self.stderr.write(f"{name}: {error}")
+            raise CommandError(f"{len(errors)} template(s) failed to compile.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {len(timings)} templates in {sum(timings.values()) * 1000:.1f} ms."
+        ))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ops.benchmarking import environment_info, write_results
+from ops.startup import TARGETS, is_first_party, profile
+
+PHASES = ('settings', 'apps_ready', 'handler', 'urlconf', 'total')
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the startup time of manage.py, wsgi.py and asgi.py in fresh interpreters: settings, "
+        "app registry ready, handler (middleware) and URLconf phases, and the modules that take longest "
+        "to import (python -X importtime)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Entry points to profile (default: {', '.join(TARGETS)}).")
+        parser.add_argument('--runs', type=int, default=5, help='Interpreters per target; medians are shown (default: 5).')
+        parser.add_argument('--top', type=int, default=15, help='Slowest modules listed per target (default: 15).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or list(TARGETS)
+        if unknown := set(targets) - set(TARGETS):
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+
+        results = {'environment': environment_info(), 'options': {'runs': options['runs']}, 'targets': {}}
+        for target in targets:
+            self.stdout.write(f"Profiling {target} ({options['runs']} runs)...")
+            try:
+                results['targets'][target] = profile(target, options['runs'])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        self.stdout.write(f"{'target':<8}" + ''.join(f"{phase + ' ms':>15}" for phase in PHASES))
+        for target, data in results['targets'].items():
+            phases = data['phases_ms']
+            self.stdout.write(f"{target:<8}" + ''.join(
+                f"{phases[phase]:>15.1f}" if phase in phases else f"{'-':>15}" for phase in PHASES))
+
+        for target, data in results['targets'].items():
+            modules = data['modules']
+            self.stdout.write(f"\n{target}: slowest imports (self ms, then cumulative ms; * = project module)")
+            for name in sorted(modules, key=lambda name: -modules[name]['self_ms'])[:options['top']]:
+                marker = '*' if is_first_party(name) else ' '
+                self.stdout.write(f"  {modules[name]['self_ms']:>7.1f} {modules[name]['cumulative_ms']:>8.1f} {marker} {name}")
+            own = {name: values for name, values in modules.items() if is_first_party(name)}
+            self.stdout.write(f"{target}: project modules by cumulative ms")
+            for name in sorted(own, key=lambda name: -own[name]['cumulative_ms'])[:options['top']]:
+                self.stdout.write(f"  {own[name]['cumulative_ms']:>8.1f}   {name}")
+
+        if options['output']:
+            write_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,221 @@
+"""
+Micro-benchmarks for the core domain functions.
+
+Benchmarks register themselves with @benchmark(name). Each is a factory: it receives the
+shared Fixtures and returns the zero-argument callable to time, so setup (finding seeded
+rows, building form data) stays out of the measurement. Every callable is timed in rounds
+of auto-calibrated loops (like timeit's autorange). Its DB query count is recorded as
+well, because a change there is usually the cause of a regression.
+
+DB-backed benchmarks read the current database, ideally one seeded with
+generate_synthetic_data. Benchmarks that write run inside a transaction that is rolled
+back, so the data is left untouched.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from devices import lookups
+from devices.forms import FoundDeviceForm
+from devices.models import RegisteredDevice, TheftReport, validate_imei, validate_imei_luhn
+from devices.views import UserDeviceListView, UserTheftReportListView
+
+BENCHMARKS = {}
+
+
+def benchmark(name, needs_db=False):
+    def register(factory):
+        factory.needs_db = needs_db
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+class SkipBenchmark(Exception):
+    """Raised by a factory when the database lacks the rows it needs."""
+
+
+class Fixtures:
+    """Rows picked once from the current database and shared by the benchmarks."""
+
+    def __init__(self):
+        self.stolen_report = (TheftReport.objects.select_related('device')
+                              .filter(device__status=RegisteredDevice.STATUS_STOLEN).order_by('pk').first())
+        self.clean_device = RegisteredDevice.objects.filter(status=RegisteredDevice.STATUS_NORMAL).order_by('pk').first()
+        # The owner with the most devices gives the heaviest list pages
+        owner_id = (RegisteredDevice.objects.values('owner').annotate(n=Count('pk'))
+                    .order_by('-n').values_list('owner', flat=True).first())
+        self.busiest_owner = get_user_model().objects.filter(pk=owner_id).first()
+
+    def require(self, *names):
+        missing = [name for name in names if getattr(self, name) is None]
+        if missing:
+            raise SkipBenchmark(f"needs seeded data ({', '.join(missing)})")
+
+
+# --- IMEI validation ---
+
+@benchmark('imei.validate_imei')
+def bench_validate_imei(fixtures):
+    return lambda: validate_imei('490154203237518')
+
+
+@benchmark('imei.validate_imei_luhn')
+def bench_validate_imei_luhn(fixtures):
+    return lambda: validate_imei_luhn('490154203237518')
+
+
+# --- Theft reports ---
+
+@benchmark('theft_report.generate_case_id', needs_db=True)
+def bench_generate_case_id(fixtures):
+    report = TheftReport(region_of_theft='CE')
+    return report._generate_case_id
+
+
+@benchmark('theft_report.save', needs_db=True)
+def bench_theft_report_save(fixtures):
+    """Saves a new report (case ID generation included) and rolls it back each time."""
+    fixtures.require('clean_device')
+    device = fixtures.clean_device
+    stolen_at = timezone.now() - timedelta(days=1)
+
+    def run():
+        savepoint = transaction.savepoint()
+        TheftReport(
+            device=device, region_of_theft='LT', date_time_of_theft=stolen_at,
+            last_known_location='Akwa, Douala', circumstances='Benchmark',
+        ).save()
+        transaction.savepoint_rollback(savepoint)
+    return run
+
+
+# --- Found reports ---
+
+@benchmark('found_report.form_clean')
+def bench_found_form_clean(fixtures):
+    data = {
+        'case_id_provided': 'CR-20260101-CE-0001', 'imei_provided': '490154203237518',
+        'date_found': (timezone.now() - timedelta(hours=3)).strftime('%Y-%m-%dT%H:%M'),
+        'location_found': 'Bench at the bus station', 'device_condition': 'GOOD',
+        'return_method_preference': 'DIRECT_CONTACT', 'finder_contact_email': 'finder@example.com',
+    }
+    return lambda: FoundDeviceForm(data=data).is_valid()
+
+
+@benchmark('found_report.match_by_case_id', needs_db=True)
+def bench_match_by_case_id(fixtures):
+    fixtures.require('stolen_report')
+    case_id = fixtures.stolen_report.case_id
+    return lambda: lookups.match_found_report(case_id, None)
+
+
+@benchmark('found_report.match_by_imei', needs_db=True)
+def bench_match_by_imei(fixtures):
+    fixtures.require('stolen_report')
+    imei = fixtures.stolen_report.device.imei
+    return lambda: lookups.match_found_report(None, imei)
+
+
+@benchmark('found_report.match_none', needs_db=True)
+def bench_match_none(fixtures):
+    return lambda: lookups.match_found_report('CR-19000101-UN-0001', '359999990000009')
+
+
+# --- List views (first page of the querysets, as the views evaluate them) ---
+
+def _list_view_page(view_class, owner):
+    request = RequestFactory().get('/')
+    request.user = owner
+    view = view_class()
+    view.setup(request)
+    return lambda: list(view.get_queryset()[:view.paginate_by])
+
+
+@benchmark('lists.user_devices_page', needs_db=True)
+def bench_user_devices(fixtures):
+    fixtures.require('busiest_owner')
+    return _list_view_page(UserDeviceListView, fixtures.busiest_owner)
+
+
+@benchmark('lists.user_cases_page', needs_db=True)
+def bench_user_cases(fixtures):
+    fixtures.require('busiest_owner')
+    return _list_view_page(UserTheftReportListView, fixtures.busiest_owner)
+
+
+# --- Runner ---
+
+def _autorange(func, min_round_seconds):
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_seconds:
+            return loops
+        loops *= 2 if elapsed * 2 >= min_round_seconds else 10
+
+
+def measure(func, rounds=5, min_round_seconds=0.1):
+    with CaptureQueriesContext(connection) as captured:
+        func()
+    queries = len(captured.captured_queries)
+    loops = _autorange(func, min_round_seconds)
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - started) / loops * 1_000_000)
+    return {
+        'median_us': round(statistics.median(per_call), 3),
+        'min_us': round(min(per_call), 3),
+        'stdev_us': round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        'loops': loops,
+        'rounds': rounds,
+        'queries': queries,
+    }
+
+
+def run_benchmarks(names=None, rounds=5, min_round_seconds=0.1, progress=None):
+    """Returns ({name: result}, {name: skip reason})."""
+    results, skipped = {}, {}
+    with transaction.atomic():
+        fixtures = Fixtures()
+        for name, factory in BENCHMARKS.items():
+            if names and not any(pattern in name for pattern in names):
+                continue
+            try:
+                func = factory(fixtures)
+            except SkipBenchmark as exc:
+                skipped[name] = str(exc)
+                continue
+            results[name] = measure(func, rounds, min_round_seconds)
+            if progress:
+                progress(name, results[name])
+        transaction.set_rollback(True) # Nothing a benchmark wrote survives
+    return results, skipped
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares medians with a baseline. Returns [(name, baseline_us, current_us, change, regressed)].
+    `threshold` is the allowed slowdown as a fraction (0.1 = 10%).
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = result['median_us'] / base['median_us'] - 1 if base['median_us'] else 0.0
+        rows.append((name, base['median_us'], result['median_us'], change, change > threshold))
+    return rows
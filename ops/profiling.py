@@ -0,0 +1,131 @@
+"""
+On-demand profiling of single requests, for staff.
+
+With PROFILING_ENABLED on, a staff user adds ?__profile=1 to a URL (or sends the
+"X-Profile: 1" header, e.g. for a form POST) and gets back, instead of the page, a plain
+text summary of that request:
+
+- wall time, the original status code, SQL query count and time, time spent rendering templates;
+- the top functions by cumulative and by own time (cProfile).
+
+The full profile is saved to PROFILE_DIR as a .prof file, for snakeviz or
+`python -m pstats`.
+
+ProfilingMiddleware raises MiddlewareNotUsed when profiling is disabled, so it costs nothing
+then. When it is enabled, a request without the flag only pays for one dict lookup.
+"""
+import cProfile
+import io
+import pstats
+import re
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.template.base import Template
+
+TEMPLATE_RENDER_CODE = Template.render.__code__
+
+
+def _requested(request):
+    return (request.GET.get(settings.PROFILING_QUERY_PARAM)
+            or request.headers.get(settings.PROFILING_HEADER))
+
+
+def _template_seconds(stats):
+    """Cumulative time of Template.render (nested templates aren't counted twice)."""
+    for (filename, lineno, name), (_, _, _, cumtime, _) in stats.stats.items():
+        if (name == 'render' and lineno == TEMPLATE_RENDER_CODE.co_firstlineno
+                and filename == TEMPLATE_RENDER_CODE.co_filename):
+            return cumtime
+    return 0.0
+
+
+def _top_functions(stats, sort_key, limit):
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats(sort_key).print_stats(limit)
+    # Drop pstats' preamble, keep the table
+    text = out.getvalue()
+    return text[text.find('   ncalls'):].rstrip() if '   ncalls' in text else text.strip()
+
+
+def save_profile(profiler, request):
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    label = re.sub(r'[^\w.-]+', '_', match.view_name if match is not None else request.path_info).strip('_')
+    now = time.time()
+    path = directory / f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}-{label or 'root'}.prof"
+    profiler.dump_stats(path)
+    return path
+
+
+def summary_response(request, response, profiler, elapsed, queries, note=''):
+    stats = pstats.Stats(profiler)
+    limit = settings.PROFILING_TOP_FUNCTIONS
+    if queries is None:
+        sql = "not captured"
+    else:
+        sql = f"{len(queries)} ({sum(float(query.get('time') or 0) for query in queries) * 1000:.1f} ms)"
+    lines = [
+        f"{request.method} {request.get_full_path()} -> {response.status_code}",
+        f"Wall time:        {elapsed * 1000:.1f} ms",
+        f"SQL queries:      {sql}",
+        f"Template render:  {_template_seconds(stats) * 1000:.1f} ms",
+        f"Profile saved to: {save_profile(profiler, request)}",
+    ]
+    if note:
+        lines.append(note)
+    lines += [
+        '', f"Top {limit} functions by cumulative time", _top_functions(stats, 'cumulative', limit),
+        '', f"Top {limit} functions by own time", _top_functions(stats, 'tottime', limit),
+    ]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; charset=utf-8')
+
+
+class ProfilingMiddleware:
+    """Must come after AuthenticationMiddleware (it checks request.user.is_staff)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not (_requested(request) and request.user.is_staff):
+            return self.get_response(request)
+        from django.test.utils import CaptureQueriesContext # Pulls in the test framework; only on profiled requests
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            # get_response covers the view and the rendering of its TemplateResponse
+            response = profiler.runcall(self.get_response, request)
+        queries = list(captured.captured_queries)
+        return summary_response(request, response, profiler, time.perf_counter() - started, queries)
+
+    async def __acall__(self, request):
+        if not _requested(request) or not (await request.auser()).is_staff:
+            return await self.get_response(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        # Queries run on other threads' connections here, so they can't be captured from the event loop
+        note = ("Note: profiled on the event loop thread; work done in sync_to_async threads "
+                "(sync views, ORM calls) only shows up as time spent waiting.")
+        return summary_response(request, response, profiler, time.perf_counter() - started, None, note)
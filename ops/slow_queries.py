@@ -0,0 +1,219 @@
+"""
+Slow-query log.
+
+An execute wrapper (installed on every new DB connection) times each statement. Those
+slower than SLOW_QUERY_THRESHOLD_MS are written as one JSON line to the
+"phoneindex.slow_queries" logger (a size-rotated file, see LOGGING in settings.py) with:
+
+- the SQL as Django sent it, with placeholders, so parameters (IMEIs, emails) are never logged;
+- the URL name and path of the request that ran it (set by SlowQueryMiddleware);
+- the innermost project frames of the call stack, e.g. "devices/views.py:341 in form_valid";
+- for a sample of SELECTs (SLOW_QUERY_EXPLAIN_SAMPLE_RATE), the query plan: EXPLAIN ANALYZE
+  on PostgreSQL (which runs the statement again), EXPLAIN QUERY PLAN on SQLite.
+
+The staff page at /ops/slow-queries/ groups the log by statement and lists the worst offenders.
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+import traceback
+from collections import defaultdict
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('phoneindex.slow_queries')
+
+STACK_DEPTH = 3
+# Middleware and wrappers every request passes through; they say nothing about where a query comes from
+IGNORED_FRAME_FILES = {'ops/slow_queries.py', 'phoneindex/metrics.py', 'phoneindex/routing.py', 'phoneindex/http_cache.py'}
+
+_current_request = ContextVar('phoneindex_slow_query_request', default=None)
+_explaining = ContextVar('phoneindex_slow_query_explaining', default=False)
+
+
+class SlowQueryFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that creates the log directory on first use."""
+
+    def __init__(self, filename, *args, **kwargs):
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(filename, *args, **kwargs)
+
+
+# --- Recording ---
+
+def _stack_location():
+    base_dir = str(settings.BASE_DIR)
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        if not frame.filename.startswith(base_dir) or 'site-packages' in frame.filename:
+            continue
+        filename = os.path.relpath(frame.filename, base_dir)
+        if filename in IGNORED_FRAME_FILES:
+            continue
+        frames.append(f"{filename}:{frame.lineno} in {frame.name}")
+        if len(frames) == STACK_DEPTH:
+            break
+    return frames
+
+
+def _explain(connection, sql, params):
+    """Query plan of a SELECT as text, or None when unsupported or it failed."""
+    if connection.vendor == 'postgresql':
+        explain_sql = 'EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) ' + sql
+    elif connection.vendor == 'sqlite':
+        explain_sql = 'EXPLAIN QUERY PLAN ' + sql
+    elif connection.vendor == 'mysql':
+        explain_sql = 'EXPLAIN ' + sql
+    else:
+        return None
+    token = _explaining.set(True)
+    try:
+        # A savepoint, so a failing EXPLAIN can't break the caller's transaction on PostgreSQL
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(explain_sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        _explaining.reset(token)
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' | '.join(str(col) for col in row) for row in rows)
+
+
+def record_slow_query(connection, sql, params, many, duration_ms):
+    request = _current_request.get()
+    match = getattr(request, 'resolver_match', None) if request is not None else None
+    entry = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'duration_ms': round(duration_ms, 3),
+        'database': connection.alias,
+        'sql': sql,
+        'many': many,
+        'view': match.view_name if match is not None else None,
+        'path': request.path if request is not None else None,
+        'stack': _stack_location(),
+    }
+    sample_rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0)
+    if (not many and sql.lstrip()[:6].upper() == 'SELECT' and sample_rate
+            and random.random() < sample_rate):
+        entry['plan'] = _explain(connection, sql, params)
+    logger.warning(json.dumps(entry, default=str))
+
+
+def _time_queries(execute, sql, params, many, context):
+    threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    if not threshold_ms or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= threshold_ms:
+        try:
+            record_slow_query(context['connection'], sql, params, many, duration_ms)
+        except Exception: # Logging must never fail the query that was measured
+            logger.exception("Could not record slow query")
+    return result
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    if _time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_queries)
+
+
+connection_created.connect(install_slow_query_log, dispatch_uid='ops.slow_queries.install')
+
+
+class SlowQueryMiddleware:
+    """Remembers the current request so slow queries can be attributed to their view."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+
+# --- Reporting ---
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    """Groups statements that only differ in the length of an IN (...) list."""
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def log_files():
+    path = Path(getattr(settings, 'SLOW_QUERY_LOG_FILE', ''))
+    backups = getattr(settings, 'SLOW_QUERY_LOG_BACKUP_COUNT', 0)
+    candidates = [path] + [path.with_name(f"{path.name}.{index}") for index in range(1, backups + 1)]
+    return [candidate for candidate in candidates if candidate.is_file()]
+
+
+def read_entries():
+    for path in log_files():
+        with path.open(encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def top_offenders(limit=25, order_by='total_ms'):
+    """Slow statements grouped by fingerprint, worst first by total (or max/count)."""
+    groups = defaultdict(lambda: {
+        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': defaultdict(int), 'stack': [], 'plan': None, 'last_seen': '',
+    })
+    for entry in read_entries():
+        group = groups[fingerprint(entry.get('sql', ''))]
+        duration = entry.get('duration_ms', 0)
+        group['count'] += 1
+        group['total_ms'] += duration
+        group['views'][entry.get('view') or '-'] += 1
+        group['last_seen'] = max(group['last_seen'], entry.get('timestamp', ''))
+        if duration >= group['max_ms']:
+            group['max_ms'] = duration
+            group['stack'] = entry.get('stack', [])
+        if entry.get('plan'):
+            group['plan'] = entry['plan']
+    offenders = []
+    for sql, group in groups.items():
+        offenders.append({
+            **group,
+            'sql': sql,
+            'total_ms': round(group['total_ms'], 1),
+            'mean_ms': round(group['total_ms'] / group['count'], 1),
+            'views': sorted(group['views'].items(), key=lambda item: -item[1]),
+        })
+    offenders.sort(key=lambda offender: offender[order_by], reverse=True)
+    return offenders[:limit]
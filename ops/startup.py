@@ -0,0 +1,104 @@
+"""
+Startup cost of the project's entry points, measured in fresh interpreters
+(see `python manage.py profile_startup`).
+
+Each run starts `python -X importtime` on a small probe that goes through the same
+steps as the entry point and times them:
+- manage: settings, then django.setup() (apps ready), which every management
+  command pays before it runs;
+- wsgi/asgi: the same, then the handler with its middleware chain
+  (phoneindex.wsgi / phoneindex.asgi), then the URLconf with every view module,
+  which Django imports on the first request.
+The importtime report (stderr) gives the time spent importing each module: "self"
+excludes the modules it imported, "cumulative" includes them.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+TARGETS = ('manage', 'wsgi', 'asgi')
+FIRST_PARTY = ('phoneindex', 'devices', 'accounts', 'home', 'ops')
+
+PROBE = r'''
+import json, os, sys, time
+target = sys.argv[1]
+timings = {}
+started = last = time.perf_counter()
+def phase(name):
+    global last
+    now = time.perf_counter()
+    timings[name] = (now - last) * 1000
+    last = now
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'phoneindex.settings')
+from django.conf import settings
+settings.INSTALLED_APPS
+phase('settings')
+import django
+django.setup()
+phase('apps_ready')
+if target in ('wsgi', 'asgi'):
+    __import__(f'phoneindex.{target}')
+    phase('handler')
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    phase('urlconf')
+timings['total'] = (time.perf_counter() - started) * 1000
+print(json.dumps(timings))
+'''
+
+
+def parse_importtime(output):
+    """{module: (self µs, cumulative µs)} from the stderr of `python -X importtime`."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(target):
+    """One fresh interpreter: ({phase: ms}, {module: (self µs, cumulative µs)})."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, target],
+        cwd=settings.BASE_DIR, env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'phoneindex.settings')},
+        capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{target} probe failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def profile(target, runs=5):
+    """
+    Median phase timings over `runs` interpreters (after one discarded run that may
+    still be writing .pyc files), and the median import time of every module.
+    """
+    measure(target)
+    phases, modules = {}, {}
+    for _ in range(runs):
+        timings, imports = measure(target)
+        for name, value in timings.items():
+            phases.setdefault(name, []).append(value)
+        for name, (self_us, cumulative_us) in imports.items():
+            samples = modules.setdefault(name, ([], []))
+            samples[0].append(self_us)
+            samples[1].append(cumulative_us)
+    return {
+        'phases_ms': {name: round(statistics.median(values), 2) for name, values in phases.items()},
+        'modules': {
+            name: {'self_ms': round(statistics.median(self_us) / 1000, 2),
+                   'cumulative_ms': round(statistics.median(cumulative_us) / 1000, 2)}
+            for name, (self_us, cumulative_us) in modules.items()
+        },
+    }
+
+
+def is_first_party(module):
+    return module.split('.')[0] in FIRST_PARTY
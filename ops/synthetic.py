@@ -0,0 +1,299 @@
+"""
+Deterministic synthetic data for load tests and benchmarks (see the generate_synthetic_data command).
+
+The dataset is cut into chunks of `chunk_users` owners. Each chunk is self-contained
+(its owners, their devices, the theft reports of the stolen ones and the found reports
+for those), uses its own random.Random seeded from (seed, chunk index), and derives every
+unique value (email, IMEI, case ID) from global row indexes. A chunk therefore always
+produces the same rows, whichever process generates it and in whatever order, so the
+same seed and chunk size give the same database with 1 or 16 processes.
+
+- IMEI: a plausible TAC (type allocation code, the 8-digit model prefix) for the
+  device's make/model, a 6-digit serial derived bijectively from the device index,
+  and the Luhn check digit.
+- Case ID: CR-<date>-<region>-<sequence>. The date and sequence come from the device
+  index, so case IDs are unique without a lookup per report and look like the ones
+  TheftReport.save() generates.
+"""
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from devices.models import FoundReport, RegisteredDevice, TheftReport
+
+EMAIL_DOMAIN = 'synthetic.phoneindex.test'
+PASSWORD = 'synthetic-password' # Every synthetic owner can log in with it (load tests)
+
+# (make, model, TAC). TACs are made up but shaped like real ones (8 digits, 35/86 prefixes).
+DEVICE_MODELS = [
+    ('Samsung', 'Galaxy A14', '35290611'), ('Samsung', 'Galaxy A54', '35174432'),
+    ('Samsung', 'Galaxy S23', '35067238'), ('Samsung', 'Galaxy S24 Ultra', '35484519'),
+    ('Samsung', 'Galaxy A05s', '35882714'), ('Apple', 'iPhone 11', '35391710'),
+    ('Apple', 'iPhone 13', '35407115'), ('Apple', 'iPhone 14 Pro', '35300219'),
+    ('Apple', 'iPhone 15', '35672942'), ('Tecno', 'Spark 10', '86104705'),
+    ('Tecno', 'Camon 20', '86572306'), ('Tecno', 'Pova 5', '86309412'),
+    ('Infinix', 'Hot 30', '86425107'), ('Infinix', 'Note 30', '86714203'),
+    ('Infinix', 'Smart 7', '86058814'), ('itel', 'A70', '86981202'),
+    ('itel', 'P40', '86630915'), ('Xiaomi', 'Redmi Note 12', '86893706'),
+    ('Xiaomi', 'Redmi 12C', '86247208'), ('Xiaomi', 'Poco X5', '86155611'),
+    ('Huawei', 'Nova Y70', '86741304'), ('Oppo', 'A78', '86218009'),
+    ('Google', 'Pixel 7a', '35822309'), ('Nokia', 'G21', '35316620'),
+]
+COLORS = ['Midnight Black', 'Graphite', 'Starlight', 'Blue', 'Mint Green', 'Purple', 'Gold', 'Silver', 'Red', 'White']
+STORAGE = ['32GB', '64GB', '128GB', '128GB', '256GB', '512GB']
+FEATURES = [
+    '', '', 'Cracked screen protector', 'Blue silicone case', 'Sticker on the back', 'Small dent on the top edge',
+    'Scratch near the camera', 'Leather wallet case', 'Name engraved on the back',
+]
+FIRST_NAMES = ['Amina', 'Jean', 'Brice', 'Carine', 'Ndzi', 'Fatima', 'Paul', 'Sandrine', 'Ibrahim', 'Mireille', 'Eric', 'Nadège']
+LAST_NAMES = ['Nkoulou', 'Fotso', 'Tchoupo', 'Mbarga', 'Abena', 'Ngassa', 'Bello', 'Etoa', 'Kamga', 'Moussa', 'Ndjock']
+# Places per region code (TheftReport.REGION_CHOICES)
+PLACES = {
+    'AD': ['Ngaoundéré market', 'Meiganga bus station'],
+    'CE': ['Marché Central, Yaoundé', 'Mvan bus station, Yaoundé', 'Carrefour Bastos, Yaoundé', 'Mokolo market'],
+    'ES': ['Bertoua market', 'Batouri motor park'],
+    'FN': ['Maroua central market', 'Kousseri border post'],
+    'LT': ['Akwa, Douala', 'Marché Sandaga, Douala', 'Bonabéri bridge', 'Ndokoti junction, Douala'],
+    'NO': ['Garoua port', 'Garoua central market'],
+    'NW': ['Commercial Avenue, Bamenda', 'Nkwen, Bamenda'],
+    'OU': ['Bafoussam market', 'Dschang university campus'],
+    'SU': ['Ebolowa market', 'Kribi beach'],
+    'SW': ['Buea town', 'Limbe Down Beach', 'Molyko, Buea'],
+    'UN': ['On a long-distance bus', 'Unknown location'],
+}
+CIRCUMSTANCES = [
+    'Snatched from my hand by a passenger on a moto-taxi.',
+    'Taken from my bag in a crowded market.',
+    'Left on a table at a restaurant and gone when I came back.',
+    'Stolen from my car while parked.',
+    'Pickpocketed on the bus.',
+    'Taken during a break-in at home.',
+]
+REGIONS = [code for code, _ in TheftReport.REGION_CHOICES]
+RESOLVED_STATUSES = [
+    (TheftReport.REPORT_STATUS_OWNER_RECOVERY, RegisteredDevice.STATUS_RECOVERED),
+    (TheftReport.REPORT_STATUS_FINDER_RETURN, RegisteredDevice.STATUS_RECOVERED),
+    (TheftReport.REPORT_STATUS_FALSE_ALARM, RegisteredDevice.STATUS_FALSE_ALARM),
+]
+SERIAL_SPACE = 10 ** 6
+SERIAL_STRIDE = 7919 # Prime, so index -> serial is a bijection modulo 10**6
+UNREGISTERED_TAC = '35999999' # Found reports that match nothing use this TAC
+
+
+@dataclass
+class Options:
+    devices: int = 10_000
+    devices_per_user: int = 2
+    stolen_ratio: float = 0.05
+    resolved_ratio: float = 0.3 # Share of theft reports that are already resolved
+    found_ratio: float = 0.4 # Found reports per theft report
+    match_ratio: float = 0.6 # Share of found reports that match a theft report
+    history_days: int = 1095 # Theft dates and case IDs spread over this many days
+    chunk_users: int = 5_000
+    batch_size: int = 5_000
+    seed: int = 1
+
+    @property
+    def users(self):
+        return -(-self.devices // self.devices_per_user)
+
+    @property
+    def chunks(self):
+        return -(-self.users // self.chunk_users)
+
+    def validate(self):
+        if self.devices > len(DEVICE_MODELS) * SERIAL_SPACE:
+            raise ValueError(f"At most {len(DEVICE_MODELS) * SERIAL_SPACE} devices can get unique IMEIs.")
+        if self.devices > 9999 * self.history_days:
+            raise ValueError("Case ID sequences would exceed 9999 per day; raise history_days.")
+
+
+def luhn_check_digit(partial):
+    """Check digit making `partial` + digit pass validate_imei_luhn."""
+    total = 0
+    for index, char in enumerate(reversed(partial)):
+        digit = int(char)
+        if index % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return str((10 - total % 10) % 10)
+
+
+def imei_for(index, seed):
+    make, model, tac = DEVICE_MODELS[index % len(DEVICE_MODELS)]
+    serial = (index // len(DEVICE_MODELS) * SERIAL_STRIDE + seed * 104729) % SERIAL_SPACE
+    partial = f'{tac}{serial:06d}'
+    return partial + luhn_check_digit(partial)
+
+
+def case_id_for(index, region, today, history_days):
+    day = index % history_days
+    sequence = index // history_days + 1
+    date = today - timedelta(days=day)
+    return f"CR-{date:%Y%m%d}-{region}-{sequence:04d}", date
+
+
+@contextmanager
+def historical_timestamps():
+    """bulk_create would stamp auto_now/auto_now_add fields with "now"; keep the generated dates instead."""
+    fields = [
+        field for model in (RegisteredDevice, TheftReport, FoundReport) for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _theft_report(device, index, rng, options, today, now):
+    """Theft report for a (not yet saved) device; also sets the device's status and dates to match."""
+    region = rng.choice(REGIONS)
+    case_id, reported_date = case_id_for(index, region, today, options.history_days)
+    reported_at = min(now, timezone.make_aware(datetime.combine(reported_date, datetime.min.time()))
+                      + timedelta(seconds=rng.randrange(86400)))
+    stolen_at = reported_at - timedelta(hours=rng.randrange(1, 72))
+    report = TheftReport(
+        device=device, region_of_theft=region, case_id=case_id,
+        date_time_of_theft=stolen_at, is_time_approximate=rng.random() < 0.6,
+        last_known_location=rng.choice(PLACES[region]), circumstances=rng.choice(CIRCUMSTANCES),
+        additional_details=rng.choice(['', 'Lock screen shows a family photo.', 'Has a cracked back glass.']) or None,
+        reported_at=reported_at, last_updated=reported_at, status=TheftReport.REPORT_STATUS_ACTIVE,
+    )
+    device.status = RegisteredDevice.STATUS_STOLEN
+    if rng.random() < options.resolved_ratio:
+        report.status, device.status = rng.choice(RESOLVED_STATUSES)
+    # Registered before it was stolen, last changed when it was reported
+    device.registration_date = min(device.registration_date, stolen_at - timedelta(days=rng.randrange(1, 365)))
+    device.last_updated = reported_at
+    return report
+
+
+def generate_chunk(chunk, options, password_hash, today=None):
+    """Builds and inserts one chunk. Returns {model label: rows inserted}."""
+    today = today or timezone.localdate()
+    now = timezone.now()
+    rng = random.Random(f'{options.seed}:{chunk}')
+    User = get_user_model()
+
+    first_user = chunk * options.chunk_users
+    last_user = min(first_user + options.chunk_users, options.users)
+    users = [
+        User(
+            email=f'owner{index}.s{options.seed}@{EMAIL_DOMAIN}', password=password_hash,
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            phone_number=f'+2376{rng.randrange(10 ** 8):08d}',
+        )
+        for index in range(first_user, last_user)
+    ]
+
+    devices, found = [], []
+    with transaction.atomic(), historical_timestamps():
+        User.objects.bulk_create(users, batch_size=options.batch_size)
+        if users[0].pk is None: # Backends that don't return primary keys from bulk inserts
+            pks = dict(User.objects.filter(email__in=[user.email for user in users]).values_list('email', 'pk'))
+            for user in users:
+                user.pk = pks[user.email]
+
+        theft_reports = []
+        for offset, user in enumerate(users):
+            first_device = (first_user + offset) * options.devices_per_user
+            for index in range(first_device, min(first_device + options.devices_per_user, options.devices)):
+                make, model, _ = DEVICE_MODELS[index % len(DEVICE_MODELS)]
+                registered = now - timedelta(days=rng.randrange(options.history_days + 365), seconds=rng.randrange(86400))
+                device = RegisteredDevice(
+                    owner=user, imei=imei_for(index, options.seed), make=make, model_name=model,
+                    color=rng.choice(COLORS), storage_capacity=rng.choice(STORAGE),
+                    distinguishing_features=rng.choice(FEATURES) or None,
+                    registration_date=registered, last_updated=registered, status=RegisteredDevice.STATUS_NORMAL,
+                )
+                devices.append(device)
+                if rng.random() < options.stolen_ratio:
+                    theft_reports.append(_theft_report(device, index, rng, options, today, now))
+        RegisteredDevice.objects.bulk_create(devices, batch_size=options.batch_size)
+        TheftReport.objects.bulk_create(theft_reports, batch_size=options.batch_size)
+
+        for report in theft_reports:
+            if rng.random() >= options.found_ratio:
+                continue
+            found_at = report.reported_at + timedelta(hours=rng.randrange(2, 24 * 60))
+            found_report = FoundReport(
+                date_found=found_at, reported_at=found_at + timedelta(minutes=rng.randrange(5, 600)),
+                location_found=rng.choice(PLACES[report.region_of_theft]),
+                device_condition=rng.choice(FoundReport.CONDITION_CHOICES)[0],
+                return_method_preference=rng.choice(FoundReport.RETURN_METHOD_CHOICES)[0],
+                finder_message_to_owner=rng.choice(['', 'Found it on the ground, hope this helps.']) or None,
+            )
+            if rng.random() < options.match_ratio:
+                found_report.theft_report = report
+                found_report.matched_device_direct = report.device
+                found_report.is_processed = True
+                found_report.owner_notified_at = found_report.reported_at # As the submission view would have
+                if rng.random() < 0.5:
+                    found_report.case_id_provided = report.case_id
+                else:
+                    found_report.imei_provided = report.device.imei
+            elif rng.random() < 0.5:
+                partial = f'{UNREGISTERED_TAC}{rng.randrange(SERIAL_SPACE):06d}'
+                found_report.imei_provided = partial + luhn_check_digit(partial)
+            else:
+                make, model, _ = rng.choice(DEVICE_MODELS)
+                found_report.device_description_provided = f"{rng.choice(COLORS)} {make} {model}, no case."
+            found.append(found_report)
+        FoundReport.objects.bulk_create(found, batch_size=options.batch_size)
+
+    return {'users': len(users), 'devices': len(devices), 'theft_reports': len(theft_reports), 'found_reports': len(found)}
+
+
+def _run_chunk(args):
+    from django.db import connections
+    chunk, options, password_hash = args
+    started = time.perf_counter()
+    try:
+        counts = generate_chunk(chunk, options, password_hash)
+    finally:
+        connections.close_all()
+    return chunk, counts, time.perf_counter() - started
+
+
+def generate(options, processes=1, progress=None):
+    """Generates every chunk, in `processes` worker processes. Returns total counts per model."""
+    from django.db import connections
+    options.validate()
+    password_hash = make_password(PASSWORD) # Hashing once; per-user hashing would dominate the run time
+    jobs = [(chunk, options, password_hash) for chunk in range(options.chunks)]
+    totals = {'users': 0, 'devices': 0, 'theft_reports': 0, 'found_reports': 0}
+
+    def collect(results):
+        for chunk, counts, seconds in results:
+            for key, value in counts.items():
+                totals[key] += value
+            if progress:
+                progress(chunk, counts, seconds, totals)
+
+    if processes <= 1:
+        collect(map(_run_chunk, jobs))
+    else:
+        import multiprocessing
+        connections.close_all() # Children must not share the parent's connections
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            collect(pool.imap_unordered(_run_chunk, jobs))
+    return totals
+
+
+def delete_synthetic_data():
+    """Removes every synthetic owner; their devices and reports go with them (CASCADE)."""
+    return get_user_model().objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
@@ -0,0 +1,135 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import slow_queries
+
+
+class StaticBuildCheckTests(SimpleTestCase):
+    @override_settings(STATIC_BUILT=False)
+    def test_warns_without_build(self):
+        warnings = checks.run_checks(tags=[checks.Tags.staticfiles])
+        self.assertIn('ops.W001', [warning.id for warning in warnings])
+
+    @override_settings(STATIC_BUILT=True)
+    def test_silent_once_built(self):
+        warnings = checks.run_checks(tags=[checks.Tags.staticfiles])
+        self.assertNotIn('ops.W001', [warning.id for warning in warnings])
+
+
+class SlowQueryReportTests(TestCase):
+    SELECT_IN = 'SELECT "devices_registereddevice"."id" FROM "devices_registereddevice" WHERE "id" IN ({})'
+    UPDATE = 'UPDATE "devices_theftreport" SET "status" = %s WHERE "id" = %s'
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.log_file = Path(directory) / 'slow_queries.jsonl'
+        settings = override_settings(SLOW_QUERY_LOG_FILE=str(self.log_file), SLOW_QUERY_LOG_BACKUP_COUNT=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write_log(self, path, entries):
+        path.write_text(''.join(json.dumps(entry) + '\n' for entry in entries) + 'not json\n', encoding='utf-8')
+
+    def entry(self, sql, duration_ms, view='devices:verify_device_imei', **fields):
+        return {'sql': sql, 'duration_ms': duration_ms, 'view': view, 'timestamp': '2026-10-19T10:00:00+0000', **fields}
+
+    def test_fingerprint_ignores_in_list_length(self):
+        self.assertEqual(slow_queries.fingerprint(self.SELECT_IN.format('%s')), self.SELECT_IN.format('...'))
+        self.assertEqual(slow_queries.fingerprint(self.SELECT_IN.format('%s, %s, %s')), self.SELECT_IN.format('...'))
+        self.assertEqual(slow_queries.fingerprint(self.UPDATE), self.UPDATE)
+
+    def test_top_offenders_groups_statements(self):
+        self.write_log(self.log_file, [
+            self.entry(self.SELECT_IN.format('%s'), 150, stack=['devices/views.py:10 in get']),
+            self.entry(self.SELECT_IN.format('%s, %s'), 400, view='devices:user_device_list', stack=['devices/views.py:20 in get']),
+            self.entry(self.UPDATE, 120),
+        ])
+        # A rotated file is read too
+        self.write_log(self.log_file.with_name('slow_queries.jsonl.1'), [self.entry(self.UPDATE, 130), self.entry(self.UPDATE, 110)])
+
+        by_total = slow_queries.top_offenders()
+        self.assertEqual([offender['sql'] for offender in by_total], [self.SELECT_IN.format('...'), self.UPDATE])
+        select = by_total[0]
+        self.assertEqual((select['count'], select['total_ms'], select['max_ms'], select['mean_ms']), (2, 550, 400, 275))
+        self.assertEqual(select['stack'], ['devices/views.py:20 in get']) # Of the slowest run
+        self.assertEqual(select['views'], [('devices:verify_device_imei', 1), ('devices:user_device_list', 1)])
+
+        self.assertEqual(slow_queries.top_offenders(order_by='count')[0]['sql'], self.UPDATE)
+        self.assertEqual(len(slow_queries.top_offenders(limit=1)), 1)
+
+    def test_report_page_is_staff_only(self):
+        self.write_log(self.log_file, [self.entry(self.UPDATE, 120)])
+        url = reverse('ops:slow_queries')
+        User = get_user_model()
+
+        self.assertRedirects(self.client.get(url), reverse('login'), fetch_redirect_response=False)
+        self.client.force_login(User.objects.create_user(email='owner@example.com', password='secret-pass-1'))
+        self.assertRedirects(self.client.get(url), reverse('home'), fetch_redirect_response=False)
+
+        self.client.force_login(User.objects.create_user(email='staff@example.com', password='secret-pass-1', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'devices_theftreport')
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.profile_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        settings = override_settings(PROFILING_ENABLED=True, PROFILE_DIR=str(self.profile_dir))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.url = reverse('about_us')
+
+    def login(self, **fields):
+        user = get_user_model().objects.create_user(email='user@example.com', password='secret-pass-1', **fields)
+        self.client.force_login(user)
+
+    def assertPage(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_staff_get_a_summary(self):
+        self.login(is_staff=True)
+        for response in [self.client.get(self.url, {'__profile': '1'}), self.client.get(self.url, headers={'X-Profile': '1'})]:
+            self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+            content = response.content.decode()
+            self.assertIn('GET /about-us/', content)
+            self.assertIn('-> 200', content)
+            self.assertIn('Wall time:', content)
+            self.assertIn('Top 30 functions by cumulative time', content)
+        self.assertEqual(len(list(self.profile_dir.glob('*.prof'))), 2)
+
+    async def test_staff_get_a_summary_under_asgi(self):
+        user = await sync_to_async(get_user_model().objects.create_user)(
+            email='staff@example.com', password='secret-pass-1', is_staff=True,
+        )
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(self.url, {'__profile': '1'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('profiled on the event loop thread', response.content.decode())
+
+    def test_other_visitors_get_the_page(self):
+        self.assertPage(self.client.get(self.url, {'__profile': '1'}))
+        self.login()
+        self.assertPage(self.client.get(self.url, {'__profile': '1'}))
+        self.assertPage(self.client.get(self.url, headers={'X-Profile': '1'}))
+
+    def test_staff_request_without_the_flag_is_not_profiled(self):
+        self.login(is_staff=True)
+        self.assertPage(self.client.get(self.url))
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        self.login(is_staff=True)
+        self.assertPage(self.client.get(self.url, {'__profile': '1'}))
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import SlowQueryReportView
+
+app_name = 'ops'
+
+urlpatterns = [
+    path('slow-queries/', SlowQueryReportView.as_view(), name='slow_queries'),
+]
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.shortcuts import redirect
+from django.urls import reverse_lazy
+from django.views.generic import TemplateView
+
+from . import slow_queries
+
+
+class StaffOnlyMixin(LoginRequiredMixin, UserPassesTestMixin):
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def handle_no_permission(self):
+        if self.request.user.is_authenticated:
+            messages.error(self.request, "Only staff members can view operations pages.")
+            return redirect(reverse_lazy('home'))
+        return redirect(reverse_lazy('login'))
+
+
+# --- STAFF PAGE LISTING THE SLOWEST STATEMENTS FROM THE SLOW-QUERY LOG ---
+class SlowQueryReportView(StaffOnlyMixin, TemplateView):
+    template_name = 'ops/slow_queries.html'
+    ORDERINGS = {'total': 'total_ms', 'max': 'max_ms', 'count': 'count'}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = 'Slow Queries'
+        order = self.request.GET.get('order', 'total')
+        context['order'] = order if order in self.ORDERINGS else 'total'
+        context['offenders'] = slow_queries.top_offenders(order_by=self.ORDERINGS[context['order']])
+        context['threshold_ms'] = settings.SLOW_QUERY_THRESHOLD_MS
+        context['log_files'] = slow_queries.log_files()
+        return context
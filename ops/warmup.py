@@ -0,0 +1,157 @@
+"""
+Process warm-up: work done once per server process before it serves traffic, so the
+first requests of a fresh worker aren't the slow ones.
+
+With a preloading server (deploy/gunicorn_conf.py), warm_before_fork() runs once in
+the master: imports, URL resolver and compiled templates are then shared by every
+worker it forks. It must not leave database connections open, since a connection
+can't be shared across processes. warm_worker() does the per-process part after the
+fork: database connections and the stolen-IMEI lookups.
+"""
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def project_template_names():
+    """
+    Names of the templates in the project's own template directories (Templates/ and
+    the apps' templates/ folders), not those shipped with Django or third-party apps.
+    """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    names = set()
+    for directory in _template_dirs():
+        directory = Path(directory).resolve()
+        if not directory.is_dir() or base_dir not in directory.parents:
+            continue
+        for path in directory.rglob('*'):
+            if path.is_file() and path.suffix in TEMPLATE_SUFFIXES:
+                names.add(path.relative_to(directory).as_posix())
+    return sorted(names)
+
+
+def _template_dirs():
+    # Asked from the loaders themselves, since with explicit 'loaders' APP_DIRS isn't set
+    for engine in engines.all():
+        loaders = list(getattr(engine, 'engine', engine).template_loaders)
+        while loaders:
+            loader = loaders.pop()
+            loaders.extend(getattr(loader, 'loaders', ())) # The cached loader wraps the real ones
+            if hasattr(loader, 'get_dirs'):
+                yield from loader.get_dirs()
+
+
+def precompile_templates(names=None):
+    """
+    Compiles templates into the cached template loader of this process.
+    Returns ({name: compile seconds}, {name: error message}).
+    """
+    timings, errors = {}, {}
+    for name in names if names is not None else project_template_names():
+        started = time.perf_counter()
+        try:
+            # Parents pulled in by {% extends %} are project templates too, so they get compiled here as well
+            get_template(name)
+        except TemplateSyntaxError as exc:
+            errors[name] = str(exc)
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings, errors
+
+
+
+def open_database_connections():
+    """
+    Connects this process to its databases before it serves traffic: opens the
+    connection pools (DB_CONNECTIONS='pool', waiting for their minimum size) or the
+    persistent connection of the calling thread ('persistent'; the thread that serves
+    requests in a sync worker). Returns ({alias: seconds}, {alias: error message}).
+    """
+    timings, errors = {}, {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = getattr(connection, 'pool', None)
+        if pool is None and not connection.settings_dict.get('CONN_MAX_AGE'):
+            continue # Connects per request anyway
+        started = time.perf_counter()
+        try:
+            if pool is not None:
+                pool.open(wait=True, timeout=settings.DB_POOL_TIMEOUT)
+            else:
+                connection.ensure_connection()
+        except Exception as exc: # DatabaseError, or psycopg_pool.PoolTimeout
+            errors[alias] = str(exc).strip() or type(exc).__name__
+            continue
+        timings[alias] = time.perf_counter() - started
+    return timings, errors
+
+
+def warm_url_resolver():
+    """
+    Imports the URLconf (and with it every view module) and builds the reverse and
+    namespace tables of all resolvers, which Django otherwise does on the first
+    request and the first {% url %}. Returns the number of named routes.
+    """
+    names = 0
+    resolvers = [get_resolver()]
+    while resolvers:
+        resolver = resolvers.pop()
+        names += sum(1 for key in resolver.reverse_dict if isinstance(key, str))
+        # Namespaced includes (devices:, api:, ...) have their own tables, built on their first reverse()
+        resolvers.extend(sub_resolver for _, sub_resolver in resolver.namespace_dict.values())
+    return names
+
+
+def warm_stolen_imei_index(limit=100_000):
+    """
+    Reads the IMEIs of stolen devices once through this process's connection and runs
+    one verification lookup, so the IMEI index pages are in the database's cache and
+    the lookup's query path is compiled before the first verification. Returns the
+    number of IMEIs read.
+    """
+    from devices import lookups
+    from devices.models import RegisteredDevice
+
+    imeis = RegisteredDevice.objects.filter(status=RegisteredDevice.STATUS_STOLEN).values_list('imei', flat=True)
+    first, count = None, 0
+    for imei in imeis.order_by('imei')[:limit].iterator(chunk_size=2000):
+        first = first or imei
+        count += 1
+    lookups.lookup_device_for_verification(first or '0' * 15)
+    return count
+
+
+def warm_before_fork():
+    """Process-independent warm-up, for the master of a preloading server. Returns {step: seconds}."""
+    timings = {}
+    started = time.perf_counter()
+    routes = warm_url_resolver()
+    timings[f'url resolver ({routes} routes)'] = time.perf_counter() - started
+    started = time.perf_counter()
+    compiled, errors = precompile_templates()
+    timings[f'templates ({len(compiled)} compiled, {len(errors)} failed)'] = time.perf_counter() - started
+    connections.close_all() # Nothing above should connect, but workers must never inherit a connection
+    return timings
+
+
+def warm_worker():
+    """Per-process warm-up, in each worker after the fork. Returns ({step: seconds}, {step: error message})."""
+    timings, errors = {}, {}
+    connected, failed = open_database_connections()
+    timings.update({f'database {alias}': seconds for alias, seconds in connected.items()})
+    errors.update({f'database {alias}': error for alias, error in failed.items()})
+    started = time.perf_counter()
+    try:
+        count = warm_stolen_imei_index()
+    except Exception as exc: # A database that's down must not keep the worker from starting
+        errors['stolen IMEI index'] = str(exc).strip() or type(exc).__name__
+    else:
+        timings[f'stolen IMEI index ({count} IMEIs)'] = time.perf_counter() - started
+    return timings, errors
@@ -0,0 +1,147 @@
+"""
+Health endpoints for load balancers and orchestrators.
+
+- GET /health/live answers "ok" as long as the process can serve a request. It touches
+  neither the database nor the cache, so a database outage doesn't get every worker
+  restarted.
+- GET /health/ready checks the primary database (SELECT 1), the cache (a set and a
+  get) and the webhook worker's lag (age of the oldest due delivery still pending).
+  It answers 200, or 503 when a check in HEALTH_CRITICAL_CHECKS fails, with a JSON
+  body listing every check. The worker lag isn't critical by default: taking the web
+  servers out of rotation doesn't help a stuck worker.
+
+Both are served through LEAN_ROUTE_PREFIXES (phoneindex/routing.py): no session,
+CSRF, auth or messages middleware, and no templates.
+
+The readiness checks run on a small thread pool and are each given
+HEALTH_CHECK_TIMEOUT_SECONDS, so a hung database or cache fails the probe quickly
+instead of holding it until the balancer gives up. The result is shared by all
+requests of the process for HEALTH_CHECK_CACHE_SECONDS; while one request refreshes
+it, the others get the previous result instead of waiting.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+CACHE_PROBE_KEY = 'health:probe'
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='health')
+
+
+def check_database():
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # What request_finished does: keeps a persistent connection, hands a pooled one back
+        connection.close_if_unusable_or_obsolete()
+    return {}
+
+
+def check_cache():
+    token = str(time.monotonic_ns())
+    cache.set(CACHE_PROBE_KEY, token, 30)
+    if cache.get(CACHE_PROBE_KEY) != token:
+        raise RuntimeError("cache did not return the value just stored")
+    return {}
+
+
+def check_worker_lag():
+    from devices.models import WebhookDelivery
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        oldest = (WebhookDelivery.objects
+                  .filter(status=WebhookDelivery.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+                  .order_by('next_attempt_at').values_list('next_attempt_at', flat=True).first())
+    finally:
+        connection.close_if_unusable_or_obsolete()
+    lag = (timezone.now() - oldest).total_seconds() if oldest else 0
+    if lag > settings.HEALTH_MAX_WORKER_LAG_SECONDS:
+        raise RuntimeError(f"oldest due webhook delivery is {lag:.0f}s old")
+    return {'lag_seconds': round(lag, 1)}
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'worker_lag': check_worker_lag,
+}
+
+
+def run_checks():
+    """{name: {'ok': bool, 'ms': float, ...}}, every check bounded by HEALTH_CHECK_TIMEOUT_SECONDS."""
+    timeout = settings.HEALTH_CHECK_TIMEOUT_SECONDS
+    started = time.perf_counter()
+    futures = {name: _executor.submit(_timed, check) for name, check in CHECKS.items()}
+    results = {}
+    for name, future in futures.items():
+        remaining = max(0, timeout - (time.perf_counter() - started))
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel() # Still queued behind a hung check; a running one is left to finish
+            results[name] = {'ok': False, 'error': f"timed out after {timeout:g}s"}
+    return results
+
+
+def _timed(check):
+    started = time.perf_counter()
+    try:
+        result = {'ok': True, **check()}
+    except Exception as exc:
+        result = {'ok': False, 'error': f"{type(exc).__name__}: {exc}"}
+    result['ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class ReadinessCache:
+    """The last readiness result of this process, refreshed by one request at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0.0
+
+    def get(self):
+        if self._result is not None and time.monotonic() - self._checked_at < settings.HEALTH_CHECK_CACHE_SECONDS:
+            return self._result
+        # Only the first request ever waits for the lock; later ones use the previous result meanwhile
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result
+        try:
+            if self._result is None or time.monotonic() - self._checked_at >= settings.HEALTH_CHECK_CACHE_SECONDS:
+                checks = run_checks()
+                critical = set(settings.HEALTH_CRITICAL_CHECKS)
+                ready = all(result['ok'] for name, result in checks.items() if name in critical)
+                self._result = {'status': 'ok' if ready else 'unavailable', 'checks': checks}
+                self._checked_at = time.monotonic()
+            return self._result
+        finally:
+            self._lock.release()
+
+
+readiness = ReadinessCache()
+
+
+def _no_store(response):
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def liveness_view(request):
+    """GET /health/live -> 200 "ok", without any I/O."""
+    return _no_store(HttpResponse('ok\n', content_type='text/plain'))
+
+
+def readiness_view(request):
+    """GET /health/ready -> 200 or 503 with the result of every check, at most HEALTH_CHECK_CACHE_SECONDS old."""
+    result = readiness.get()
+    return _no_store(JsonResponse(result, status=200 if result['status'] == 'ok' else 503))
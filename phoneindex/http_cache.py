@@ -0,0 +1,154 @@
+"""
+HTTP caching for public pages that look the same to every anonymous visitor.
+
+Mark a view with @anonymous_page_cache() (see phoneindex/urls.py, devices/urls.py).
+AnonymousPageCacheMiddleware, which runs right after WhiteNoise, then:
+
+- serves GET/HEAD requests that carry no session or messages cookie straight from the
+  cache, so the session, auth and messages middleware and the view never run; an
+  If-None-Match matching the stored ETag gets a 304;
+- stores the view's response on a miss, with an ETag and a short public
+  Cache-Control, as long as it sets no cookies (e.g. no CSRF token in the page);
+- leaves requests from logged-in visitors alone; the decorator marks those responses
+  private and adds Vary: Cookie, so no shared cache ever mixes the two variants.
+
+Other cookies (analytics, csrftoken from another page) don't matter: the anonymous
+page doesn't depend on them, so they're left out of the cache key. The same goes for
+the query string: the key is the path plus the query parameters the view declares
+(query_params, in a fixed order). A request with any other parameter bypasses the
+cache, so made-up query strings can't fill it with copies of the same page.
+
+A cached page can't carry a per-visitor CSRF token, so a public form that posts back
+to it (verify IMEI) uses @csrf_exempt_anonymous: anonymous POSTs need no token,
+logged-in visitors get a token in the page and their POSTs are checked as usual.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.urls import Resolver404, get_resolver
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, set_response_etag
+from django.utils.translation import get_language
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from . import metrics
+
+KEY_PREFIX = 'anon_page'
+
+
+def anonymous_page_cache(view, query_params=()):
+    """
+    Opts a view into the anonymous page cache; works on sync and async views.
+    `query_params` are the query parameters the page depends on (none by default).
+    """
+    def finish(request, response):
+        if getattr(request, 'user', None) is not None and request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            return finish(request, await view(request, *args, **kwargs))
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return finish(request, view(request, *args, **kwargs))
+    wrapper.anonymous_page_cache = frozenset(query_params)
+    return wrapper
+
+
+def csrf_exempt_anonymous(view):
+    """
+    csrf_exempt for anonymous visitors only; a logged-in visitor's POST is checked like
+    any other. Only for read-only form handling: an anonymous POST can be forged.
+    """
+    protected = csrf_protect(view)
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # Resolved here so sync code reading request.user (finish() above) doesn't query from the event loop
+            request.user = user = await request.auser()
+            return await (protected if user.is_authenticated else view)(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return (protected if request.user.is_authenticated else view)(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
+
+
+def page_key(request):
+    """Path and (allowed, see _is_candidate) query parameters, sorted so their order doesn't matter."""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = request.build_absolute_uri(request.path) + (f'?{query}' if query else '')
+    return f"{KEY_PREFIX}:{get_language() or '-'}:{hashlib.md5(url.encode()).hexdigest()}"
+
+
+class AnonymousPageCacheMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.timeout = getattr(settings, 'ANONYMOUS_PAGE_CACHE_SECONDS', 300)
+        self.browser_max_age = getattr(settings, 'ANONYMOUS_PAGE_BROWSER_MAX_AGE', 60)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _is_candidate(self, request):
+        if request.method not in ('GET', 'HEAD') or not self.timeout:
+            return False
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or CookieStorage.cookie_name in request.COOKIES:
+            return False # Logged in, or a flash message is waiting to be shown
+        try:
+            match = get_resolver(getattr(request, 'urlconf', None)).resolve(request.path_info)
+        except Resolver404:
+            return False
+        request.resolver_match = match # Labels the request in metrics even when served from the cache
+        query_params = getattr(match.func, 'anonymous_page_cache', None)
+        return query_params is not None and query_params.issuperset(request.GET)
+
+    def _prepare(self, response):
+        """Adds the validators and cache headers; returns False if the response must not be shared."""
+        if (response.status_code != 200 or response.streaming or response.cookies
+                or 'private' in response.get('Cache-Control', '')):
+            return False
+        set_response_etag(response)
+        patch_cache_control(response, public=True, max_age=self.browser_max_age)
+        patch_vary_headers(response, ('Cookie',))
+        return True
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._is_candidate(request):
+            return self.get_response(request)
+        key = page_key(request)
+        cached = cache.get(key)
+        metrics.record_cache('anonymous_page', hits=int(cached is not None), misses=int(cached is None))
+        if cached is not None:
+            # 304 when the browser's copy is still current
+            return get_conditional_response(request, etag=cached.get('ETag'), response=cached)
+        response = self.get_response(request)
+        if self._prepare(response):
+            cache.set(key, response, self.timeout)
+        return response
+
+    async def __acall__(self, request):
+        if not self._is_candidate(request):
+            return await self.get_response(request)
+        key = page_key(request)
+        cached = await cache.aget(key)
+        metrics.record_cache('anonymous_page', hits=int(cached is not None), misses=int(cached is None))
+        if cached is not None:
+            return get_conditional_response(request, etag=cached.get('ETag'), response=cached)
+        response = await self.get_response(request)
+        if self._prepare(response):
+            await cache.aset(key, response, self.timeout)
+        return response
@@ -0,0 +1,183 @@
+"""
+Prometheus metrics, exported at /metrics.
+
+- Request latency per URL name (resolver view_name, "static" for WhiteNoise files,
+  "unmatched" for 404s, so unknown paths can't blow up the label set), plus the number
+  of DB queries and DB time per request. Recorded by MetricsMiddleware, which sits at the
+  top of MIDDLEWARE so cached pages and lean /api/ routes are measured too.
+- Cache hits/misses per cache (card fragments, anonymous page cache); hit ratio is
+  rate(...{result="hit"}) / rate(...).
+- Read routing of replica-enabled requests (phoneindex/replicas.py): to a replica,
+  pinned to the primary after a write, or to the primary for lack of a healthy replica.
+- Business counters: verifications by channel and outcome, theft reports, found reports
+  (labelled matched or not, for the match rate).
+
+DB queries are counted by an execute wrapper installed on every new connection. The
+per-request tally lives in a ContextVar, so queries made from sync_to_async threads
+under ASGI are counted for the request that made them.
+
+With several gunicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+writable by all workers (before they start); each worker then writes its samples there
+and /metrics aggregates all of them. deploy/gunicorn_asgi.py cleans the directory up.
+"""
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client import REGISTRY
+
+NAMESPACE = 'phoneindex'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by URL name.',
+    ['view', 'method', 'status'], namespace=NAMESPACE,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request.',
+    ['view'], namespace=NAMESPACE, buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, float('inf')),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request.',
+    ['view'], namespace=NAMESPACE, buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, float('inf')),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests', 'Cache lookups by cache and result (hit/miss).',
+    ['cache', 'result'], namespace=NAMESPACE,
+)
+VERIFICATIONS = Counter(
+    'verifications', 'IMEI verifications by channel (web/api) and outcome.',
+    ['channel', 'outcome'], namespace=NAMESPACE,
+)
+THEFT_REPORTS = Counter('theft_reports', 'Theft reports filed.', namespace=NAMESPACE)
+FOUND_REPORTS = Counter(
+    'found_reports', 'Found reports submitted, by whether they matched a registered device.',
+    ['matched'], namespace=NAMESPACE,
+)
+REPLICA_ROUTING = Counter(
+    'db_replica_routing', 'Read routing of replica-enabled requests, by outcome (replica/pinned/no_healthy_replica).',
+    ['outcome'], namespace=NAMESPACE,
+)
+
+
+# --- Recording helpers (safe to call anywhere) ---
+
+def record_cache(cache_name, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.labels(cache=cache_name, result='hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache=cache_name, result='miss').inc(misses)
+
+
+def record_verification(channel, outcome):
+    VERIFICATIONS.labels(channel=channel, outcome=outcome).inc()
+
+
+def record_replica_routing(outcome):
+    REPLICA_ROUTING.labels(outcome=outcome).inc()
+
+
+# --- DB query accounting ---
+
+_request_db = ContextVar('phoneindex_request_db', default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    tally = _request_db.get()
+    if tally is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tally[0] += 1
+        tally[1] += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+connection_created.connect(install_query_counter, dispatch_uid='phoneindex.metrics.query_counter')
+
+
+# --- Request metrics ---
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is not None:
+        return match.view_name or 'unnamed'
+    if request.path_info.startswith(settings.STATIC_URL):
+        return 'static'
+    return 'unmatched'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _observe(self, request, response, started, tally):
+        view = _view_label(request)
+        REQUEST_LATENCY.labels(view=view, method=request.method, status=str(response.status_code)).observe(
+            time.perf_counter() - started)
+        REQUEST_DB_QUERIES.labels(view=view).observe(tally[0])
+        REQUEST_DB_SECONDS.labels(view=view).observe(tally[1])
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        tally = [0, 0.0]
+        token = _request_db.set(tally)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self._observe(request, response, started, tally)
+        return response
+
+    async def __acall__(self, request):
+        tally = [0, 0.0]
+        token = _request_db.set(tally)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self._observe(request, response, started, tally)
+        return response
+
+
+# --- Exposition ---
+
+def _allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if supplied and hmac.compare_digest(supplied, token):
+            return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    """GET /metrics -> Prometheus text format, aggregated over all workers in multiprocess mode."""
+    if not _allowed(request):
+        return HttpResponseForbidden('Forbidden\n', content_type='text/plain')
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,259 @@
+"""
+Read replicas for read-heavy views.
+
+Replicas are configured with DATABASE_REPLICA_URLS (settings.py adds them to
+DATABASES as replica1, replica2, ...). Nothing reads from them by default: a view
+opts in with @replica_reads (see devices/urls.py, devices/api_urls.py), and then
+ReplicaRouter sends its reads to one healthy replica, chosen once per request.
+Everything else, writes included, goes to the primary ("default").
+
+Read-your-writes:
+- as soon as a request writes (an INSERT, UPDATE or DELETE runs on the primary, e.g.
+  in ReportDeviceStolenView.form_valid), the rest of the request reads from the primary;
+- the response then sets a short-lived cookie (REPLICA_PIN_COOKIE), and requests
+  carrying it read from the primary for REPLICA_STICKY_SECONDS, so the page a form
+  redirects to shows what was just saved even if the replica lags.
+Writes are spotted by an execute wrapper rather than by db_for_write, which Django
+also calls for plain validation (Model.validate_constraints). Session writes don't
+count (SESSION_SAVE_EVERY_REQUEST would pin everyone), and sessions are always read
+from the primary.
+
+Health: each replica is probed at most every REPLICA_HEALTH_CHECK_SECONDS per
+process (one query on django_migrations, plus the replay lag on PostgreSQL). A
+replica that fails, or lags more than REPLICA_MAX_LAG_SECONDS, is skipped until a
+later probe succeeds; with no healthy replica, reads go to the primary.
+`python manage.py check_replicas` shows the same probes.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = 'replica'
+PRIMARY_ONLY_APPS = frozenset(['sessions'])
+SESSION_TABLE = 'django_session'
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+# --- Per-request routing state ---
+
+class _RequestState:
+    __slots__ = ('replica_reads', 'pinned', 'wrote', 'database')
+
+    def __init__(self, pinned):
+        self.replica_reads = False # Set by @replica_reads
+        self.pinned = pinned # Recent write by this client (pin cookie)
+        self.wrote = False # This request wrote to the primary (see _track_writes)
+        self.database = None # Alias chosen for this request's reads, once decided
+
+
+# A mutable object, so flags set in sync_to_async threads are seen by the middleware
+_request_state = ContextVar('phoneindex_replica_state', default=None)
+
+
+def replica_reads(view):
+    """Lets `view` read from a replica; works on sync and async views."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            _enable()
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            _enable()
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _enable():
+    # Left on for the rest of the request: TemplateResponses run their queries after the view returns
+    state = _request_state.get()
+    if state is not None:
+        state.replica_reads = True
+
+
+def _track_writes(execute, sql, params, many, context):
+    state = _request_state.get()
+    if (state is not None and not state.wrote and sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)
+            and SESSION_TABLE not in sql):
+        state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def install_write_tracker(sender, connection, **kwargs):
+    if connection.alias == DEFAULT_DB_ALIAS and _track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_track_writes)
+
+
+connection_created.connect(install_write_tracker, dispatch_uid='phoneindex.replicas.write_tracker')
+
+
+# --- Health checks ---
+
+@dataclass
+class ReplicaStatus:
+    alias: str
+    healthy: bool
+    checked_at: float
+    lag_seconds: float = None
+    error: str = ''
+
+
+# 0 when the replica has replayed everything it received, else the age of the last replayed transaction
+_POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def probe(alias):
+    """Checks one replica now, with the current thread's connection to it."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1') # Reachable, and has the schema
+            lag = None
+            if connection.vendor == 'postgresql':
+                cursor.execute(_POSTGRES_LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+    except DatabaseError as exc:
+        connection.close()
+        return ReplicaStatus(alias, False, time.monotonic(), error=str(exc).strip() or type(exc).__name__)
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+    if lag is not None and lag > max_lag:
+        return ReplicaStatus(alias, False, time.monotonic(), lag, f'replication lag {lag:.1f}s > {max_lag}s')
+    return ReplicaStatus(alias, True, time.monotonic(), lag)
+
+
+class ReplicaHealth:
+    """Last probe result per replica, shared by the threads of a process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+
+    def is_healthy(self, alias):
+        status = self._status.get(alias)
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_SECONDS', 10)
+        if status is not None and time.monotonic() - status.checked_at < interval:
+            return status.healthy
+        # One thread probes; the others keep using the previous result meanwhile
+        if not self._lock.acquire(blocking=False):
+            return status.healthy if status is not None else False
+        try:
+            new_status = probe(alias)
+            self._status[alias] = new_status
+        finally:
+            self._lock.release()
+        if status is None or status.healthy != new_status.healthy:
+            if new_status.healthy:
+                logger.info("Read replica %s is healthy.", alias)
+            else:
+                logger.warning("Read replica %s is unhealthy, reading from the primary: %s", alias, new_status.error)
+        return new_status.healthy
+
+    def reset(self):
+        self._status.clear()
+
+
+health = ReplicaHealth()
+
+
+def _choose(state):
+    if state.pinned:
+        return DEFAULT_DB_ALIAS, 'pinned'
+    healthy = [alias for alias in replica_aliases() if health.is_healthy(alias)]
+    if not healthy:
+        return DEFAULT_DB_ALIAS, 'no_healthy_replica'
+    return random.choice(healthy), 'replica'
+
+
+# --- Router ---
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.replica_reads or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        if state.wrote:
+            return DEFAULT_DB_ALIAS
+        if state.database is None:
+            from . import metrics # Not at the top: management commands route queries too
+            state.database, outcome = _choose(state)
+            metrics.record_replica_routing(outcome)
+        return state.database
+
+    def db_for_write(self, model, **hints):
+        # Always the primary, even for an instance read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return False if db.startswith(REPLICA_PREFIX) else None
+
+
+# --- Middleware ---
+
+class ReplicaPinMiddleware:
+    """Sets up the routing state of each request and the pin cookie after writes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'REPLICA_PIN_COOKIE', 'db_pin')
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _finish(self, response, state):
+        if state.wrote and self.sticky_seconds:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = _RequestState(pinned=self.cookie_name in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        state = _RequestState(pinned=self.cookie_name in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(response, state)
@@ -0,0 +1,68 @@
+"""
+Lean routing for machine-facing endpoints.
+
+Browser pages need the full MIDDLEWARE stack (session, CSRF, auth, messages), but an
+API client checking an IMEI does not, and the session middleware alone can cost a
+read and a write per request. LeanRouteMiddleware sits right after SecurityMiddleware:
+for paths under settings.LEAN_ROUTE_PREFIXES it resolves and calls the view itself,
+so the rest of the stack never runs. Those views authenticate with API tokens
+(devices/api_auth.py), not sessions, and must not rely on request.session,
+request.user (always anonymous here), messages or CSRF.
+
+Unmatched paths (404) fall through to the normal stack so error pages stay the same.
+"""
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.urls import Resolver404, get_resolver, set_urlconf
+
+
+class LeanRouteMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, 'LEAN_ROUTE_PREFIXES', ()))
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _match(self, request):
+        if not self.prefixes or not request.path_info.startswith(self.prefixes):
+            return None
+        urlconf = getattr(request, 'urlconf', settings.ROOT_URLCONF)
+        set_urlconf(urlconf)
+        try:
+            match = get_resolver(urlconf).resolve(request.path_info)
+        except Resolver404:
+            return None
+        request.resolver_match = match
+        request.user = AnonymousUser()
+        return match
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        match = self._match(request)
+        if match is None:
+            return self.get_response(request)
+        view = match.func
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        response = view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        return response
+
+    async def __acall__(self, request):
+        match = self._match(request)
+        if match is None:
+            return await self.get_response(request)
+        view = match.func
+        if not iscoroutinefunction(view):
+            view = sync_to_async(view, thread_sensitive=True)
+        response = await view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = await sync_to_async(response.render, thread_sensitive=True)()
+        return response
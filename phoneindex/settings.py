@@ -20,17 +20,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
-import os
-from dotenv import load_dotenv
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-load_dotenv(BASE_DIR / '.env')
+if (BASE_DIR / '.env').exists(): # python-dotenv takes a few ms to import, only pay for it when there is a file
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = []
+# Extra hosts, comma separated (e.g. "127.0.0.1,localhost" for local servers and benchmarks)
+ALLOWED_HOSTS += [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 # Render injecte automatiquement cette variable avec votre URL publique
 RENDER_EXTERNAL_HOSTNAME = os.getenv('RENDER_EXTERNAL_HOSTNAME', default=None)
 if RENDER_EXTERNAL_HOSTNAME:
@@ -48,17 +48,24 @@ INSTALLED_APPS = [
     'home',
     'accounts',
     'devices',
+    'ops',
 ]
 
 MIDDLEWARE = [
+    'phoneindex.metrics.MetricsMiddleware', # First, so every response (cached, static, lean) is measured
+    'ops.slow_queries.SlowQueryMiddleware', # Attributes slow queries to the request's view
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware', # Static files are answered here, before any session/auth work
+    'phoneindex.http_cache.AnonymousPageCacheMiddleware', # Cached public pages for visitors without a session
+    'phoneindex.replicas.ReplicaPinMiddleware', # Replica reads for @replica_reads views, primary after writes
+    'phoneindex.routing.LeanRouteMiddleware', # Machine endpoints (LEAN_ROUTE_PREFIXES) stop here
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ops.profiling.ProfilingMiddleware', # Staff-only ?__profile=1; removed entirely unless PROFILING_ENABLED
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'phoneindex.urls'
@@ -66,28 +73,96 @@ ROOT_URLCONF = 'phoneindex.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': ["Templates"],
-        'APP_DIRS': True,
+        'DIRS': [BASE_DIR / "Templates"],
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'devices.context_processors.live_notifications',
+            ],
+            # Compiled templates are kept in memory per process (ops/warmup.py fills it at startup).
+            # Under runserver the autoreloader clears it when a template changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'phoneindex.wsgi.application'
+ASGI_APPLICATION = 'phoneindex.asgi.application'
+
+# Serve the async-native variants of the read-heavy views (e.g. AsyncVerifyDeviceView).
+# Turn on when running under ASGI (deploy/gunicorn_asgi.py does); under WSGI the sync views avoid an async_to_sync hop.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL, or the SQLite file in the project when it's unset (so `manage.py test` works out of the box)
 DATABASES = {
-    'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
+    'default': dj_database_url.config(default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'))
 }
 
+# --- SQLITE WRITE LOCKING ---
+# SQLite has no SELECT ... FOR UPDATE; the transactions that read rows and then change them take the
+# database write lock first instead (devices/locking.py), and wait up to SQLITE_TIMEOUT seconds for it.
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'timeout': int(os.environ.get('SQLITE_TIMEOUT', '20')),
+    })
+    # The default in-memory test database is shared by all threads through one cache, so it can't show
+    # the locking above; tests that submit from several threads (devices/tests.py) need a real file.
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
+
+# --- READ REPLICAS (see phoneindex/replicas.py) ---
+# Comma-separated database URLs, added as replica1, replica2, ... Only views marked @replica_reads use them.
+# A SQLite replica is opened read-only; `manage.py check_replicas --copy-sqlite` refreshes it from the primary.
+DATABASE_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, 1):
+    _replica = dj_database_url.parse(_url)
+    if _replica.get('ENGINE') == 'django.db.backends.sqlite3':
+        _replica['NAME'] = f"file:{_replica['NAME']}?mode=ro"
+    elif _replica.get('ENGINE', '').startswith('django.db.backends.postgresql'):
+        _replica.setdefault('OPTIONS', {})['connect_timeout'] = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', '2'))
+    _replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica{_index}'] = _replica
+DATABASE_ROUTERS = ['phoneindex.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5')) # Reads stay on the primary after a write
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_HEALTH_CHECK_SECONDS = int(os.environ.get('REPLICA_HEALTH_CHECK_SECONDS', '10')) # Per replica and process
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '10')) # PostgreSQL only
+
+# --- DATABASE CONNECTIONS (primary and replicas, see `manage.py bench_db_connections`) ---
+# How a server process keeps its connections, so requests don't pay for a new one each time:
+# - 'persistent': each thread keeps its connection for DB_CONN_MAX_AGE seconds. Sync gunicorn workers
+#   (one connection per worker) and gthread workers (one per thread).
+# - 'pool': a psycopg 3 pool per process (PostgreSQL only, needs psycopg[pool]), connections are borrowed
+#   per request. For ASGI, where each request runs its queries on a new thread so persistent connections
+#   would pile up; deploy/gunicorn_asgi.py defaults to it. Size DB_POOL_MAX_SIZE to the process's peak
+#   concurrent requests, times workers, within the server's max_connections.
+# - 'none': connect and disconnect on every request (Django's default).
+# With DB_CONN_HEALTH_CHECKS, a reused connection is checked before a request uses it (one round trip
+# only when it has been idle), so a database restart doesn't fail the first request on each connection.
+DB_CONNECTIONS = os.environ.get('DB_CONNECTIONS', 'persistent')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10')) # Seconds a request waits for a free connection
+for _database in DATABASES.values():
+    _database['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+    _database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE if DB_CONNECTIONS == 'persistent' else 0
+    if DB_CONNECTIONS == 'pool' and _database.get('ENGINE', '').startswith('django.db.backends.postgresql'):
+        _database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE, 'max_size': DB_POOL_MAX_SIZE, 'timeout': DB_POOL_TIMEOUT,
+        }
+
 """
 DATABASES = {
     'default': {
@@ -145,6 +220,25 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# The output of `npm run build` (assets/ -> static/dist/), collected under the "dist/" prefix.
+# deploy/build.sh runs the build and collectstatic together.
+STATIC_DIST_DIR = BASE_DIR / 'static' / 'dist'
+STATIC_BUILT = STATIC_DIST_DIR.is_dir()
+STATICFILES_DIRS = [('dist', STATIC_DIST_DIR)] if STATIC_BUILT else []
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # collectstatic writes content-hashed copies plus .gz/.br variants; WhiteNoise serves the
+    # hashed files with a far-future "immutable" Cache-Control and picks the best encoding.
+    # Without a build there is nothing to hash, and the manifest storage would fail every page
+    # on the missing 'dist/...' entries, so plain storage is used until static/dist exists.
+    'staticfiles': {
+        'BACKEND': ('whitenoise.storage.CompressedManifestStaticFilesStorage' if STATIC_BUILT
+                    else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -160,6 +254,9 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'  # Replace 'home' with the name of your main page after login
 LOGOUT_REDIRECT_URL = 'base' # Or 'home', or any other page
 
+# SMTP by default; load tests run the server with the dummy backend (django.core.mail.backends.dummy.EmailBackend)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+
 #bootstrap messages
 from django.contrib.messages import constants as message_constants
 MESSAGE_TAGS = {
@@ -177,3 +274,104 @@ SESSION_SAVE_EVERY_REQUEST = True # The session is saved on every request, effec
 # This combination means: the session cookie will be set to expire 120 seconds from the *last request*.
 # If a user is inactive for 120 seconds, their session expires.
 
+
+# --- PARTNER WEBHOOKS (see devices/webhooks.py) ---
+# Delivery is done by `python manage.py deliver_webhooks`, the request path only enqueues.
+WEBHOOK_CONCURRENCY = int(os.environ.get('WEBHOOK_CONCURRENCY', 8)) # Worker threads sending batches in parallel
+WEBHOOK_BATCH_SIZE = 50 # Max events per POST to one subscriber
+WEBHOOK_TIMEOUT_SECONDS = 5
+WEBHOOK_MAX_ATTEMPTS = 8 # Then the delivery is marked FAILED
+WEBHOOK_BACKOFF_BASE_SECONDS = 10 # 10s, 20s, 40s, ... capped below
+WEBHOOK_BACKOFF_MAX_SECONDS = 3600
+
+# --- LIVE OWNER NOTIFICATIONS (see devices/notifications.py, needs ASGI) ---
+# Pages only open the event stream when this is on. Under WSGI the stream never sends a byte and holds a
+# worker thread for as long as the tab is open, so it follows ASYNC_VIEWS (on with deploy/gunicorn_asgi.py).
+LIVE_NOTIFICATIONS = os.environ.get('LIVE_NOTIFICATIONS', str(ASYNC_VIEWS)) == 'True'
+NOTIFICATION_POLL_INTERVAL_SECONDS = 2 # One query per interval per process, shared by all open streams
+NOTIFICATION_HEARTBEAT_SECONDS = 15
+
+# --- FOUND REPORT DUPLICATES (see devices/duplicates.py) ---
+# Repeat submissions of the same find join the first report's cluster; only that one notifies the owner
+FOUND_DUPLICATE_WINDOW_DAYS = int(os.environ.get('FOUND_DUPLICATE_WINDOW_DAYS', '7')) # Same device/IMEI/case ID
+FOUND_DUPLICATE_DATE_WINDOW_HOURS = int(os.environ.get('FOUND_DUPLICATE_DATE_WINDOW_HOURS', '48')) # Similar text
+FOUND_DUPLICATE_MIN_SIMILARITY = float(os.environ.get('FOUND_DUPLICATE_MIN_SIMILARITY', '0.5'))
+
+# --- ARCHIVING (see devices/archive.py, run `python manage.py archive_reports` daily) ---
+# Resolved cases (with their found reports) and processed found reports without a case leave the hot tables
+# after this many days; owners still see them under "Case history", staff in the admin.
+THEFT_REPORT_ARCHIVE_AFTER_DAYS = int(os.environ.get('THEFT_REPORT_ARCHIVE_AFTER_DAYS', 180)) # Since the case's last update
+FOUND_REPORT_ARCHIVE_AFTER_DAYS = int(os.environ.get('FOUND_REPORT_ARCHIVE_AFTER_DAYS', 180)) # Keep above FOUND_DUPLICATE_WINDOW_DAYS
+ARCHIVE_BATCH_SIZE = 500 # Cases (or found reports) moved per transaction
+
+# --- MACHINE-FACING ENDPOINTS (see phoneindex/routing.py and devices/api_auth.py) ---
+# Served without the session/CSRF/auth/messages middleware. /api/ authenticates with signed API tokens.
+LEAN_ROUTE_PREFIXES = ['/api/', '/metrics', '/health/']
+API_REQUIRE_TOKEN = os.environ.get('API_REQUIRE_TOKEN', 'True') == 'True'
+API_TOKEN_MAX_AGE_SECONDS = int(os.environ['API_TOKEN_MAX_AGE_SECONDS']) if os.environ.get('API_TOKEN_MAX_AGE_SECONDS') else None
+API_REVOKED_CLIENTS = [client for client in os.environ.get('API_REVOKED_CLIENTS', '').split(',') if client]
+
+# --- CACHING ---
+# Local memory by default (per process). Point CACHE_BACKEND/CACHE_LOCATION at a shared cache in production
+# (e.g. django.core.cache.backends.redis.RedisCache + redis://...), so all workers share hits and counters.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'phoneindex'),
+    }
+}
+CARD_FRAGMENT_CACHE_SECONDS = 24 * 3600 # Device/case cards (devices/fragments.py); keys change with the data anyway
+# Public pages (home, about us, IMEI verification form) for visitors without a session, see phoneindex/http_cache.py.
+# Server-side copy lifetime, and the max-age browsers/CDNs get (revalidated with the ETag afterwards). 0 disables it.
+ANONYMOUS_PAGE_CACHE_SECONDS = int(os.environ.get('ANONYMOUS_PAGE_CACHE_SECONDS', 300))
+ANONYMOUS_PAGE_BROWSER_MAX_AGE = int(os.environ.get('ANONYMOUS_PAGE_BROWSER_MAX_AGE', 60))
+
+# --- HEALTH CHECKS (see phoneindex/health.py) ---
+# /health/live never touches the database; /health/ready runs the checks below, each with a short timeout.
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_CHECK_TIMEOUT_SECONDS', 0.5))
+HEALTH_CHECK_CACHE_SECONDS = float(os.environ.get('HEALTH_CHECK_CACHE_SECONDS', 1)) # Shared by all probes of a process
+HEALTH_MAX_WORKER_LAG_SECONDS = int(os.environ.get('HEALTH_MAX_WORKER_LAG_SECONDS', 300)) # Oldest due webhook delivery
+# Checks that make /health/ready answer 503 when they fail (database, cache, worker_lag); the others are only reported
+HEALTH_CRITICAL_CHECKS = [name for name in os.environ.get('HEALTH_CRITICAL_CHECKS', 'database,cache').split(',') if name]
+
+# --- METRICS (see phoneindex/metrics.py) ---
+# /metrics answers scrapers from these addresses, or anyone sending "Authorization: Bearer <METRICS_TOKEN>".
+# Set PROMETHEUS_MULTIPROC_DIR in the environment when running several worker processes.
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# --- SLOW-QUERY LOG (see ops/slow_queries.py, staff page at /ops/slow-queries/) ---
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100)) # 0 disables it
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1)) # Share of slow SELECTs to EXPLAIN
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUP_COUNT = int(os.environ.get('SLOW_QUERY_LOG_BACKUP_COUNT', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message_only': {'format': '{message}', 'style': '{'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'ops.slow_queries.SlowQueryFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': SLOW_QUERY_LOG_MAX_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUP_COUNT,
+            'formatter': 'message_only',
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'phoneindex.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# --- ON-DEMAND PROFILING (see ops/profiling.py) ---
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_QUERY_PARAM = '__profile'
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOP_FUNCTIONS = 30
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / 'logs' / 'profiles'))
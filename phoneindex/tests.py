@@ -0,0 +1,262 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+
+from devices import webhooks
+from devices.models import RegisteredDevice, WebhookSubscription
+
+from . import health, replicas
+from .http_cache import anonymous_page_cache
+
+REPLICA = 'replica1'
+
+
+def request_attributes(request):
+    """What the middleware stack set up for this request."""
+    return JsonResponse({
+        'session': hasattr(request, 'session'),
+        'messages': hasattr(request, '_messages'),
+        'authenticated': request.user.is_authenticated,
+    })
+
+
+page_renders = []
+
+
+def public_page(request):
+    page_renders.append(request.get_full_path())
+    return HttpResponse(f'Page {len(page_renders)}')
+
+
+# URLconf of the tests below: the same view on a lean route and on a page route, and cached public pages
+urlpatterns = [
+    path('lean/attributes/', request_attributes),
+    path('page/attributes/', request_attributes),
+    path('public/', anonymous_page_cache(public_page)),
+    path('public/search/', anonymous_page_cache(public_page, query_params=['q', 'page'])),
+]
+
+
+@replicas.replica_reads
+def device_makes(request):
+    """Lists the makes it can see, after a write on POST; the database it read from shows in the answer."""
+    if request.method == 'POST':
+        RegisteredDevice.objects.filter(make='Primary only').update(color='Red')
+    return HttpResponse(','.join(RegisteredDevice.objects.order_by('pk').values_list('make', flat=True)))
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The primary is the (file) test database; the replica is a read-only copy of it taken
+    before the second device was added, so a read shows which of the two it went to.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered only now, and as a test mirror of the primary, so the test runner doesn't create it
+        # and the test case doesn't flush it (connections.settings is settings.DATABASES, which
+        # replica_aliases() reads). Listing it in `databases` lets the test case connect to it.
+        cls.directory = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.directory, 'replica.sqlite3')
+        connections.settings[REPLICA] = connections.configure_settings({
+            'default': connections.settings['default'],
+            REPLICA: {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': f'file:{cls.replica_path}?mode=ro',
+                'TEST': {'MIRROR': 'default'},
+            },
+        })[REPLICA]
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        owner = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        RegisteredDevice.objects.create(owner=owner, imei='356938035643809', make='Replicated', model_name='A', color='Black')
+        primary = sqlite3.connect(connections['default'].settings_dict['NAME'])
+        copy = sqlite3.connect(self.replica_path)
+        primary.backup(copy)
+        copy.close()
+        primary.close()
+        self.addCleanup(connections[REPLICA].close)
+        RegisteredDevice.objects.create(owner=owner, imei='490154203237518', make='Primary only', model_name='B', color='Blue')
+
+        replicas.health.reset()
+        self.addCleanup(replicas.health.reset)
+        self.factory = RequestFactory()
+        self.view = replicas.ReplicaPinMiddleware(device_makes)
+
+    def test_reads_go_to_replica(self):
+        response = self.view(self.factory.get('/'))
+        self.assertEqual(response.content, b'Replicated')
+        self.assertNotIn('db_pin', response.cookies)
+
+    def test_unmarked_view_reads_primary(self):
+        view = replicas.ReplicaPinMiddleware(device_makes.__wrapped__)
+        self.assertEqual(view(self.factory.get('/')).content, b'Replicated,Primary only')
+
+    def test_reads_after_write_use_primary(self):
+        # Within the request: the UPDATE flags the request state, the read that follows goes to the primary
+        response = self.view(self.factory.post('/'))
+        self.assertEqual(response.content, b'Replicated,Primary only')
+        self.assertIsNone(replicas._request_state.get())
+
+        # Later requests of the same client carry the pin cookie and read from the primary too
+        cookie = response.cookies['db_pin']
+        self.assertEqual(cookie.value, '1')
+        self.assertEqual(cookie['max-age'], 5)
+        request = self.factory.get('/')
+        request.COOKIES['db_pin'] = cookie.value
+        self.assertEqual(self.view(request).content, b'Replicated,Primary only')
+        self.assertEqual(self.view(self.factory.get('/')).content, b'Replicated')
+
+    @override_settings(REPLICA_HEALTH_CHECK_SECONDS=0)
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        self.assertEqual(self.view(self.factory.get('/')).content, b'Replicated')
+
+        connections[REPLICA].close()
+        os.remove(self.replica_path)
+        with self.assertLogs('phoneindex.replicas', 'WARNING'):
+            response = self.view(self.factory.get('/'))
+        self.assertEqual(response.content, b'Replicated,Primary only')
+        self.assertFalse(replicas.health._status[REPLICA].healthy)
+
+
+@override_settings(ROOT_URLCONF='phoneindex.tests', LEAN_ROUTE_PREFIXES=['/lean/'])
+class LeanRouteMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        user = get_user_model().objects.create_user(email='owner@example.com', password='secret-pass-1')
+        self.client.force_login(user)
+
+    def test_lean_route_skips_session_csrf_and_messages(self):
+        response = self.client.post('/lean/attributes/')
+        self.assertEqual(response.status_code, 200) # No CSRF token needed
+        self.assertEqual(response.json(), {'session': False, 'messages': False, 'authenticated': False})
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_other_routes_keep_the_full_stack(self):
+        self.assertEqual(self.client.post('/page/attributes/').status_code, 403)
+        response = self.client.get('/page/attributes/')
+        self.assertEqual(response.json(), {'session': True, 'messages': True, 'authenticated': True})
+
+    def test_unknown_lean_path_falls_through(self):
+        self.assertEqual(self.client.get('/lean/missing/').status_code, 404)
+
+
+@override_settings(ROOT_URLCONF='phoneindex.tests', ANONYMOUS_PAGE_CACHE_SECONDS=300)
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        page_renders.clear()
+        self.addCleanup(cache.clear)
+
+    def test_page_is_served_from_cache(self):
+        first = self.client.get('/public/')
+        self.assertEqual(self.client.get('/public/').content, first.content)
+        self.assertEqual(page_renders, ['/public/'])
+
+    def test_unknown_query_params_bypass_the_cache(self):
+        self.client.get('/public/')
+        for junk in ['?utm_source=1', '?utm_source=2', '?x=1']:
+            response = self.client.get('/public/' + junk)
+            self.assertNotIn('ETag', response)
+        self.assertEqual(len(page_renders), 4)
+        self.assertEqual(self.client.get('/public/search/?q=nokia&junk=1').content, b'Page 5')
+        self.assertEqual(self.client.get('/public/search/?q=nokia&junk=1').content, b'Page 6')
+
+    def test_allowed_query_params_share_one_entry_in_any_order(self):
+        first = self.client.get('/public/search/?q=nokia&page=2')
+        self.assertEqual(self.client.get('/public/search/?page=2&q=nokia').content, first.content)
+        self.assertNotEqual(self.client.get('/public/search/?q=tecno').content, first.content)
+        self.assertEqual(len(page_renders), 2)
+
+
+def failing_check():
+    raise RuntimeError('connection refused')
+
+
+def hanging_check():
+    time.sleep(0.5)
+    return {}
+
+
+@override_settings(HEALTH_CHECK_TIMEOUT_SECONDS=2, HEALTH_CHECK_CACHE_SECONDS=0, HEALTH_MAX_WORKER_LAG_SECONDS=300,
+                   HEALTH_CRITICAL_CHECKS=['database', 'cache'])
+class HealthEndpointTests(TransactionTestCase):
+    """A TransactionTestCase: the readiness checks run on other threads, with their own connections."""
+
+    def setUp(self):
+        patcher = mock.patch.object(health, 'readiness', health.ReadinessCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ready(self):
+        response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        return response.status_code, response.json()
+
+    def test_liveness(self):
+        response = self.client.get(reverse('health_live'))
+        self.assertEqual((response.status_code, response.content), (200, b'ok\n'))
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertFalse(response.cookies)
+
+    def test_ready(self):
+        status, body = self.ready()
+        self.assertEqual(status, 200)
+        self.assertEqual(body['status'], 'ok')
+        self.assertEqual(set(body['checks']), {'database', 'cache', 'worker_lag'})
+        self.assertTrue(all(check['ok'] for check in body['checks'].values()))
+        self.assertEqual(body['checks']['worker_lag']['lag_seconds'], 0)
+
+    def test_failing_critical_check_makes_it_unavailable(self):
+        with mock.patch.dict(health.CHECKS, {'cache': failing_check}):
+            status, body = self.ready()
+        self.assertEqual(status, 503)
+        self.assertEqual(body['status'], 'unavailable')
+        self.assertEqual(body['checks']['cache']['error'], 'RuntimeError: connection refused')
+        self.assertTrue(body['checks']['database']['ok'])
+
+    @override_settings(HEALTH_CHECK_TIMEOUT_SECONDS=0.1)
+    def test_hung_check_times_out(self):
+        with mock.patch.dict(health.CHECKS, {'database': hanging_check}):
+            status, body = self.ready()
+        self.assertEqual(status, 503)
+        self.assertEqual(body['checks']['database'], {'ok': False, 'error': 'timed out after 0.1s'})
+
+    def test_worker_lag_is_reported_but_not_critical(self):
+        WebhookSubscription.objects.create(
+            name='Carrier', url='http://127.0.0.1:9/hooks', secret='partner-secret',
+            event_types=[WebhookSubscription.EVENT_DEVICE_STOLEN],
+        )
+        event = webhooks.enqueue_event(WebhookSubscription.EVENT_DEVICE_STOLEN, {'imei': '356938035643809'})
+        event.deliveries.update(next_attempt_at=timezone.now() - timedelta(minutes=10))
+
+        status, body = self.ready()
+        self.assertEqual(status, 200)
+        self.assertFalse(body['checks']['worker_lag']['ok'])
+        self.assertIn('oldest due webhook delivery is', body['checks']['worker_lag']['error'])
+
+    @override_settings(HEALTH_CHECK_CACHE_SECONDS=60)
+    def test_result_is_reused(self):
+        self.assertEqual(self.ready()[0], 200)
+        with mock.patch.dict(health.CHECKS, {'cache': failing_check}):
+            self.assertEqual(self.ready()[0], 200)
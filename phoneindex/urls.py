@@ -19,12 +19,20 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView, RedirectView # Make sure this is imported
+from phoneindex.health import liveness_view, readiness_view
+from phoneindex.http_cache import anonymous_page_cache # Public pages, see phoneindex/http_cache.py
+from phoneindex.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')), # This is for your /accounts/signup, /accounts/login etc.
-    path('', TemplateView.as_view(template_name='home.html'), name='home'),
+    path('', anonymous_page_cache(TemplateView.as_view(template_name='home.html')), name='home'),
     path('home/', RedirectView.as_view(url='/', permanent=True)), # Redirects /home/ to /
     path('devices/', include('devices.urls', namespace='devices')), # Include the namespace here as well
-    path('about-us/', TemplateView.as_view(template_name='about_us.html'), name='about_us'),
+    path('about-us/', anonymous_page_cache(TemplateView.as_view(template_name='about_us.html')), name='about_us'),
+    path('ops/', include('ops.urls', namespace='ops')), # Staff-only operations pages
+    path('metrics', metrics_view, name='metrics'), # Prometheus scrape endpoint
+    path('health/live', liveness_view, name='health_live'), # Load balancer probes, see phoneindex/health.py
+    path('health/ready', readiness_view, name='health_ready'),
+    path('api/', include('devices.api_urls', namespace='api')), # Async JSON API (verify, partial IMEI, found pre-fill)
 ]